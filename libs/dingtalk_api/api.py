@@ -1,3 +1,4 @@
+import asyncio
 import base64
 import json
 import time
@@ -125,6 +126,35 @@ class DingTalkClient:
         else:
             self.EchoTextHandler.reply_text(content, incoming_message)
 
+    async def send_markdown_card(self, content: str, incoming_message) -> dingtalk_stream.MarkdownCardInstance:
+        """发送可更新内容的 markdown 卡片，返回卡片实例"""
+        card = dingtalk_stream.MarkdownCardInstance(self.client, incoming_message)
+        card.set_title_and_logo(self.robot_name + '的回答', '')
+        # SDK 使用同步请求，放到线程中执行避免阻塞事件循环
+        await asyncio.to_thread(card.reply, content)
+        # SDK 发送失败时只记录日志，卡片实例 ID 为空
+        if not card.card_instance_id:
+            raise Exception('发送卡片失败，请检查机器人是否有互动卡片权限')
+        return card
+
+    async def update_markdown_card(self, card: dingtalk_stream.MarkdownCardInstance, content: str):
+        """更新 send_markdown_card 发送的卡片内容
+
+        SDK 的 update 失败时只记录日志，此处直接请求接口以便失败时抛出异常。
+        """
+        if not await self.check_access_token():
+            await self.get_access_token()
+        url = 'https://api.dingtalk.com/v1.0/card/instances'
+        headers = {'x-acs-dingtalk-access-token': self.access_token}
+        card_data = {'markdown': content}
+        if card.title:
+            card_data['title'] = card.title
+        data = {'outTrackId': card.card_instance_id, 'cardData': {'cardParamMap': card_data}}
+        async with httpx.AsyncClient() as client:
+            response = await client.put(url, headers=headers, json=data)
+            if response.status_code != 200:
+                raise Exception(f'更新卡片失败: {response.status_code}, {response.text}')
+
     async def get_incoming_message(self):
         """获取收到的消息"""
         return await self.EchoTextHandler.get_incoming_message()
@@ -11,6 +11,10 @@ from .oaevent import OAEvent
 import asyncio
 
 
+MAX_MSG_ID_RECORDS = 1000
+"""最多记录的消息 ID 数"""
+
+
 xml_template = """
 <xml>
     <ToUserName><![CDATA[{to_user}]]></ToUserName>
@@ -159,6 +163,9 @@ class OAClient:
             return
 
         self.msg_id_map[message_id] = 1
+        # 只保留最近的消息记录，重试投递只会发生在短时间内
+        while len(self.msg_id_map) > MAX_MSG_ID_RECORDS:
+            self.msg_id_map.pop(next(iter(self.msg_id_map)))
         msg_type = event.type
         if msg_type in self._message_handlers:
             for handler in self._message_handlers[msg_type]:
@@ -76,7 +76,7 @@ class SlackClient:
             response = await self.client.chat_postMessage(channel=channel_id, text=text)
             if self.bot_user_id is None and response.get('ok'):
                 self.bot_user_id = response['message']['bot_id']
-            return
+            return response
         except Exception as e:
             raise e
 
@@ -86,10 +86,14 @@ class SlackClient:
             if self.bot_user_id is None and response.get('ok'):
                 self.bot_user_id = response['message']['bot_id']
 
-            return
+            return response
         except Exception as e:
             raise e
 
+    async def update_message(self, text: str, channel_id: str, ts: str):
+        """更新已发送的消息，channel_id 和 ts 取自发送消息时的响应"""
+        return await self.client.chat_update(channel=channel_id, ts=ts, text=text)
+
     async def run_task(self, host: str, port: int, *args, **kwargs):
         """
         启动 Quart 应用。
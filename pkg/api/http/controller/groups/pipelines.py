@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import pydantic.v1 as pydantic
 import quart
 
 from .. import group
@@ -15,7 +16,10 @@ class PipelinesRouterGroup(group.RouterGroup):
             elif quart.request.method == 'POST':
                 json_data = await quart.request.json
 
-                pipeline_uuid = await self.ap.pipeline_service.create_pipeline(json_data)
+                try:
+                    pipeline_uuid = await self.ap.pipeline_service.create_pipeline(json_data)
+                except pydantic.ValidationError as e:
+                    return self.http_status(400, -1, f'流水线配置无效: {e}')
 
                 return self.success(data={'uuid': pipeline_uuid})
 
@@ -35,7 +39,10 @@ class PipelinesRouterGroup(group.RouterGroup):
             elif quart.request.method == 'PUT':
                 json_data = await quart.request.json
 
-                await self.ap.pipeline_service.update_pipeline(pipeline_uuid, json_data)
+                try:
+                    await self.ap.pipeline_service.update_pipeline(pipeline_uuid, json_data)
+                except pydantic.ValidationError as e:
+                    return self.http_status(400, -1, f'流水线配置无效: {e}')
 
                 return self.success()
             elif quart.request.method == 'DELETE':
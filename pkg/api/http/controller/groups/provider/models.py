@@ -36,3 +36,12 @@ class LLMModelsRouterGroup(group.RouterGroup):
                 await self.ap.model_service.delete_llm_model(model_uuid)
 
                 return self.success()
+
+        @self.route('/<model_uuid>/keys', methods=['GET'])
+        async def _(model_uuid: str) -> str:
+            keys = await self.ap.model_service.get_llm_model_key_stats(model_uuid)
+
+            if keys is None:
+                return self.http_status(404, -1, 'model not found')
+
+            return self.success(data={'keys': keys})
@@ -1,4 +1,10 @@
+import datetime
+import hmac
+
+import quart
+
 from .. import group
+from .....provider.modelmgr import accounting
 
 
 @group.group_class('stats', '/api/v1/stats')
@@ -6,14 +12,106 @@ class StatsRouterGroup(group.RouterGroup):
     async def initialize(self) -> None:
         @self.route('/basic', methods=['GET'], auth_type=group.AuthType.USER_TOKEN)
         async def _() -> str:
+            self.ap.sess_mgr.evict_sessions()
+
             conv_count = 0
-            for session in self.ap.sess_mgr.session_list:
+            for session in self.ap.sess_mgr.sessions.values():
                 conv_count += len(session.conversations if session.conversations is not None else [])
 
             return self.success(
                 data={
-                    'active_session_count': len(self.ap.sess_mgr.session_list),
+                    'active_session_count': len(self.ap.sess_mgr.sessions),
+                    'evicted_session_count': self.ap.sess_mgr.evicted_session_count,
                     'conversation_count': conv_count,
                     'query_count': self.ap.query_pool.query_id_counter,
+                    'cpu_worker_count': self.ap.instance_config.data['concurrency'].get('cpu-workers', 0),
+                    'duplicate_message_count': (
+                        self.ap.platform_mgr.message_dedup.hits if self.ap.platform_mgr.message_dedup else 0
+                    ),
+                }
+            )
+
+        @self.route('/queues', methods=['GET'], auth_type=group.AuthType.USER_TOKEN)
+        async def _() -> str:
+            async with self.ap.query_pool:
+                return self.success(
+                    data={
+                        'policy': self.ap.query_pool.policy.name,
+                        'pending_count': self.ap.query_pool.pending_count,
+                        'bots': self.ap.query_pool.get_bot_queue_depths(),
+                        'shed': self.ap.query_pool.get_shed_counts(),
+                        'coalesced_count': self.ap.query_pool.coalesced_count,
+                    }
+                )
+
+        @self.route('/llm-models', methods=['GET'], auth_type=group.AuthType.USER_TOKEN)
+        async def _() -> str:
+            return self.success(
+                data={
+                    'models': [
+                        {
+                            'uuid': model.model_entity.uuid,
+                            'name': model.model_entity.name,
+                            'latency': model.latency.get_stats(),
+                            'circuit_breaker': model.breaker.get_stats(),
+                            'concurrency': model.limiter.get_stats(),
+                            'usage': model.usage.get_stats(),
+                        }
+                        for model in self.ap.model_mgr.llm_models
+                    ]
+                }
+            )
+
+        @self.route('/llm-cache', methods=['GET'], auth_type=group.AuthType.USER_TOKEN)
+        async def _() -> str:
+            return self.success(data=self.ap.model_mgr.response_cache.get_stats())
+
+        @self.route('/llm-single-flight', methods=['GET'], auth_type=group.AuthType.USER_TOKEN)
+        async def _() -> str:
+            return self.success(data=self.ap.model_mgr.single_flight.get_stats())
+
+        @self.route('/llm-usage', methods=['GET'], auth_type=group.AuthType.USER_TOKEN)
+        async def _() -> str:
+            group_by = quart.request.args.get('group_by', 'model')
+            if group_by not in accounting.GROUP_BY_COLUMNS:
+                return self.http_status(400, -1, f'不支持的汇总维度: {group_by}')
+
+            try:
+                hours = float(quart.request.args.get('hours', 24))
+                limit = int(quart.request.args.get('limit', 100))
+            except ValueError:
+                return self.http_status(400, -1, 'hours 和 limit 须为数字')
+
+            since = datetime.datetime.now() - datetime.timedelta(hours=hours)
+
+            return self.success(
+                data={
+                    'group_by': group_by,
+                    'since': since.isoformat(),
+                    'items': await self.ap.usage_recorder.query(group_by, since, limit),
                 }
             )
+
+        @self.route('/tools', methods=['GET'], auth_type=group.AuthType.USER_TOKEN)
+        async def _() -> str:
+            return self.success(data={'tools': self.ap.tool_mgr.get_stats()})
+
+        @self.route('/pipelines', methods=['GET'], auth_type=group.AuthType.USER_TOKEN)
+        async def _() -> str:
+            return self.success(data={'pipelines': self.ap.pipeline_mgr.metrics.to_dict()})
+
+        @self.route('/metrics', methods=['GET'], auth_type=group.AuthType.NONE)
+        async def _() -> quart.Response:
+            # 供 Prometheus 抓取，使用 api.metrics-token 鉴权，未配置时不开放
+            metrics_token = self.ap.instance_config.data['api'].get('metrics-token', '')
+            if not metrics_token:
+                return self.http_status(404, -1, '未配置 api.metrics-token')
+
+            token = quart.request.headers.get('Authorization', '').replace('Bearer ', '')
+            if not hmac.compare_digest(token.encode(), metrics_token.encode()):
+                return self.http_status(401, -1, '无效的指标令牌')
+
+            return quart.Response(
+                self.ap.pipeline_mgr.metrics.to_prometheus(),
+                content_type='text/plain; version=0.0.4; charset=utf-8',
+            )
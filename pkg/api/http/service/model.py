@@ -56,6 +56,15 @@ class ModelsService:
 
         return self.ap.persistence_mgr.serialize_model(persistence_model.LLMModel, model)
 
+    async def get_llm_model_key_stats(self, model_uuid: str) -> list[dict] | None:
+        """获取模型各 api key 的健康状态与统计"""
+        try:
+            runtime_model = await self.ap.model_mgr.get_model_by_uuid(model_uuid)
+        except ValueError:
+            return None
+
+        return runtime_model.token_mgr.get_stats()
+
     async def update_llm_model(self, model_uuid: str, model_data: dict) -> None:
         if 'uuid' in model_data:
             del model_data['uuid']
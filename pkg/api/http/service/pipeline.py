@@ -6,6 +6,7 @@ import sqlalchemy
 
 from ....core import app
 from ....entity.persistence import pipeline as persistence_pipeline
+from ....pipeline import settings as pipeline_settings
 
 
 default_stage_order = [
@@ -68,6 +69,9 @@ class PipelineService:
         pipeline_data['is_default'] = default
         pipeline_data['config'] = json.load(open('templates/default-pipeline-config.json', 'r', encoding='utf-8'))
 
+        # 先校验再写入数据库，配置不合法时抛出 pydantic.ValidationError
+        pipeline_settings.PipelineSettings.from_config(pipeline_data['config'])
+
         await self.ap.persistence_mgr.execute_async(
             sqlalchemy.insert(persistence_pipeline.LegacyPipeline).values(**pipeline_data)
         )
@@ -88,6 +92,10 @@ class PipelineService:
         if 'is_default' in pipeline_data:
             del pipeline_data['is_default']
 
+        # 先校验再写入数据库，配置不合法时抛出 pydantic.ValidationError，数据库和运行中的流水线都不变
+        if 'config' in pipeline_data:
+            pipeline_settings.PipelineSettings.from_config(pipeline_data['config'])
+
         await self.ap.persistence_mgr.execute_async(
             sqlalchemy.update(persistence_pipeline.LegacyPipeline)
             .where(persistence_pipeline.LegacyPipeline.uuid == pipeline_uuid)
@@ -111,7 +119,7 @@ class PipelineService:
                 bot_data = {'use_pipeline_name': pipeline_data['name']}
                 await self.ap.bot_service.update_bot(bot.uuid, bot_data)
 
-        await self.ap.pipeline_mgr.remove_pipeline(pipeline_uuid)
+        # load_pipeline 在新流水线构建完成后替换同 UUID 的旧流水线
         await self.ap.pipeline_mgr.load_pipeline(pipeline)
 
     async def delete_pipeline(self, pipeline_uuid: str) -> None:
@@ -121,3 +129,4 @@ class PipelineService:
             )
         )
         await self.ap.pipeline_mgr.remove_pipeline(pipeline_uuid)
+        self.ap.pipeline_mgr.metrics.remove_pipeline(pipeline_uuid)
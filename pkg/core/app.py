@@ -2,6 +2,7 @@ from __future__ import annotations
 
 import logging
 import asyncio
+import concurrent.futures
 import traceback
 import sys
 import os
@@ -9,6 +10,8 @@ import os
 from ..platform import botmgr as im_mgr
 from ..provider.session import sessionmgr as llm_session_mgr
 from ..provider.modelmgr import modelmgr as llm_model_mgr
+from ..provider.modelmgr import httpclient as llm_http_client
+from ..provider.modelmgr import accounting as llm_accounting
 from ..provider.tools import toolmgr as llm_tool_mgr
 from ..config import manager as config_mgr
 from ..command import cmdmgr
@@ -88,6 +91,15 @@ class Application:
 
     proxy_mgr: proxy_mgr.ProxyManager = None
 
+    process_pool: concurrent.futures.ProcessPoolExecutor = None
+    """执行 CPU 密集型任务（如长文本转图片）的进程池，未启用时为 None，此时这些任务在默认线程池中执行"""
+
+    http_client_pool: llm_http_client.HTTPClientPool = None
+    """LLM 请求器共用的 HTTP 客户端池"""
+
+    usage_recorder: llm_accounting.UsageRecorder = None
+    """模型请求用量的汇总记录器"""
+
     logger: logging.Logger = None
 
     persistence_mgr: persistencemgr.PersistenceManager = None
@@ -112,6 +124,20 @@ class Application:
     async def initialize(self):
         pass
 
+    async def shutdown(self):
+        """程序退出前释放资源"""
+        if self.sess_mgr is not None:
+            await self.sess_mgr.shutdown()
+
+        if self.usage_recorder is not None:
+            try:
+                await self.usage_recorder.flush()
+            except Exception as e:
+                self.logger.warning(f'写入模型用量统计失败: {e}')
+
+        if self.process_pool is not None:
+            self.process_pool.shutdown(wait=False, cancel_futures=True)
+
     async def run(self):
         try:
             await self.plugin_mgr.initialize_plugins()
@@ -140,6 +166,11 @@ class Application:
                 name='http-api-controller',
                 scopes=[core_entities.LifecycleControlScope.APPLICATION],
             )
+            self.task_mgr.create_task(
+                self.usage_recorder.run(),
+                name='llm-usage-recorder',
+                scopes=[core_entities.LifecycleControlScope.APPLICATION],
+            )
             self.task_mgr.create_task(
                 never_ending(),
                 name='never-ending-task',
@@ -227,10 +258,15 @@ class Application:
 
                 await self.tool_mgr.shutdown()
 
+                # 先加载新的模型再释放旧的，使共用的 HTTP 客户端及其连接得以延续
+                old_model_mgr = self.model_mgr
+
                 llm_model_mgr_inst = llm_model_mgr.ModelManager(self)
                 await llm_model_mgr_inst.initialize()
                 self.model_mgr = llm_model_mgr_inst
 
+                await old_model_mgr.shutdown()
+
                 llm_session_mgr_inst = llm_session_mgr.SessionManager(self)
                 await llm_session_mgr_inst.initialize()
                 self.sess_mgr = llm_session_mgr_inst
@@ -46,16 +46,36 @@ async def make_app(loop: asyncio.AbstractEventLoop) -> app.Application:
 
 
 async def main(loop: asyncio.AbstractEventLoop):
+    app_inst: app.Application | None = None
+
+    async def shutdown_and_exit():
+        try:
+            await asyncio.wait_for(app_inst.shutdown(), timeout=10)
+        except Exception:
+            traceback.print_exc()
+        finally:
+            os._exit(0)
+
     try:
         # 挂系统信号处理
         import signal
 
+        shutting_down = False
+
         def signal_handler(sig, frame):
+            nonlocal shutting_down
+
             print('[Signal] 程序退出.')
-            # ap.shutdown()
-            os._exit(0)
+
+            # 启动完成前或再次收到信号时直接退出
+            if app_inst is None or shutting_down:
+                os._exit(0)
+
+            shutting_down = True
+            loop.call_soon_threadsafe(loop.create_task, shutdown_and_exit())
 
         signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
 
         app_inst = await make_app(loop)
         await app_inst.run()
@@ -13,6 +13,7 @@ from ..provider.tools import entities as tools_entities
 from ..platform import adapter as msadapter
 from ..platform.types import message as platform_message
 from ..platform.types import events as platform_events
+from ..pipeline import settings as pipeline_settings
 
 
 class LifecycleControlScope(enum.Enum):
@@ -60,7 +61,10 @@ class Query(pydantic.BaseModel):
     """流水线UUID。"""
 
     pipeline_config: typing.Optional[dict[str, typing.Any]] = None
-    """流水线配置，由 Pipeline 在运行开始时设置。"""
+    """流水线原始配置，由 Pipeline 在运行开始时设置。"""
+
+    pipeline_settings: typing.Optional[pipeline_settings.PipelineSettings] = None
+    """流水线配置快照，由 Pipeline 在运行开始时设置，不可修改。"""
 
     adapter: msadapter.MessagePlatformAdapter
     """消息平台适配器对象，单个app中可能启用了多个消息平台适配器，此对象表明发起此query的适配器"""
@@ -83,6 +87,9 @@ class Query(pydantic.BaseModel):
     use_llm_model: typing.Optional[requester.RuntimeLLMModel] = None
     """使用的对话模型，由前置处理器阶段设置"""
 
+    fallback_llm_models: typing.Optional[list[requester.RuntimeLLMModel]] = None
+    """主模型请求失败时按顺序尝试的备用模型，由前置处理器阶段设置"""
+
     use_funcs: typing.Optional[list[tools_entities.LLMFunction]] = None
     """使用的函数，由前置处理器阶段设置"""
 
@@ -94,6 +101,9 @@ class Query(pydantic.BaseModel):
     resp_message_chain: typing.Optional[list[platform_message.MessageChain]] = None
     """回复消息链，从resp_messages包装而得"""
 
+    stream_responder: typing.Optional['pkg.pipeline.respback.streaming.StreamResponder'] = None
+    """当前模型消息的流式回复器，仅流式输出时由聊天处理器设置"""
+
     # ======= 内部保留 =======
     current_stage: typing.Optional['pkg.pipeline.pipelinemgr.StageInstContainer'] = None
     """当前所处阶段"""
@@ -137,6 +147,9 @@ class Conversation(pydantic.BaseModel):
 
     use_funcs: typing.Optional[list[tools_entities.LLMFunction]]
 
+    funcs_version: typing.Optional[int] = None
+    """use_funcs 对应的工具列表版本号，与 ToolManager.version 不一致时需重新获取"""
+
     uuid: typing.Optional[str] = None
     """该对话的 uuid，在创建时不会自动生成。而是当使用 Dify API 等由外部管理对话信息的服务时，用于绑定外部的会话。具体如何使用，取决于 Runner。"""
 
@@ -1,5 +1,7 @@
 from __future__ import annotations
 
+import concurrent.futures
+import multiprocessing
 
 from .. import stage, app
 from ...utils import version, proxy, announce
@@ -8,6 +10,8 @@ from ...plugin import manager as plugin_mgr
 from ...command import cmdmgr
 from ...provider.session import sessionmgr as llm_session_mgr
 from ...provider.modelmgr import modelmgr as llm_model_mgr
+from ...provider.modelmgr import httpclient as llm_http_client
+from ...provider.modelmgr import accounting as llm_accounting
 from ...provider.tools import toolmgr as llm_tool_mgr
 from ...platform import botmgr as im_mgr
 from ...persistence import mgr as persistencemgr
@@ -37,6 +41,9 @@ class BuildAppStage(stage.BootingStage):
         await proxy_mgr.initialize()
         ap.proxy_mgr = proxy_mgr
 
+        ap.http_client_pool = llm_http_client.HTTPClientPool(ap)
+        ap.usage_recorder = llm_accounting.UsageRecorder(ap)
+
         ver_mgr = version.VersionManager(ap)
         await ver_mgr.initialize()
         ap.ver_mgr = ver_mgr
@@ -45,7 +52,17 @@ class BuildAppStage(stage.BootingStage):
         ann_mgr = announce.AnnouncementManager(ap)
         ap.ann_mgr = ann_mgr
 
-        ap.query_pool = pool.QueryPool()
+        cpu_workers = ap.instance_config.data['concurrency'].get('cpu-workers', 0)
+        if cpu_workers > 0:
+            ap.process_pool = concurrent.futures.ProcessPoolExecutor(
+                max_workers=cpu_workers,
+                # 本进程已运行事件循环和多个线程，fork 出的子进程可能继承被其他线程持有的锁而死锁
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+
+        query_pool = pool.QueryPool(ap)
+        await query_pool.initialize()
+        ap.query_pool = query_pool
 
         log_cache = logcache.LogCache()
         ap.log_cache = log_cache
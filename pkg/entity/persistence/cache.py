@@ -0,0 +1,16 @@
+import sqlalchemy
+
+from .base import Base
+
+
+class LLMResponseCache(Base):
+    """持久化的模型回复缓存"""
+
+    __tablename__ = 'llm_response_cache'
+
+    key = sqlalchemy.Column(sqlalchemy.String(64), primary_key=True)
+    model_uuid = sqlalchemy.Column(sqlalchemy.String(255), nullable=False)
+    content = sqlalchemy.Column(sqlalchemy.Text, nullable=False)
+    latency = sqlalchemy.Column(sqlalchemy.Float, nullable=False, default=0)
+    expire_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False)
+    created_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False, server_default=sqlalchemy.func.now())
@@ -0,0 +1,21 @@
+import sqlalchemy
+
+from .base import Base
+
+
+class ArchivedSession(Base):
+    """被淘汰出内存的会话，保存其对话以便再次活跃时恢复"""
+
+    __tablename__ = 'archived_sessions'
+
+    launcher_type = sqlalchemy.Column(sqlalchemy.String(255), primary_key=True)
+    launcher_id = sqlalchemy.Column(sqlalchemy.String(255), primary_key=True)
+    conversations = sqlalchemy.Column(sqlalchemy.JSON, nullable=False, default=[])
+    using_conversation_index = sqlalchemy.Column(sqlalchemy.Integer, nullable=True)
+    created_at = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False, server_default=sqlalchemy.func.now())
+    updated_at = sqlalchemy.Column(
+        sqlalchemy.DateTime,
+        nullable=False,
+        server_default=sqlalchemy.func.now(),
+        onupdate=sqlalchemy.func.now(),
+    )
@@ -0,0 +1,28 @@
+import sqlalchemy
+
+from .base import Base
+
+
+class LLMUsageStat(Base):
+    """模型请求用量的汇总，每行为一个时段内某模型在某流水线、机器人和会话下的累计值
+
+    同一时段和维度可能有多行（每次写入一行），查询时求和。
+    """
+
+    __tablename__ = 'llm_usage_stats'
+
+    id = sqlalchemy.Column(sqlalchemy.Integer, primary_key=True, autoincrement=True)
+    period_start = sqlalchemy.Column(sqlalchemy.DateTime, nullable=False, index=True)
+    model_uuid = sqlalchemy.Column(sqlalchemy.String(255), nullable=False, index=True)
+    pipeline_uuid = sqlalchemy.Column(sqlalchemy.String(255), nullable=False, default='')
+    bot_uuid = sqlalchemy.Column(sqlalchemy.String(255), nullable=False, default='')
+    session_id = sqlalchemy.Column(sqlalchemy.String(255), nullable=False, default='')
+    request_count = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+    error_count = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+    prompt_tokens = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False, default=0)
+    completion_tokens = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False, default=0)
+    cached_tokens = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False, default=0)
+    cache_creation_tokens = sqlalchemy.Column(sqlalchemy.BigInteger, nullable=False, default=0)
+    total_latency = sqlalchemy.Column(sqlalchemy.Float, nullable=False, default=0)
+    first_token_count = sqlalchemy.Column(sqlalchemy.Integer, nullable=False, default=0)
+    total_first_token_latency = sqlalchemy.Column(sqlalchemy.Float, nullable=False, default=0)
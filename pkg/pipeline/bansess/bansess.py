@@ -17,9 +17,11 @@ class BanSessionCheckStage(stage.PipelineStage):
     async def process(self, query: core_entities.Query, stage_inst_name: str) -> entities.StageProcessResult:
         found = False
 
-        mode = query.pipeline_config['trigger']['access-control']['mode']
+        access_control = query.pipeline_settings.trigger.access_control
 
-        sess_list = query.pipeline_config['trigger']['access-control'][mode]
+        mode = access_control.mode
+
+        sess_list = access_control.session_list
 
         if (query.launcher_type.value == 'group' and 'group_*' in sess_list) or (
             query.launcher_type.value == 'person' and 'person_*' in sess_list
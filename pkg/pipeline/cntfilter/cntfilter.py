@@ -2,7 +2,7 @@ from __future__ import annotations
 
 from ...core import app
 
-from .. import stage, entities
+from .. import stage, entities, settings as pipeline_settings
 from ...core import entities as core_entities
 from . import filter as filter_model, entities as filter_entities
 from ...provider import entities as llm_entities
@@ -55,6 +55,21 @@ class ContentFilterStage(stage.PipelineStage):
         for filter in self.filter_chain:
             await filter.initialize()
 
+    def is_inert(
+        self,
+        stage_inst_name: str,
+        launcher_type: core_entities.LauncherTypes,
+        settings: pipeline_settings.PipelineSettings,
+    ) -> bool:
+        scope = settings.safety.content_filter.scope
+
+        if stage_inst_name == 'PreContentFilterStage':
+            return scope == 'output-msg'
+        elif stage_inst_name == 'PostContentFilterStage':
+            return scope == 'income-msg'
+
+        return False
+
     async def _pre_process(
         self,
         message: str,
@@ -64,7 +79,7 @@ class ContentFilterStage(stage.PipelineStage):
         只要有一个不通过就不放行，只放行 PASS 的消息
         """
 
-        if query.pipeline_config['safety']['content-filter']['scope'] == 'output-msg':
+        if query.pipeline_settings.safety.content_filter.scope == 'output-msg':
             return entities.StageProcessResult(result_type=entities.ResultType.CONTINUE, new_query=query)
         else:
             for filter in self.filter_chain:
@@ -96,7 +111,7 @@ class ContentFilterStage(stage.PipelineStage):
         """请求llm后处理响应
         只要是 PASS 或者 MASKED 的就通过此 filter，将其 replacement 设置为message，进入下一个 filter
         """
-        if query.pipeline_config['safety']['content-filter']['scope'] == 'income-msg':
+        if query.pipeline_settings.safety.content_filter.scope == 'income-msg':
             return entities.StageProcessResult(result_type=entities.ResultType.CONTINUE, new_query=query)
         else:
             message = message.strip()
@@ -17,25 +17,25 @@ class ContentIgnore(filter_model.ContentFilter):
         ]
 
     async def process(self, query: core_entities.Query, message: str) -> entities.FilterResult:
-        if 'prefix' in query.pipeline_config['trigger']['ignore-rules']:
-            for rule in query.pipeline_config['trigger']['ignore-rules']['prefix']:
-                if message.startswith(rule):
-                    return entities.FilterResult(
-                        level=entities.ResultLevel.BLOCK,
-                        replacement='',
-                        user_notice='',
-                        console_notice='根据 ignore_rules 中的 prefix 规则，忽略消息',
-                    )
-
-        if 'regexp' in query.pipeline_config['trigger']['ignore-rules']:
-            for rule in query.pipeline_config['trigger']['ignore-rules']['regexp']:
-                if re.search(rule, message):
-                    return entities.FilterResult(
-                        level=entities.ResultLevel.BLOCK,
-                        replacement='',
-                        user_notice='',
-                        console_notice='根据 ignore_rules 中的 regexp 规则，忽略消息',
-                    )
+        ignore_rules = query.pipeline_settings.trigger.ignore_rules
+
+        for rule in ignore_rules.prefix:
+            if message.startswith(rule):
+                return entities.FilterResult(
+                    level=entities.ResultLevel.BLOCK,
+                    replacement='',
+                    user_notice='',
+                    console_notice='根据 ignore_rules 中的 prefix 规则，忽略消息',
+                )
+
+        for rule in ignore_rules.regexp:
+            if re.search(rule, message):
+                return entities.FilterResult(
+                    level=entities.ResultLevel.BLOCK,
+                    replacement='',
+                    user_notice='',
+                    console_notice='根据 ignore_rules 中的 regexp 规则，忽略消息',
+                )
 
         return entities.FilterResult(
             level=entities.ResultLevel.PASS,
@@ -24,30 +24,49 @@ class Controller:
             while True:
                 selected_query: entities.Query = None
 
-                # 取请求
-                async with self.ap.query_pool:
-                    queries: list[entities.Query] = self.ap.query_pool.queries
-
-                    for query in queries:
-                        session = await self.ap.sess_mgr.get_session(query)
-                        self.ap.logger.debug(f'Checking query {query} session {session}')
-
-                        if not session.semaphore.locked():
-                            selected_query = query
-                            await session.semaphore.acquire()
-
-                            break
-
-                    if selected_query:  # 找到了
-                        queries.remove(selected_query)
-                    else:  # 没找到 说明：没有请求 或者 所有query对应的session都已达到并发上限
-                        await self.ap.query_pool.condition.wait()
-                        continue
+                # 总并发上限：先占用一个流水线名额，再由请求池按公平性策略选出请求，
+                # 以免请求在获得名额之前就已被取出，绕过公平性策略
+                await self.semaphore.acquire()
+
+                try:
+                    # 取请求
+                    async with self.ap.query_pool:
+                        while True:
+                            selected_query = self.ap.query_pool.next_query()
+
+                            if selected_query:  # 找到了
+                                break
+
+                            # 没找到 说明：没有请求 或者 所有query对应的session或bot都已达到并发上限
+                            await self.ap.query_pool.condition.wait()
+                except BaseException:
+                    self.semaphore.release()
+                    raise
+
+                try:
+                    # 获取会话可能需要从数据库恢复，在请求池的锁外进行，避免阻塞请求的加入和调度
+                    session = await self.ap.sess_mgr.get_session(selected_query)
+                    # 请求池保证该会话未达到并发上限，此处不会阻塞
+                    await session.semaphore.acquire()
+                except BaseException as e:
+                    # 请求已从请求池取出，须归还其会话的并发名额，否则该会话之后的请求不会再被调度
+                    self.semaphore.release()
+
+                    async with self.ap.query_pool:
+                        self.ap.query_pool.release_query(selected_query)
+
+                    if not isinstance(e, Exception):
+                        raise
+
+                    # 只丢弃这一个请求，不退出控制器循环
+                    self.ap.logger.error(f'获取会话失败，丢弃请求 query_id={selected_query.query_id}: {e}')
+                    self.ap.logger.error(f'Traceback: {traceback.format_exc()}')
+                    continue
 
                 if selected_query:
 
-                    async def _process_query(selected_query: entities.Query):
-                        async with self.semaphore:  # 总并发上限
+                    async def _process_query(selected_query: entities.Query, session: entities.Session):
+                        try:
                             # find pipeline
                             # Here firstly find the bot, then find the pipeline, in case the bot adapter's config is not the latest one.
                             # Like aiocqhttp, once a client is connected, even the adapter was updated and restarted, the existing client connection will not be affected.
@@ -58,14 +77,16 @@ class Controller:
                                 )
                                 if pipeline:
                                     await pipeline.run(selected_query)
+                        finally:
+                            self.semaphore.release()
+                            session.semaphore.release()
 
-                        async with self.ap.query_pool:
-                            (await self.ap.sess_mgr.get_session(selected_query)).semaphore.release()
-                            # 通知其他协程，有新的请求可以处理了
-                            self.ap.query_pool.condition.notify_all()
+                            async with self.ap.query_pool:
+                                # 归还会话和机器人的并发名额，若有请求因此可被调度，唤醒控制器
+                                self.ap.query_pool.release_query(selected_query)
 
                     self.ap.task_mgr.create_task(
-                        _process_query(selected_query),
+                        _process_query(selected_query, session),
                         kind='query',
                         name=f'query-{selected_query.query_id}',
                         scopes=[
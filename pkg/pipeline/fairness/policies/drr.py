@@ -0,0 +1,75 @@
+from __future__ import annotations
+
+import collections
+import typing
+
+from .. import policy
+
+
+MIN_WEIGHT = 0.01
+
+
+@policy.policy_class('drr')
+class DeficitRoundRobinPolicy(policy.FairnessPolicy):
+    """赤字轮转（Deficit Round Robin）
+
+    各机器人按权重轮流获得调度，每轮获得的调度次数与权重成正比。
+    """
+
+    weights: dict[str, float]
+    """机器人权重，未配置的机器人权重为 1"""
+
+    active_bots: collections.OrderedDict[str, None]
+    """有就绪会话的机器人，按轮转顺序排列"""
+
+    deficits: dict[str, float]
+    """机器人的剩余额度"""
+
+    async def initialize(self):
+        self.weights = {}
+        for bot_uuid, bot_cfg in (
+            self.ap.instance_config.data['concurrency'].get('fairness', {}).get('bots', {}).items()
+        ):
+            self.weights[bot_uuid] = max(float(bot_cfg.get('weight', 1)), MIN_WEIGHT)
+
+        self.active_bots = collections.OrderedDict()
+        self.deficits = {}
+
+    def on_bot_active(self, bot_uuid: str):
+        self.active_bots[bot_uuid] = None
+        self.deficits[bot_uuid] = 0
+
+    def on_bot_idle(self, bot_uuid: str):
+        self.active_bots.pop(bot_uuid, None)
+        self.deficits.pop(bot_uuid, None)
+
+    def select_bot(self, is_bot_available: typing.Callable[[str], bool]) -> str | None:
+        # 连续跳过的无并发余量的机器人数
+        skipped = 0
+
+        while self.active_bots and skipped < len(self.active_bots):
+            bot_uuid = next(iter(self.active_bots))
+
+            if not is_bot_available(bot_uuid):
+                self.active_bots.move_to_end(bot_uuid)
+                skipped += 1
+                continue
+
+            skipped = 0
+
+            if self.deficits[bot_uuid] < 1:
+                # 轮到该机器人，补充额度
+                self.deficits[bot_uuid] += self.weights.get(bot_uuid, 1)
+
+                if self.deficits[bot_uuid] < 1:
+                    self.active_bots.move_to_end(bot_uuid)
+                    continue
+
+            self.deficits[bot_uuid] -= 1
+
+            if self.deficits[bot_uuid] < 1:
+                self.active_bots.move_to_end(bot_uuid)
+
+            return bot_uuid
+
+        return None
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+import typing
+
+from .. import policy
+
+
+@policy.policy_class('fifo')
+class FIFOPolicy(policy.FairnessPolicy):
+    """先就绪先调度，不区分机器人"""
+
+    def select_bot(self, is_bot_available: typing.Callable[[str], bool]) -> str | None:
+        selected_bot = None
+        selected_seq = None
+
+        for bot_uuid, sessions in self.bot_ready_sessions.items():
+            if not is_bot_available(bot_uuid):
+                continue
+
+            seq = next(iter(sessions.values()))
+            if selected_seq is None or seq < selected_seq:
+                selected_bot = bot_uuid
+                selected_seq = seq
+
+        return selected_bot
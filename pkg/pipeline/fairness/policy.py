@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import abc
+import collections
+import typing
+
+from ...core import app, entities as core_entities
+
+
+SessionKey = tuple[core_entities.LauncherTypes, typing.Union[int, str]]
+"""会话键，(launcher_type, launcher_id)"""
+
+
+preregistered_policies: list[typing.Type[FairnessPolicy]] = []
+
+
+def policy_class(name: str):
+    def decorator(cls: typing.Type[FairnessPolicy]) -> typing.Type[FairnessPolicy]:
+        cls.name = name
+        preregistered_policies.append(cls)
+        return cls
+
+    return decorator
+
+
+class FairnessPolicy(metaclass=abc.ABCMeta):
+    """请求调度公平性策略抽象类
+
+    请求池把就绪的会话按机器人分组交给策略，由策略决定下一个获得调度的机器人；
+    同一机器人下的各会话轮流获得调度。
+    """
+
+    name: str = None
+
+    ap: app.Application
+
+    bot_ready_sessions: dict[str, collections.OrderedDict[SessionKey, int]]
+    """每个机器人的就绪会话，值为会话就绪时的序号"""
+
+    ready_seq: int
+    """就绪序号计数器"""
+
+    def __init__(self, ap: app.Application):
+        self.ap = ap
+        self.bot_ready_sessions = {}
+        self.ready_seq = 0
+
+    async def initialize(self):
+        pass
+
+    def push(self, bot_uuid: str, key: SessionKey):
+        """会话就绪"""
+        if bot_uuid not in self.bot_ready_sessions:
+            self.bot_ready_sessions[bot_uuid] = collections.OrderedDict()
+            self.on_bot_active(bot_uuid)
+        self.bot_ready_sessions[bot_uuid][key] = self.ready_seq
+        self.ready_seq += 1
+
+    def remove(self, bot_uuid: str, key: SessionKey):
+        """会话不再就绪"""
+        sessions = self.bot_ready_sessions.get(bot_uuid)
+        if sessions is None or key not in sessions:
+            return
+        del sessions[key]
+        if not sessions:
+            del self.bot_ready_sessions[bot_uuid]
+            self.on_bot_idle(bot_uuid)
+
+    def pop(self, is_bot_available: typing.Callable[[str], bool]) -> tuple[str, SessionKey] | None:
+        """选出下一个获得调度的会话并将其移出就绪队列
+
+        Args:
+            is_bot_available: 判断机器人是否还有并发余量
+
+        Returns:
+            (bot_uuid, 会话键)，没有可调度的会话时返回 None
+        """
+        bot_uuid = self.select_bot(is_bot_available)
+
+        if bot_uuid is None:
+            return None
+
+        key, _ = self.bot_ready_sessions[bot_uuid].popitem(last=False)
+        if not self.bot_ready_sessions[bot_uuid]:
+            del self.bot_ready_sessions[bot_uuid]
+            self.on_bot_idle(bot_uuid)
+
+        return bot_uuid, key
+
+    def has_ready(self) -> bool:
+        return bool(self.bot_ready_sessions)
+
+    def on_bot_active(self, bot_uuid: str):
+        """机器人有了就绪会话"""
+        pass
+
+    def on_bot_idle(self, bot_uuid: str):
+        """机器人不再有就绪会话"""
+        pass
+
+    @abc.abstractmethod
+    def select_bot(self, is_bot_available: typing.Callable[[str], bool]) -> str | None:
+        """从有就绪会话的机器人中选出下一个获得调度的机器人
+
+        Args:
+            is_bot_available: 判断机器人是否还有并发余量，无余量的机器人不可被选中
+
+        Returns:
+            机器人 UUID，没有可选的机器人时返回 None
+        """
+        raise NotImplementedError
@@ -78,10 +78,9 @@ class LongTextProcessStage(stage.PipelineStage):
 
         if contains_non_plain:
             self.ap.logger.debug('消息中包含非 Plain 组件，跳过长消息处理。')
-        elif (
-            len(str(query.resp_message_chain[-1]))
-            > query.pipeline_config['output']['long-text-processing']['threshold']
-        ):
+        elif query.stream_responder is not None and query.stream_responder.is_active:
+            self.ap.logger.debug('消息已流式发出，跳过长消息处理。')
+        elif len(str(query.resp_message_chain[-1])) > query.pipeline_settings.output.long_text_processing.threshold:
             query.resp_message_chain[-1] = platform_message.MessageChain(
                 await self.strategy_impl.process(str(query.resp_message_chain[-1]), query)
             )
@@ -0,0 +1,131 @@
+"""长文本转图片的绘制函数
+
+只依赖标准库和 PIL，不导入应用的其他模块，以便在以 spawn 方式启动的进程池子进程中导入。
+"""
+
+from __future__ import annotations
+
+import base64
+import functools
+import io
+import re
+
+from PIL import Image, ImageDraw, ImageFont
+
+
+@functools.lru_cache(maxsize=16)
+def get_font(font_path: str) -> ImageFont.FreeTypeFont:
+    return ImageFont.truetype(font_path, 32, encoding='utf-8')
+
+
+def index_number(path: str = '') -> list[list]:
+    """
+    查找字符串中数字所在串中的位置
+    :param path:目标字符串
+    :return:<class 'list'>: <class 'list'>: [['1', 16], ['2', 35], ['1', 51]]
+    """
+    kv = []
+    nums = []
+    beforeDatas = re.findall('[\\d]+', path)
+    for num in beforeDatas:
+        indexV = []
+        times = path.count(num)
+        if times > 1:
+            if num not in nums:
+                indexs = re.finditer(num, path)
+                for index in indexs:
+                    iV = []
+                    i = index.span()[0]
+                    iV.append(num)
+                    iV.append(i)
+                    kv.append(iV)
+            nums.append(num)
+        else:
+            index = path.find(num)
+            indexV.append(num)
+            indexV.append(index)
+            kv.append(indexV)
+    # 根据数字位置排序
+    indexSort = []
+    resultIndex = []
+    for vi in kv:
+        indexSort.append(vi[1])
+    indexSort.sort()
+    for i in indexSort:
+        for v in kv:
+            if i == v[1]:
+                resultIndex.append(v)
+    return resultIndex
+
+
+def text_to_image_base64(
+    text_str: str,
+    font_path: str,
+    width: int = 800,
+) -> str:
+    """将文本绘制为图片，返回 PNG 图片的 base64 编码
+
+    此函数不依赖应用对象，可在子进程中执行。
+    """
+    font = get_font(font_path)
+
+    text_str = text_str.replace('\t', '    ')
+
+    # 分行
+    lines = text_str.split('\n')
+
+    # 计算并分割
+    final_lines = []
+
+    text_width = width - 80
+
+    for line in lines:
+        # 如果长了就分割
+        line_width = font.getlength(line)
+        if line_width < text_width:
+            final_lines.append(line)
+            continue
+        else:
+            rest_text = line
+            while True:
+                # 分割最前面的一行
+                point = int(len(rest_text) * (text_width / line_width))
+
+                # 检查断点是否在数字中间
+                numbers = index_number(rest_text)
+
+                for number in numbers:
+                    if number[1] < point < number[1] + len(number[0]) and number[1] != 0:
+                        point = number[1]
+                        break
+
+                # 至少分出一个字符，避免死循环
+                point = max(point, 1)
+
+                final_lines.append(rest_text[:point])
+                rest_text = rest_text[point:]
+                line_width = font.getlength(rest_text)
+                if line_width < text_width:
+                    final_lines.append(rest_text)
+                    break
+                else:
+                    continue
+    # 准备画布
+    img = Image.new('RGBA', (width, max(280, len(final_lines) * 35 + 65)), (255, 255, 255, 255))
+    draw = ImageDraw.Draw(img, mode='RGBA')
+
+    # 绘制正文
+    offset_x = 20
+    offset_y = 30
+    for line_number, final_line in enumerate(final_lines):
+        draw.text(
+            (offset_x, offset_y + 35 * line_number),
+            final_line,
+            fill=(0, 0, 0),
+            font=font,
+        )
+
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG', optimize=True)
+
+    return base64.b64encode(buffer.getvalue()).decode('utf-8')
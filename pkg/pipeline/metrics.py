@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import bisect
+
+
+LATENCY_BUCKETS: tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+"""耗时直方图的桶上界（秒），最后还有一个 +Inf 桶"""
+
+
+class Histogram:
+    """固定桶的耗时直方图"""
+
+    buckets: tuple[float, ...]
+
+    counts: list[int]
+    """各桶（非累积）计数，长度为 len(buckets) + 1"""
+
+    total: float
+    """观测值之和"""
+
+    count: int
+    """观测次数"""
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        self.count += 1
+
+    def cumulative_counts(self) -> list[int]:
+        """各桶累积计数，与 Prometheus 的 le 语义一致"""
+        result = []
+        acc = 0
+        for c in self.counts:
+            acc += c
+            result.append(acc)
+        return result
+
+    def quantile(self, q: float) -> float:
+        """按桶内线性插值估算分位数"""
+        if self.count == 0:
+            return 0.0
+
+        rank = q * self.count
+        acc = 0
+        for i, c in enumerate(self.counts):
+            if c and acc + c >= rank:
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if i >= len(self.buckets):
+                    # 落在 +Inf 桶中，只能返回最后一个有限上界
+                    return lower
+                return lower + (self.buckets[i] - lower) * (rank - acc) / c
+            acc += c
+
+        return self.buckets[-1]
+
+
+class StageMetrics:
+    """单个流水线阶段的耗时与结果统计"""
+
+    latency: Histogram
+    """阶段自身耗时，不含生成器阶段分叉出的后续阶段"""
+
+    continue_count: int
+
+    interrupt_count: int
+
+    error_count: int
+
+    def __init__(self):
+        self.latency = Histogram()
+        self.continue_count = 0
+        self.interrupt_count = 0
+        self.error_count = 0
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.latency.count,
+            'total_seconds': self.latency.total,
+            'p50_seconds': self.latency.quantile(0.5),
+            'p95_seconds': self.latency.quantile(0.95),
+            'p99_seconds': self.latency.quantile(0.99),
+            'continue': self.continue_count,
+            'interrupt': self.interrupt_count,
+            'error': self.error_count,
+        }
+
+
+class PipelineMetrics:
+    """所有流水线的阶段统计
+
+    由 PipelineManager 持有，流水线重新加载（如修改配置）后统计延续。
+    """
+
+    stages: dict[tuple[str, str], StageMetrics]
+    """键为 (流水线 UUID, 阶段实例名)"""
+
+    pipeline_names: dict[str, str]
+    """流水线 UUID 到名称"""
+
+    first_token_latency: dict[str, Histogram]
+    """流式输出时，从开始请求模型到收到首个增量片段的耗时，键为流水线 UUID"""
+
+    def __init__(self):
+        self.stages = {}
+        self.pipeline_names = {}
+        self.first_token_latency = {}
+
+    def get_stage_metrics(self, pipeline_uuid: str, stage_inst_name: str) -> StageMetrics:
+        key = (pipeline_uuid, stage_inst_name)
+        if key not in self.stages:
+            self.stages[key] = StageMetrics()
+        return self.stages[key]
+
+    def observe_first_token(self, pipeline_uuid: str, seconds: float):
+        if pipeline_uuid not in self.first_token_latency:
+            self.first_token_latency[pipeline_uuid] = Histogram()
+        self.first_token_latency[pipeline_uuid].observe(seconds)
+
+    def remove_pipeline(self, pipeline_uuid: str):
+        for key in [key for key in self.stages if key[0] == pipeline_uuid]:
+            del self.stages[key]
+        self.pipeline_names.pop(pipeline_uuid, None)
+        self.first_token_latency.pop(pipeline_uuid, None)
+
+    def to_dict(self) -> list[dict]:
+        pipelines: dict[str, dict] = {}
+
+        def get_entry(pipeline_uuid: str) -> dict:
+            if pipeline_uuid not in pipelines:
+                pipelines[pipeline_uuid] = {
+                    'uuid': pipeline_uuid,
+                    'name': self.pipeline_names.get(pipeline_uuid, ''),
+                    'stages': {},
+                    'first_token': None,
+                }
+            return pipelines[pipeline_uuid]
+
+        for (pipeline_uuid, stage_inst_name), stage_metrics in self.stages.items():
+            get_entry(pipeline_uuid)['stages'][stage_inst_name] = stage_metrics.to_dict()
+
+        for pipeline_uuid, histogram in self.first_token_latency.items():
+            get_entry(pipeline_uuid)['first_token'] = {
+                'count': histogram.count,
+                'p50_seconds': histogram.quantile(0.5),
+                'p95_seconds': histogram.quantile(0.95),
+                'p99_seconds': histogram.quantile(0.99),
+            }
+
+        return list(pipelines.values())
+
+    def to_prometheus(self) -> str:
+        """导出为 Prometheus 文本格式"""
+        lines = [
+            '# HELP langbot_pipeline_stage_duration_seconds Wall time spent in a pipeline stage.',
+            '# TYPE langbot_pipeline_stage_duration_seconds histogram',
+        ]
+
+        for (pipeline_uuid, stage_inst_name), stage_metrics in self.stages.items():
+            labels = f'pipeline="{pipeline_uuid}",stage="{stage_inst_name}"'
+            histogram = stage_metrics.latency
+            cumulative = histogram.cumulative_counts()
+
+            for bound, count in zip(histogram.buckets, cumulative):
+                lines.append(f'langbot_pipeline_stage_duration_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'langbot_pipeline_stage_duration_seconds_bucket{{{labels},le="+Inf"}} {cumulative[-1]}')
+            lines.append(f'langbot_pipeline_stage_duration_seconds_sum{{{labels}}} {histogram.total}')
+            lines.append(f'langbot_pipeline_stage_duration_seconds_count{{{labels}}} {histogram.count}')
+
+        lines.append('# HELP langbot_pipeline_stage_results_total Results produced by a pipeline stage.')
+        lines.append('# TYPE langbot_pipeline_stage_results_total counter')
+
+        for (pipeline_uuid, stage_inst_name), stage_metrics in self.stages.items():
+            labels = f'pipeline="{pipeline_uuid}",stage="{stage_inst_name}"'
+            lines.append(
+                f'langbot_pipeline_stage_results_total{{{labels},result="continue"}} {stage_metrics.continue_count}'
+            )
+            lines.append(
+                f'langbot_pipeline_stage_results_total{{{labels},result="interrupt"}} {stage_metrics.interrupt_count}'
+            )
+            lines.append(f'langbot_pipeline_stage_results_total{{{labels},result="error"}} {stage_metrics.error_count}')
+
+        lines.append(
+            '# HELP langbot_llm_time_to_first_token_seconds Time from a streaming model request to its first delta.'
+        )
+        lines.append('# TYPE langbot_llm_time_to_first_token_seconds histogram')
+
+        for pipeline_uuid, histogram in self.first_token_latency.items():
+            labels = f'pipeline="{pipeline_uuid}"'
+            cumulative = histogram.cumulative_counts()
+
+            for bound, count in zip(histogram.buckets, cumulative):
+                lines.append(f'langbot_llm_time_to_first_token_seconds_bucket{{{labels},le="{bound}"}} {count}')
+            lines.append(f'langbot_llm_time_to_first_token_seconds_bucket{{{labels},le="+Inf"}} {cumulative[-1]}')
+            lines.append(f'langbot_llm_time_to_first_token_seconds_sum{{{labels}}} {histogram.total}')
+            lines.append(f'langbot_llm_time_to_first_token_seconds_count{{{labels}}} {histogram.count}')
+
+        return '\n'.join(lines) + '\n'
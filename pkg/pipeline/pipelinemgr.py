@@ -1,14 +1,17 @@
 from __future__ import annotations
 
-import typing
+import inspect
+import logging
+import time
 import traceback
 
+import pydantic.v1 as pydantic
 import sqlalchemy
 
 from ..core import app, entities
 from . import entities as pipeline_entities
 from ..entity.persistence import pipeline as persistence_pipeline
-from . import stage
+from . import stage, settings as pipeline_settings, metrics as pipeline_metrics
 from ..platform.types import message as platform_message, events as platform_events
 from ..plugin import events
 from ..utils import importutil
@@ -49,9 +52,22 @@ class StageInstContainer:
 
     inst: stage.PipelineStage
 
-    def __init__(self, inst_name: str, inst: stage.PipelineStage):
+    is_async_gen: bool
+    """process 是否为异步生成器函数，是则其返回值无需 await"""
+
+    metrics: pipeline_metrics.StageMetrics
+    """此阶段的耗时与结果统计"""
+
+    def __init__(
+        self,
+        inst_name: str,
+        inst: stage.PipelineStage,
+        metrics: pipeline_metrics.StageMetrics | None = None,
+    ):
         self.inst_name = inst_name
         self.inst = inst
+        self.is_async_gen = inspect.isasyncgenfunction(inst.process)
+        self.metrics = metrics if metrics is not None else pipeline_metrics.StageMetrics()
 
 
 class RuntimePipeline:
@@ -65,18 +81,54 @@ class RuntimePipeline:
     stage_containers: list[StageInstContainer]
     """阶段实例容器"""
 
+    settings: pipeline_settings.PipelineSettings
+    """流水线配置快照"""
+
+    execution_plans: dict[entities.LauncherTypes, list[StageInstContainer]]
+    """各请求者类型的执行计划，已剔除在当前配置下无作用的阶段"""
+
     def __init__(
         self,
         ap: app.Application,
         pipeline_entity: persistence_pipeline.LegacyPipeline,
         stage_containers: list[StageInstContainer],
+        settings: pipeline_settings.PipelineSettings,
     ):
         self.ap = ap
         self.pipeline_entity = pipeline_entity
         self.stage_containers = stage_containers
+        self.settings = settings
+        self.execution_plans = self.compile_execution_plans()
+
+    def compile_execution_plans(self) -> dict[entities.LauncherTypes, list[StageInstContainer]]:
+        """按请求者类型编译执行计划
+
+        流水线配置变更时会重新加载流水线，因此计划在流水线生命周期内保持不变。
+        """
+        plans = {}
+
+        for launcher_type in entities.LauncherTypes:
+            plans[launcher_type] = [
+                stage_container
+                for stage_container in self.stage_containers
+                if not stage_container.inst.is_inert(stage_container.inst_name, launcher_type, self.settings)
+            ]
+
+            skipped = [
+                stage_container.inst_name
+                for stage_container in self.stage_containers
+                if stage_container not in plans[launcher_type]
+            ]
+            if skipped:
+                self.ap.logger.debug(
+                    f'Pipeline {self.pipeline_entity.uuid} skips stages {skipped} for {launcher_type.value} queries'
+                )
+
+        return plans
 
     async def run(self, query: entities.Query):
         query.pipeline_config = self.pipeline_entity.config
+        query.pipeline_settings = self.settings
         await self.process_query(query)
 
     async def _check_output(self, query: entities.Query, result: pipeline_entities.StageProcessResult):
@@ -89,7 +141,7 @@ class RuntimePipeline:
             elif isinstance(result.user_notice, list):
                 result.user_notice = platform_message.MessageChain(*result.user_notice)
 
-            if query.pipeline_config['output']['misc']['at-sender'] and isinstance(
+            if query.pipeline_settings.output.misc.at_sender and isinstance(
                 query.message_event, platform_events.GroupMessage
             ):
                 result.user_notice.insert(0, platform_message.At(query.message_event.sender.id))
@@ -97,7 +149,7 @@ class RuntimePipeline:
             await query.adapter.reply_message(
                 message_source=query.message_event,
                 message=result.user_notice,
-                quote_origin=query.pipeline_config['output']['misc']['quote-origin'],
+                quote_origin=query.pipeline_settings.output.misc.quote_origin,
             )
         if result.debug_notice:
             self.ap.logger.debug(result.debug_notice)
@@ -131,40 +183,86 @@ class RuntimePipeline:
                 A B C D E F G C D E F G C D E F G ...
             Q3: 但是如果不止一个stage会返回生成器呢？
         """
+        plan = self.execution_plans[query.launcher_type]
+        debug = self.ap.logger.isEnabledFor(logging.DEBUG)
+
         i = stage_index
 
-        while i < len(self.stage_containers):
-            stage_container = self.stage_containers[i]
+        while i < len(plan):
+            stage_container = plan[i]
 
             query.current_stage = stage_container  # 标记到 Query 对象里
 
-            result = stage_container.inst.process(query, stage_container.inst_name)
+            stage_metrics = stage_container.metrics
 
-            if isinstance(result, typing.Coroutine):
-                result = await result
+            started = time.perf_counter()
+            try:
+                result = stage_container.inst.process(query, stage_container.inst_name)
+
+                if not stage_container.is_async_gen:
+                    result = await result
+            except Exception:
+                stage_metrics.error_count += 1
+                stage_metrics.latency.observe(time.perf_counter() - started)
+                raise
 
             if isinstance(result, pipeline_entities.StageProcessResult):  # 直接返回结果
-                self.ap.logger.debug(f'Stage {stage_container.inst_name} processed query {query} res {result}')
+                stage_metrics.latency.observe(time.perf_counter() - started)
+                if result.result_type == pipeline_entities.ResultType.INTERRUPT:
+                    stage_metrics.interrupt_count += 1
+                else:
+                    stage_metrics.continue_count += 1
+
+                if debug:
+                    self.ap.logger.debug(f'Stage {stage_container.inst_name} processed query {query} res {result}')
                 await self._check_output(query, result)
 
                 if result.result_type == pipeline_entities.ResultType.INTERRUPT:
-                    self.ap.logger.debug(f'Stage {stage_container.inst_name} interrupted query {query}')
+                    if debug:
+                        self.ap.logger.debug(f'Stage {stage_container.inst_name} interrupted query {query}')
                     break
                 elif result.result_type == pipeline_entities.ResultType.CONTINUE:
                     query = result.new_query
-            elif isinstance(result, typing.AsyncGenerator):  # 生成器
-                self.ap.logger.debug(f'Stage {stage_container.inst_name} processed query {query} gen')
-
-                async for sub_result in result:
-                    self.ap.logger.debug(f'Stage {stage_container.inst_name} processed query {query} res {sub_result}')
-                    await self._check_output(query, sub_result)
-
-                    if sub_result.result_type == pipeline_entities.ResultType.INTERRUPT:
-                        self.ap.logger.debug(f'Stage {stage_container.inst_name} interrupted query {query}')
-                        break
-                    elif sub_result.result_type == pipeline_entities.ResultType.CONTINUE:
-                        query = sub_result.new_query
-                        await self._execute_from_stage(i + 1, query)
+            else:  # 生成器
+                if debug:
+                    self.ap.logger.debug(f'Stage {stage_container.inst_name} processed query {query} gen')
+
+                # 只统计生成器自身产出结果的耗时，不含分叉出的后续阶段
+                elapsed = 0.0
+                try:
+                    while True:
+                        try:
+                            sub_result = await result.__anext__()
+                        except StopAsyncIteration:
+                            break
+                        except Exception:
+                            stage_metrics.error_count += 1
+                            raise
+                        finally:
+                            elapsed += time.perf_counter() - started
+
+                        if sub_result.result_type == pipeline_entities.ResultType.INTERRUPT:
+                            stage_metrics.interrupt_count += 1
+                        else:
+                            stage_metrics.continue_count += 1
+
+                        if debug:
+                            self.ap.logger.debug(
+                                f'Stage {stage_container.inst_name} processed query {query} res {sub_result}'
+                            )
+                        await self._check_output(query, sub_result)
+
+                        if sub_result.result_type == pipeline_entities.ResultType.INTERRUPT:
+                            if debug:
+                                self.ap.logger.debug(f'Stage {stage_container.inst_name} interrupted query {query}')
+                            break
+                        elif sub_result.result_type == pipeline_entities.ResultType.CONTINUE:
+                            query = sub_result.new_query
+                            await self._execute_from_stage(i + 1, query)
+
+                        started = time.perf_counter()
+                finally:
+                    stage_metrics.latency.observe(elapsed)
                 break
 
             i += 1
@@ -192,7 +290,8 @@ class RuntimePipeline:
             if event_ctx.is_prevented_default():
                 return
 
-            self.ap.logger.debug(f'Processing query {query}')
+            if self.ap.logger.isEnabledFor(logging.DEBUG):
+                self.ap.logger.debug(f'Processing query {query}')
 
             await self._execute_from_stage(0, query)
         except Exception as e:
@@ -200,7 +299,8 @@ class RuntimePipeline:
             self.ap.logger.error(f'处理请求时出错 query_id={query.query_id} stage={inst_name} : {e}')
             self.ap.logger.error(f'Traceback: {traceback.format_exc()}')
         finally:
-            self.ap.logger.debug(f'Query {query} processed')
+            if self.ap.logger.isEnabledFor(logging.DEBUG):
+                self.ap.logger.debug(f'Query {query} processed')
 
 
 class PipelineManager:
@@ -214,9 +314,13 @@ class PipelineManager:
 
     stage_dict: dict[str, type[stage.PipelineStage]]
 
+    metrics: pipeline_metrics.PipelineMetrics
+    """各流水线阶段的耗时与结果统计"""
+
     def __init__(self, ap: app.Application):
         self.ap = ap
         self.pipelines = []
+        self.metrics = pipeline_metrics.PipelineMetrics()
 
     async def initialize(self):
         self.stage_dict = {name: cls for name, cls in stage.preregistered_stages.items()}
@@ -232,7 +336,10 @@ class PipelineManager:
 
         # load pipelines
         for pipeline in pipelines:
-            await self.load_pipeline(pipeline)
+            try:
+                await self.load_pipeline(pipeline)
+            except pydantic.ValidationError as e:
+                self.ap.logger.error(f'流水线 {pipeline.uuid} 配置无效，已跳过加载: {e}')
 
     async def load_pipeline(
         self,
@@ -248,13 +355,30 @@ class PipelineManager:
         # initialize stage containers according to pipeline_entity.stages
         stage_containers: list[StageInstContainer] = []
         for stage_name in pipeline_entity.stages:
-            stage_containers.append(StageInstContainer(inst_name=stage_name, inst=self.stage_dict[stage_name](self.ap)))
+            stage_containers.append(
+                StageInstContainer(
+                    inst_name=stage_name,
+                    inst=self.stage_dict[stage_name](self.ap),
+                    metrics=self.metrics.get_stage_metrics(pipeline_entity.uuid, stage_name),
+                )
+            )
 
         for stage_container in stage_containers:
             await stage_container.inst.initialize(pipeline_entity.config)
 
-        runtime_pipeline = RuntimePipeline(self.ap, pipeline_entity, stage_containers)
-        self.pipelines.append(runtime_pipeline)
+        # 在阶段初始化之后解析，以包含阶段对配置的修正（如长文本策略回退）
+        settings = pipeline_settings.PipelineSettings.from_config(pipeline_entity.config)
+
+        runtime_pipeline = RuntimePipeline(self.ap, pipeline_entity, stage_containers, settings)
+
+        # 重新加载时在新流水线构建完成后才替换旧的，构建失败时旧流水线继续运行
+        for index, pipeline in enumerate(self.pipelines):
+            if pipeline.pipeline_entity.uuid == pipeline_entity.uuid:
+                self.pipelines[index] = runtime_pipeline
+                break
+        else:
+            self.pipelines.append(runtime_pipeline)
+        self.metrics.pipeline_names[pipeline_entity.uuid] = pipeline_entity.name
 
     async def get_pipeline_by_uuid(self, uuid: str) -> RuntimePipeline | None:
         for pipeline in self.pipelines:
@@ -1,30 +1,237 @@
 from __future__ import annotations
 
 import asyncio
+import collections
+import time
 import typing
 
-from ..core import entities
+from ..core import app, entities
 from ..platform import adapter as msadapter
 from ..platform.types import message as platform_message
 from ..platform.types import events as platform_events
+from ..utils import importutil
+from . import settings as pipeline_settings
+from .fairness import policy as fairness_policy
+from .fairness import policies
+
+importutil.import_modules_in_pkg(policies)
+
+
+SessionKey = fairness_policy.SessionKey
+
+
+OVERFLOW_POLICIES = ('drop-oldest', 'drop-newest', 'reply-busy')
+"""请求池满时的处理方式：丢弃最旧的请求、丢弃新请求、丢弃新请求并回复繁忙提示"""
 
 
 class QueryPool:
-    """请求池，请求获得调度进入pipeline之前，保存在这里"""
+    """请求池，请求获得调度进入pipeline之前，保存在这里
+
+    每个会话维护一个 FIFO 队列，另外维护一个"就绪会话"集合，
+    其中只包含有待处理请求且未达到会话并发上限的会话，
+    因此取出下一个请求和释放会话都无需遍历所有请求。
+    就绪会话按机器人分组，由公平性策略决定各机器人获得调度的顺序。
+
+    请求池可设置全局和单会话的待处理请求数上限，以及请求的最长排队时间，
+    超出上限或排队超时的请求会被丢弃，以免后端阻塞时请求无限堆积。
+
+    流水线启用消息合并时，同一会话中同一发送者连续发送的消息会被合并为一个请求，
+    新请求会先等待一个窗口期，以便合并随后到达的消息。
+    """
+
+    ap: app.Application
 
     query_id_counter: int = 0
 
     pool_lock: asyncio.Lock
 
-    queries: list[entities.Query]
-
     condition: asyncio.Condition
 
-    def __init__(self):
+    session_concurrency: int
+    """单个会话的并发上限"""
+
+    session_queues: dict[SessionKey, collections.deque[entities.Query]]
+    """每个会话的待处理请求队列"""
+
+    running_counts: dict[SessionKey, int]
+    """每个会话正在处理的请求数"""
+
+    ready_sessions: dict[SessionKey, str]
+    """就绪会话：有待处理请求且未达到并发上限的会话，值为其队首请求所属的机器人"""
+
+    policy: fairness_policy.FairnessPolicy
+    """公平性策略"""
+
+    bot_concurrency: dict[str, int]
+    """各机器人的并发上限，未配置的机器人不限制"""
+
+    bot_running_counts: dict[str, int]
+    """每个机器人正在处理的请求数"""
+
+    bot_pending_counts: dict[str, int]
+    """每个机器人的待处理请求数"""
+
+    pending_count: int
+    """待处理请求总数"""
+
+    enqueue_order: collections.OrderedDict[int, tuple[entities.Query, float]]
+    """所有待处理请求，按入池先后排列，键为请求ID，值为 (请求, 入池时间)"""
+
+    max_pending: int
+    """全局待处理请求数上限，0 为不限制"""
+
+    max_pending_per_session: int
+    """单会话待处理请求数上限，0 为不限制"""
+
+    overflow_policy: str
+    """超出上限时的处理方式，见 OVERFLOW_POLICIES"""
+
+    busy_message: str
+    """overflow_policy 为 reply-busy 时回复给用户的提示"""
+
+    deadline: float
+    """请求最长排队秒数，超时的请求在进入流水线前被丢弃，0 为不限制"""
+
+    shed_counts: dict[str, int]
+    """各原因丢弃的请求数"""
+
+    merge_counts: dict[int, int]
+    """待处理请求已合并的消息数，键为请求ID"""
+
+    hold_tasks: dict[int, asyncio.Task]
+    """处于合并窗口期的请求的计时任务，键为请求ID，窗口期内的请求不会被调度"""
+
+    coalesced_count: int
+    """被合并进其他请求的消息数"""
+
+    def __init__(self, ap: app.Application):
+        self.ap = ap
         self.query_id_counter = 0
         self.pool_lock = asyncio.Lock()
-        self.queries = []
         self.condition = asyncio.Condition(self.pool_lock)
+        self.session_concurrency = self.ap.instance_config.data['concurrency']['session']
+        self.session_queues = {}
+        self.running_counts = {}
+        self.ready_sessions = {}
+        self.bot_concurrency = {}
+        self.bot_running_counts = {}
+        self.bot_pending_counts = {}
+        self.pending_count = 0
+        self.enqueue_order = collections.OrderedDict()
+        self.shed_counts = {policy: 0 for policy in OVERFLOW_POLICIES}
+        self.shed_counts['expired'] = 0
+        self.merge_counts = {}
+        self.hold_tasks = {}
+        self.coalesced_count = 0
+
+    async def initialize(self):
+        queue_cfg = self.ap.instance_config.data['concurrency'].get('queue', {})
+
+        self.max_pending = queue_cfg.get('max-pending', 0)
+        self.max_pending_per_session = queue_cfg.get('max-pending-per-session', 0)
+        self.overflow_policy = queue_cfg.get('overflow-policy', 'drop-oldest')
+        self.busy_message = queue_cfg.get('busy-message', '当前请求过多，请稍后再试。')
+        self.deadline = queue_cfg.get('deadline', 0)
+
+        if self.overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f'未知的请求池溢出处理方式: {self.overflow_policy}')
+
+        fairness_cfg = self.ap.instance_config.data['concurrency'].get('fairness', {})
+
+        policy_name = fairness_cfg.get('policy', 'drr')
+
+        for policy_cls in fairness_policy.preregistered_policies:
+            if policy_cls.name == policy_name:
+                self.policy = policy_cls(self.ap)
+                break
+        else:
+            raise ValueError(f'未知的调度公平性策略: {policy_name}')
+
+        await self.policy.initialize()
+
+        for bot_uuid, bot_cfg in fairness_cfg.get('bots', {}).items():
+            if bot_cfg.get('max-concurrency'):
+                self.bot_concurrency[bot_uuid] = bot_cfg['max-concurrency']
+
+    @staticmethod
+    def get_session_key(query: entities.Query) -> SessionKey:
+        return (query.launcher_type, query.launcher_id)
+
+    def _mark_ready(self, key: SessionKey):
+        """若会话有待处理请求且未达到并发上限，将其交给公平性策略排队"""
+        if key in self.ready_sessions:
+            return
+        if (
+            key in self.session_queues
+            and self.running_counts.get(key, 0) < self.session_concurrency
+            and self.session_queues[key][0].query_id not in self.hold_tasks
+        ):
+            bot_uuid = self.session_queues[key][0].bot_uuid
+            self.ready_sessions[key] = bot_uuid
+            self.policy.push(bot_uuid, key)
+
+    def _unmark_ready(self, key: SessionKey):
+        """将会话移出就绪队列"""
+        bot_uuid = self.ready_sessions.pop(key, None)
+        if bot_uuid is not None:
+            self.policy.remove(bot_uuid, key)
+
+    def _take_head(self, key: SessionKey) -> entities.Query:
+        """从会话队列头部取出请求，并更新待处理计数"""
+        queue = self.session_queues[key]
+        query = queue.popleft()
+        if not queue:
+            del self.session_queues[key]
+
+        del self.enqueue_order[query.query_id]
+        self.merge_counts.pop(query.query_id, None)
+
+        hold_task = self.hold_tasks.pop(query.query_id, None)
+        if hold_task is not None:
+            hold_task.cancel()
+
+        self.pending_count -= 1
+        self.bot_pending_counts[query.bot_uuid] -= 1
+        if not self.bot_pending_counts[query.bot_uuid]:
+            del self.bot_pending_counts[query.bot_uuid]
+
+        return query
+
+    def _shed_head(self, key: SessionKey, reason: str) -> entities.Query:
+        """丢弃会话队首的请求"""
+        self._unmark_ready(key)
+        query = self._take_head(key)
+        self._mark_ready(key)
+
+        self.shed_counts[reason] += 1
+        self._notify_if_idle(key)
+
+        return query
+
+    def _expire_queries(self):
+        """丢弃排队超时的请求"""
+        if not self.deadline:
+            return
+
+        expire_before = time.monotonic() - self.deadline
+
+        while self.enqueue_order:
+            query, enqueue_time = next(iter(self.enqueue_order.values()))
+
+            if enqueue_time >= expire_before:
+                break
+
+            # 全局最旧的请求必然位于其会话队列的队首
+            self._shed_head(self.get_session_key(query), 'expired')
+            self.ap.logger.info(
+                f'请求排队超过 {self.deadline} 秒，已丢弃 query_id={query.query_id} {query.launcher_type.value}_{query.launcher_id}'
+            )
+
+    def is_bot_available(self, bot_uuid: str) -> bool:
+        """机器人是否还有并发余量"""
+        if bot_uuid not in self.bot_concurrency:
+            return True
+        return self.bot_running_counts.get(bot_uuid, 0) < self.bot_concurrency[bot_uuid]
 
     async def add_query(
         self,
@@ -35,8 +242,28 @@ class QueryPool:
         message_event: platform_events.MessageEvent,
         message_chain: platform_message.MessageChain,
         adapter: msadapter.MessagePlatformAdapter,
-    ) -> entities.Query:
+    ) -> entities.Query | None:
+        """添加请求
+
+        Returns:
+            添加的请求，若请求因请求池已满被拒绝则返回 None
+        """
+        rejected = False
+
+        coalescing_cfg = await self._get_coalescing_config(bot_uuid)
+
         async with self.condition:
+            self._expire_queries()
+
+            key = (launcher_type, launcher_id)
+
+            if coalescing_cfg.enable:
+                merged_query = self._try_merge(key, bot_uuid, sender_id, message_chain, coalescing_cfg)
+
+                if merged_query is not None:
+                    self.query_id_counter += 1
+                    return merged_query
+
             query = entities.Query(
                 bot_uuid=bot_uuid,
                 query_id=self.query_id_counter,
@@ -49,9 +276,227 @@ class QueryPool:
                 resp_message_chain=[],
                 adapter=adapter,
             )
-            self.queries.append(query)
+
             self.query_id_counter += 1
-            self.condition.notify_all()
+
+            session_full = (
+                self.max_pending_per_session and len(self.session_queues.get(key, ())) >= self.max_pending_per_session
+            )
+            pool_full = self.max_pending and self.pending_count >= self.max_pending
+
+            if session_full or pool_full:
+                if self.overflow_policy == 'drop-oldest':
+                    victim_key = (
+                        key if session_full else self.get_session_key(next(iter(self.enqueue_order.values()))[0])
+                    )
+                    dropped = self._shed_head(victim_key, 'drop-oldest')
+                    self.ap.logger.info(
+                        f'请求池已满，丢弃最旧的请求 query_id={dropped.query_id} {dropped.launcher_type.value}_{dropped.launcher_id}'
+                    )
+                else:
+                    self.shed_counts[self.overflow_policy] += 1
+                    self.ap.logger.info(f'请求池已满，拒绝请求 {launcher_type.value}_{launcher_id}')
+                    rejected = True
+
+            if not rejected:
+                self._enqueue(key, query)
+
+                if coalescing_cfg.enable:
+                    self.merge_counts[query.query_id] = 1
+                    self._hold(key, query, coalescing_cfg.window)
+
+        if rejected:
+            if self.overflow_policy == 'reply-busy':
+                try:
+                    await adapter.reply_message(
+                        message_source=message_event,
+                        message=platform_message.MessageChain([platform_message.Plain(self.busy_message)]),
+                        quote_origin=True,
+                    )
+                except Exception as e:
+                    self.ap.logger.error(f'回复繁忙提示失败: {e}')
+            return None
+
+        return query
+
+    async def _get_coalescing_config(self, bot_uuid: str) -> pipeline_settings.MessageCoalescingSettings:
+        """获取机器人所用流水线的消息合并配置"""
+        bot = await self.ap.platform_mgr.get_bot_by_uuid(bot_uuid)
+        if bot is None:
+            return pipeline_settings.MessageCoalescingSettings()
+
+        pipeline = await self.ap.pipeline_mgr.get_pipeline_by_uuid(bot.bot_entity.use_pipeline_uuid)
+        if pipeline is None:
+            return pipeline_settings.MessageCoalescingSettings()
+
+        return pipeline.settings.trigger.message_coalescing
+
+    def _try_merge(
+        self,
+        key: SessionKey,
+        bot_uuid: str,
+        sender_id: typing.Union[int, str],
+        message_chain: platform_message.MessageChain,
+        coalescing_cfg: pipeline_settings.MessageCoalescingSettings,
+    ) -> entities.Query | None:
+        """尝试将消息合并到该会话中同一发送者尚未调度的最后一个请求
+
+        Returns:
+            合并后的请求，无法合并时返回 None
+        """
+        queue = self.session_queues.get(key)
+        if not queue:
+            return None
+
+        last_query = queue[-1]
+
+        if last_query.bot_uuid != bot_uuid or last_query.sender_id != sender_id:
+            return None
+
+        max_merge = coalescing_cfg.max_merge
+        if self.merge_counts.get(last_query.query_id, 1) >= max_merge:
+            return None
+
+        # 消息源等元信息只保留第一条消息的
+        appended = [
+            component
+            for component in message_chain
+            if not isinstance(component, (platform_message.Source, platform_message.Quote))
+        ]
+
+        last_query.message_chain = platform_message.MessageChain(
+            [*last_query.message_chain, platform_message.Plain('\n'), *appended]
+        )
+
+        self.merge_counts[last_query.query_id] = self.merge_counts.get(last_query.query_id, 1) + 1
+        self.coalesced_count += 1
+
+        if self.merge_counts[last_query.query_id] >= max_merge:
+            # 已达合并上限，无需再等待
+            self._unhold(key, last_query)
+        else:
+            self._hold(key, last_query, coalescing_cfg.window)
+
+        return last_query
+
+    def _hold(self, key: SessionKey, query: entities.Query, window: float):
+        """使请求等待一个合并窗口期，窗口期内再次调用会重新计时"""
+        if not window:
+            self._unhold(key, query)
+            return
+
+        hold_task = self.hold_tasks.pop(query.query_id, None)
+        if hold_task is not None:
+            hold_task.cancel()
+
+        if self.session_queues[key][0] is query:
+            self._unmark_ready(key)
+
+        async def _release_after_window():
+            await asyncio.sleep(window)
+
+            async with self.condition:
+                if self.hold_tasks.get(query.query_id) is not asyncio.current_task():
+                    return
+                self._unhold(key, query)
+
+        self.hold_tasks[query.query_id] = asyncio.create_task(_release_after_window())
+
+    def _unhold(self, key: SessionKey, query: entities.Query):
+        """结束请求的合并窗口期，调用方需持有请求池的锁"""
+        hold_task = self.hold_tasks.pop(query.query_id, None)
+        if hold_task is not None and hold_task is not asyncio.current_task():
+            hold_task.cancel()
+
+        self._mark_ready(key)
+        if key in self.ready_sessions:
+            self.condition.notify()
+
+    def _enqueue(self, key: SessionKey, query: entities.Query):
+        """请求入队，调用方需持有请求池的锁"""
+        if key not in self.session_queues:
+            self.session_queues[key] = collections.deque()
+        self.session_queues[key].append(query)
+        self.enqueue_order[query.query_id] = (query, time.monotonic())
+
+        self.pending_count += 1
+        self.bot_pending_counts[query.bot_uuid] = self.bot_pending_counts.get(query.bot_uuid, 0) + 1
+
+        self._mark_ready(key)
+        self.condition.notify()
+
+    def next_query(self) -> entities.Query | None:
+        """取出下一个可处理的请求，并占用其会话的一个并发名额
+
+        调用方需持有请求池的锁。没有可处理的请求时返回 None。
+        """
+        self._expire_queries()
+
+        selected = self.policy.pop(self.is_bot_available)
+
+        if selected is None:
+            return None
+
+        bot_uuid, key = selected
+        del self.ready_sessions[key]
+
+        query = self._take_head(key)
+
+        self.running_counts[key] = self.running_counts.get(key, 0) + 1
+        self.bot_running_counts[bot_uuid] = self.bot_running_counts.get(bot_uuid, 0) + 1
+
+        # 仍有余量的会话重新排到其机器人的就绪队列末尾，使各会话轮流获得调度
+        self._mark_ready(key)
+
+        return query
+
+    def is_session_active(self, key: SessionKey) -> bool:
+        """会话是否有正在处理或待处理的请求"""
+        return key in self.running_counts or key in self.session_queues
+
+    def release_query(self, query: entities.Query):
+        """请求处理完毕，归还其会话的并发名额
+
+        调用方需持有请求池的锁。
+        """
+        key = self.get_session_key(query)
+
+        running = self.running_counts.get(key, 0) - 1
+        if running > 0:
+            self.running_counts[key] = running
+        else:
+            self.running_counts.pop(key, None)
+
+        bot_running = self.bot_running_counts.get(query.bot_uuid, 0) - 1
+        if bot_running > 0:
+            self.bot_running_counts[query.bot_uuid] = bot_running
+        else:
+            self.bot_running_counts.pop(query.bot_uuid, None)
+
+        self._mark_ready(key)
+        if self.policy.has_ready():
+            self.condition.notify()
+
+        self._notify_if_idle(key)
+
+    def _notify_if_idle(self, key: SessionKey):
+        """会话已没有正在处理或待处理的请求时通知会话管理器，使其重新成为淘汰候选"""
+        if not self.is_session_active(key) and self.ap.sess_mgr is not None:
+            self.ap.sess_mgr.on_session_idle(key)
+
+    def get_shed_counts(self) -> dict[str, int]:
+        """获取各原因丢弃的请求数"""
+        return dict(self.shed_counts)
+
+    def get_bot_queue_depths(self) -> dict[str, dict[str, int]]:
+        """获取各机器人的待处理和正在处理的请求数"""
+        return {
+            bot_uuid: {
+                'pending': self.bot_pending_counts.get(bot_uuid, 0),
+                'running': self.bot_running_counts.get(bot_uuid, 0),
+            }
+            for bot_uuid in self.bot_pending_counts.keys() | self.bot_running_counts.keys()
+        }
 
     async def __aenter__(self):
         await self.pool_lock.acquire()
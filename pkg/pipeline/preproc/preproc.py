@@ -57,6 +57,10 @@ class PreProcessor(stage.PipelineStage):
         query.use_llm_model = llm_model
 
         if selected_runner == 'local-agent':
+            query.fallback_llm_models = await self.ap.model_mgr.get_models_by_uuids(
+                query.pipeline_config['ai']['local-agent'].get('fallback-models', [])
+            )
+
             query.use_funcs = (
                 conversation.use_funcs if query.use_llm_model.model_entity.abilities.__contains__('tool_call') else None
             )
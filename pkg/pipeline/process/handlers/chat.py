@@ -1,13 +1,16 @@
 from __future__ import annotations
 
+import time
 import typing
 import traceback
 
 
 from .. import handler
 from ... import entities
+from ...respback import streaming
 from ....core import entities as core_entities
 from ....provider import runner as runner_module
+from ....provider import entities as llm_entities
 from ....plugin import events
 
 from ....platform.types import message as platform_message
@@ -67,7 +70,27 @@ class ChatMessageHandler(handler.MessageHandler):
                 else:
                     raise ValueError(f'未找到请求运行器: {query.pipeline_config["ai"]["runner"]["runner"]}')
 
-                async for result in runner.run(query):
+                stream = self.use_streaming(query, runner)
+                start_time = time.perf_counter()
+                first_token_observed = False
+
+                # 流式运行时，runner 在每条完整消息之前先产出其增量片段
+                results = runner.run(query, stream=True) if stream else runner.run(query)
+
+                async for result in results:
+                    if isinstance(result, llm_entities.MessageChunk):
+                        if not first_token_observed:
+                            first_token_observed = True
+                            first_token_latency = time.perf_counter() - start_time
+                            self.ap.pipeline_mgr.metrics.observe_first_token(query.pipeline_uuid, first_token_latency)
+                            self.ap.logger.debug(f'对话({query.query_id})首字延迟: {first_token_latency:.3f}s')
+
+                        if query.stream_responder is None:
+                            query.stream_responder = streaming.StreamResponder(self.ap, query)
+
+                        await query.stream_responder.feed(result.content)
+                        continue
+
                     query.resp_messages.append(result)
 
                     self.ap.logger.info(f'对话({query.query_id})响应: {self.cut_str(result.readable_str())}')
@@ -77,12 +100,15 @@ class ChatMessageHandler(handler.MessageHandler):
 
                     yield entities.StageProcessResult(result_type=entities.ResultType.CONTINUE, new_query=query)
 
+                    # 此消息已由后续阶段发出，下一条模型消息重新开始流式回复
+                    query.stream_responder = None
+
                 query.session.using_conversation.messages.append(query.user_message)
                 query.session.using_conversation.messages.extend(query.resp_messages)
             except Exception as e:
                 self.ap.logger.error(f'对话({query.query_id})请求失败: {type(e).__name__} {str(e)}')
 
-                hide_exception_info = query.pipeline_config['output']['misc']['hide-exception']
+                hide_exception_info = query.pipeline_settings.output.misc.hide_exception
 
                 yield entities.StageProcessResult(
                     result_type=entities.ResultType.INTERRUPT,
@@ -91,6 +117,17 @@ class ChatMessageHandler(handler.MessageHandler):
                     error_notice=f'{e}',
                     debug_notice=traceback.format_exc(),
                 )
-            finally:
-                # TODO statistics
-                pass
+
+    def use_streaming(self, query: core_entities.Query, runner: runner_module.RequestRunner) -> bool:
+        """是否流式输出
+
+        对输出消息检查敏感词时，需要拿到完整回复才能过滤，此时不流式输出。
+        """
+        if not query.pipeline_settings.output.streaming.enable or not runner.supports_streaming:
+            return False
+
+        content_filter = query.pipeline_settings.safety.content_filter
+        if content_filter.check_sensitive_words and content_filter.scope != 'income-msg':
+            return False
+
+        return True
@@ -22,6 +22,9 @@ class ReteLimitAlgo(metaclass=abc.ABCMeta):
 
     name: str = None
 
+    requires_release: bool = True
+    """release_access 是否有实际作用，为 False 时流水线会跳过释放阶段"""
+
     ap: app.Application
 
     def __init__(self, ap: app.Application):
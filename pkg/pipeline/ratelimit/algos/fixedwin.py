@@ -20,6 +20,8 @@ class SessionContainer:
 
 @algo.algo_class('fixwin')
 class FixedWindowAlgo(algo.ReteLimitAlgo):
+    requires_release = False
+
     containers_lock: asyncio.Lock
     """访问记录容器锁"""
 
@@ -36,6 +38,12 @@ class FixedWindowAlgo(algo.ReteLimitAlgo):
         launcher_type: str,
         launcher_id: typing.Union[int, str],
     ) -> bool:
+        rate_limit = query.pipeline_settings.safety.rate_limit
+
+        # 窗口长度不大于 0 时不限速
+        if rate_limit.window_length <= 0:
+            return True
+
         # 加锁，找容器
         container: SessionContainer = None
 
@@ -51,8 +59,8 @@ class FixedWindowAlgo(algo.ReteLimitAlgo):
         # 等待锁
         async with container.wait_lock:
             # 获取窗口大小和限制
-            window_size = query.pipeline_config['safety']['rate-limit']['window-length']
-            limitation = query.pipeline_config['safety']['rate-limit']['limitation']
+            window_size = rate_limit.window_length
+            limitation = rate_limit.limitation
 
             # TODO revert it
             # if session_name in self.ap.pipeline_cfg.data['rate-limit']['fixwin']:
@@ -70,9 +78,9 @@ class FixedWindowAlgo(algo.ReteLimitAlgo):
 
             # 如果访问次数超过了限制
             if count >= limitation:
-                if query.pipeline_config['safety']['rate-limit']['strategy'] == 'drop':
+                if rate_limit.strategy == 'drop':
                     return False
-                elif query.pipeline_config['safety']['rate-limit']['strategy'] == 'wait':
+                elif rate_limit.strategy == 'wait':
                     # 等待下一窗口
                     await asyncio.sleep(window_size - time.time() % window_size)
 
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import typing
 
-from .. import entities, stage
+from .. import entities, stage, settings as pipeline_settings
 from . import algo
 from ...core import entities as core_entities
 from ...utils import importutil
@@ -37,6 +37,19 @@ class RateLimit(stage.PipelineStage):
         self.algo = algo_class(self.ap)
         await self.algo.initialize()
 
+    def is_inert(
+        self,
+        stage_inst_name: str,
+        launcher_type: core_entities.LauncherTypes,
+        settings: pipeline_settings.PipelineSettings,
+    ) -> bool:
+        if stage_inst_name == 'RequireRateLimitOccupancy':
+            return settings.safety.rate_limit.window_length <= 0
+        elif stage_inst_name == 'ReleaseRateLimitOccupancy':
+            return not self.algo.requires_release
+
+        return False
+
     async def process(
         self,
         query: core_entities.Query,
@@ -19,8 +19,8 @@ class SendResponseBackStage(stage.PipelineStage):
         """处理"""
 
         random_range = (
-            query.pipeline_config['output']['force-delay']['min'],
-            query.pipeline_config['output']['force-delay']['max'],
+            query.pipeline_settings.output.force_delay.min,
+            query.pipeline_settings.output.force_delay.max,
         )
 
         random_delay = random.uniform(*random_range)
@@ -29,17 +29,21 @@ class SendResponseBackStage(stage.PipelineStage):
 
         await asyncio.sleep(random_delay)
 
-        if query.pipeline_config['output']['misc']['at-sender'] and isinstance(
+        if query.pipeline_settings.output.misc.at_sender and isinstance(
             query.message_event, platform_events.GroupMessage
         ):
             query.resp_message_chain[-1].insert(0, platform_message.At(query.message_event.sender.id))
 
-        quote_origin = query.pipeline_config['output']['misc']['quote-origin']
-
-        await query.adapter.reply_message(
-            message_source=query.message_event,
-            message=query.resp_message_chain[-1],
-            quote_origin=quote_origin,
-        )
+        quote_origin = query.pipeline_settings.output.misc.quote_origin
+
+        if query.stream_responder is not None and query.stream_responder.is_active:
+            # 内容已流式发出，只需收尾
+            await query.stream_responder.finish(query.resp_message_chain[-1])
+        else:
+            await query.adapter.reply_message(
+                message_source=query.message_event,
+                message=query.resp_message_chain[-1],
+                quote_origin=quote_origin,
+            )
 
         return entities.StageProcessResult(result_type=entities.ResultType.CONTINUE, new_query=query)
@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+import time
+import typing
+
+from ...core import app
+from ...core import entities as core_entities
+from ...platform.types import events as platform_events
+from ...platform.types import message as platform_message
+
+
+SENTENCE_TERMINATORS = ('\n', '。', '！', '？', '；', '!', '?', ';', '…')
+"""分段发送时可作为断点的字符"""
+
+
+class StreamResponder:
+    """把一条模型消息的增量文本流式回复到消息平台
+
+    由聊天处理器在收到首个增量片段时创建，并挂在 query.stream_responder 上；
+    完整消息经后续阶段处理后，由 SendResponseBackStage 调用 finish 收尾。
+
+    适配器支持编辑消息时，先回复一条消息，之后按间隔在原消息上更新；
+    否则按句子切分，累计到一定长度后作为单独的消息发送。
+    """
+
+    ap: app.Application
+
+    query: core_entities.Query
+
+    edit_mode: bool
+    """是否以编辑消息的方式流式回复"""
+
+    text: str
+    """已收到的全部文本"""
+
+    sent_length: int
+    """已发送（编辑模式下为已显示）的文本长度"""
+
+    message_handle: typing.Any
+    """编辑模式下已发送消息的句柄"""
+
+    last_flush_time: float
+
+    finished: bool
+
+    def __init__(self, ap: app.Application, query: core_entities.Query):
+        self.ap = ap
+        self.query = query
+        self.edit_mode = query.adapter.message_editable
+        self.text = ''
+        self.sent_length = 0
+        self.message_handle = None
+        self.last_flush_time = 0.0
+        self.finished = False
+
+    @property
+    def is_active(self) -> bool:
+        """是否已有内容发出且尚未收尾"""
+        return self.sent_length > 0 and not self.finished
+
+    def _make_chain(self, text: str, first: bool) -> platform_message.MessageChain:
+        chain = platform_message.MessageChain([platform_message.Plain(text)])
+
+        if (
+            first
+            and self.query.pipeline_settings.output.misc.at_sender
+            and isinstance(self.query.message_event, platform_events.GroupMessage)
+        ):
+            chain.insert(0, platform_message.At(self.query.message_event.sender.id))
+
+        return chain
+
+    async def feed(self, delta: str):
+        """收到一段增量文本"""
+        if self.finished or not delta:
+            return
+
+        self.text += delta
+
+        settings = self.query.pipeline_settings.output.streaming
+
+        if self.edit_mode:
+            if time.monotonic() - self.last_flush_time >= settings.edit_interval and self.text.strip():
+                await self._flush_edit()
+        else:
+            pending = self.text[self.sent_length :]
+            if len(pending) >= settings.min_chunk_length:
+                cut = max(pending.rfind(t) for t in SENTENCE_TERMINATORS) + 1
+                if cut >= settings.min_chunk_length:
+                    await self._send_chunk(pending[:cut])
+
+    async def _flush_edit(self):
+        max_length = self.query.adapter.editable_message_max_length
+        if max_length and len(self.text) > max_length:
+            # 超出平台对单条消息的长度限制，已显示的部分保留，其余部分改为分段发送
+            self.edit_mode = False
+            return
+
+        chain = self._make_chain(self.text, first=True)
+
+        if self.message_handle is None:
+            try:
+                self.message_handle = await self.query.adapter.reply_message_editable(
+                    message_source=self.query.message_event,
+                    message=chain,
+                    quote_origin=self.query.pipeline_settings.output.misc.quote_origin,
+                )
+            except Exception as e:
+                # 如钉钉未开通卡片权限，退回分段发送
+                self.ap.logger.warning(
+                    f'对话({self.query.query_id})发送可编辑消息失败，改为分段发送: {type(e).__name__} {e}'
+                )
+                self.edit_mode = False
+                return
+        else:
+            try:
+                await self.query.adapter.edit_message(self.query.message_event, self.message_handle, chain)
+            except Exception as e:
+                # 中间过程的编辑失败（如触发平台频率限制）不影响最终结果，等待下次更新
+                self.ap.logger.warning(f'对话({self.query.query_id})流式编辑消息失败: {type(e).__name__} {e}')
+                self.last_flush_time = time.monotonic()
+                return
+
+        self.sent_length = len(self.text)
+        self.last_flush_time = time.monotonic()
+
+    async def _send_chunk(self, text: str):
+        first = self.sent_length == 0
+
+        await self.query.adapter.reply_message(
+            message_source=self.query.message_event,
+            message=self._make_chain(text.strip('\n'), first=first),
+            quote_origin=first and self.query.pipeline_settings.output.misc.quote_origin,
+        )
+
+        self.sent_length += len(text)
+
+    async def finish(self, final_chain: platform_message.MessageChain):
+        """以经过后续阶段处理的完整消息链收尾
+
+        编辑模式下把消息更新为完整内容；分段模式下发送剩余部分，
+        若完整内容已被插件等改写而不再以已发送的文本开头，则完整发送一遍。
+        可编辑消息只能显示文字且受平台长度限制，编辑模式下图片等其他组件和放不下的文字另行回复。
+        """
+        self.finished = True
+
+        quote_origin = self.query.pipeline_settings.output.misc.quote_origin
+
+        components = [c for c in final_chain if not isinstance(c, platform_message.At)]
+        extras = [c for c in components if not isinstance(c, platform_message.Plain)]
+        final_text = ''.join(c.text for c in components if isinstance(c, platform_message.Plain))
+        sent_text = self.text[: self.sent_length]
+
+        if not self.edit_mode:
+            if not extras and final_text.startswith(sent_text):
+                await self._reply_text(final_text[len(sent_text) :], quote_origin=False)
+            else:
+                await self.query.adapter.reply_message(
+                    message_source=self.query.message_event,
+                    message=final_chain,
+                    quote_origin=quote_origin,
+                )
+            return
+
+        max_length = self.query.adapter.editable_message_max_length
+
+        if not max_length or len(final_text) <= max_length:
+            if not extras:
+                if str(final_chain) == str(self._make_chain(sent_text, first=True)):
+                    # 内容没有变化，部分平台（如 Telegram）会拒绝相同内容的编辑
+                    return
+
+                await self._edit_or_reply(final_chain)
+                return
+
+            if final_text.strip() and final_text != sent_text:
+                await self._edit_or_reply(self._make_chain(final_text, first=True))
+        elif final_text.startswith(sent_text):
+            # 超出长度限制，原消息保持已显示的部分，其余文字另行回复
+            await self._reply_text(final_text[len(sent_text) :], quote_origin=False)
+        else:
+            await self._reply_text(final_text, quote_origin=quote_origin)
+
+        if extras:
+            await self.query.adapter.reply_message(
+                message_source=self.query.message_event,
+                message=platform_message.MessageChain(extras),
+                quote_origin=False,
+            )
+
+    async def _edit_or_reply(self, chain: platform_message.MessageChain):
+        """把可编辑消息更新为 chain，失败时改为直接回复"""
+        try:
+            await self.query.adapter.edit_message(self.query.message_event, self.message_handle, chain)
+        except Exception as e:
+            self.ap.logger.warning(f'对话({self.query.query_id})流式回复收尾失败，改为直接回复: {type(e).__name__} {e}')
+            await self.query.adapter.reply_message(
+                message_source=self.query.message_event,
+                message=chain,
+                quote_origin=self.query.pipeline_settings.output.misc.quote_origin,
+            )
+
+    async def _reply_text(self, text: str, quote_origin: bool):
+        text = text.strip('\n')
+        if text:
+            await self.query.adapter.reply_message(
+                message_source=self.query.message_event,
+                message=platform_message.MessageChain([platform_message.Plain(text)]),
+                quote_origin=quote_origin,
+            )
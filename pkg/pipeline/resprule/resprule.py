@@ -3,7 +3,7 @@ from __future__ import annotations
 
 from . import rule
 
-from .. import stage, entities
+from .. import stage, entities, settings as pipeline_settings
 from ...core import entities as core_entities
 from ...utils import importutil
 
@@ -32,6 +32,14 @@ class GroupRespondRuleCheckStage(stage.PipelineStage):
             await rule_inst.initialize()
             self.rule_matchers.append(rule_inst)
 
+    def is_inert(
+        self,
+        stage_inst_name: str,
+        launcher_type: core_entities.LauncherTypes,
+        settings: pipeline_settings.PipelineSettings,
+    ) -> bool:
+        return launcher_type != core_entities.LauncherTypes.GROUP
+
     async def process(self, query: core_entities.Query, stage_inst_name: str) -> entities.StageProcessResult:
         if query.launcher_type.value != 'group':  # 只处理群消息
             return entities.StageProcessResult(result_type=entities.ResultType.CONTINUE, new_query=query)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import re
+import typing
+
+import pydantic.v1 as pydantic
+
+
+class _FrozenSection(pydantic.BaseModel):
+    """配置段基类，创建后不可修改"""
+
+    class Config:
+        allow_population_by_field_name = True
+        allow_mutation = False
+        frozen = True
+
+
+class AccessControlSettings(_FrozenSection):
+    mode: typing.Literal['blacklist', 'whitelist'] = 'blacklist'
+
+    blacklist: tuple[str, ...] = ()
+
+    whitelist: tuple[str, ...] = ()
+
+    @property
+    def session_list(self) -> tuple[str, ...]:
+        """当前模式下生效的会话列表"""
+        return self.whitelist if self.mode == 'whitelist' else self.blacklist
+
+
+class IgnoreRulesSettings(_FrozenSection):
+    prefix: tuple[str, ...] = ()
+
+    regexp: tuple[str, ...] = ()
+
+    @pydantic.validator('regexp', each_item=True)
+    def _check_regexp(cls, v):
+        try:
+            re.compile(v)
+        except re.error as e:
+            raise ValueError(f'无效的正则表达式 {v}: {e}')
+        return v
+
+
+class MessageCoalescingSettings(_FrozenSection):
+    enable: bool = False
+
+    window: float = 1.5
+
+    max_merge: int = pydantic.Field(5, alias='max-merge')
+
+
+class TriggerSettings(_FrozenSection):
+    access_control: AccessControlSettings = pydantic.Field(
+        default_factory=AccessControlSettings, alias='access-control'
+    )
+
+    ignore_rules: IgnoreRulesSettings = pydantic.Field(default_factory=IgnoreRulesSettings, alias='ignore-rules')
+
+    message_coalescing: MessageCoalescingSettings = pydantic.Field(
+        default_factory=MessageCoalescingSettings, alias='message-coalescing'
+    )
+
+
+class ContentFilterSettings(_FrozenSection):
+    scope: typing.Literal['all', 'income-msg', 'output-msg'] = 'all'
+
+    check_sensitive_words: bool = pydantic.Field(False, alias='check-sensitive-words')
+
+
+class RateLimitSettings(_FrozenSection):
+    window_length: int = pydantic.Field(60, alias='window-length')
+    """窗口长度（秒），不大于 0 时不限速"""
+
+    limitation: int = 60
+
+    strategy: typing.Literal['drop', 'wait'] = 'drop'
+
+
+class SafetySettings(_FrozenSection):
+    content_filter: ContentFilterSettings = pydantic.Field(
+        default_factory=ContentFilterSettings, alias='content-filter'
+    )
+
+    rate_limit: RateLimitSettings = pydantic.Field(default_factory=RateLimitSettings, alias='rate-limit')
+
+
+class LongTextProcessingSettings(_FrozenSection):
+    threshold: int = 1000
+
+    strategy: str = 'forward'
+
+    font_path: str = pydantic.Field('', alias='font-path')
+
+
+class StreamingSettings(_FrozenSection):
+    enable: bool = False
+
+    edit_interval: float = pydantic.Field(1.0, alias='edit-interval')
+    """支持编辑消息的平台上两次编辑的最短间隔（秒）"""
+
+    min_chunk_length: int = pydantic.Field(50, alias='min-chunk-length')
+    """不支持编辑消息的平台上每段消息的最短长度"""
+
+
+class ForceDelaySettings(_FrozenSection):
+    min: float = 0
+
+    max: float = 0
+
+    @pydantic.validator('max')
+    def _check_range(cls, v, values):
+        if 'min' in values and v < values['min']:
+            raise ValueError('force-delay 的 max 不能小于 min')
+        return v
+
+
+class MiscSettings(_FrozenSection):
+    hide_exception: bool = pydantic.Field(True, alias='hide-exception')
+
+    at_sender: bool = pydantic.Field(True, alias='at-sender')
+
+    quote_origin: bool = pydantic.Field(True, alias='quote-origin')
+
+    track_function_calls: bool = pydantic.Field(False, alias='track-function-calls')
+
+
+class OutputSettings(_FrozenSection):
+    long_text_processing: LongTextProcessingSettings = pydantic.Field(
+        default_factory=LongTextProcessingSettings, alias='long-text-processing'
+    )
+
+    streaming: StreamingSettings = pydantic.Field(default_factory=StreamingSettings)
+
+    force_delay: ForceDelaySettings = pydantic.Field(default_factory=ForceDelaySettings, alias='force-delay')
+
+    misc: MiscSettings = pydantic.Field(default_factory=MiscSettings)
+
+
+class PipelineSettings(_FrozenSection):
+    """流水线配置快照
+
+    加载流水线时由原始配置解析而得，供各阶段在热路径上按属性读取，配置错误在加载时即抛出。
+    ai 等由运行器、插件自行解释的配置段不在此建模，仍从 query.pipeline_config 原始字典中读取。
+    """
+
+    trigger: TriggerSettings = pydantic.Field(default_factory=TriggerSettings)
+
+    safety: SafetySettings = pydantic.Field(default_factory=SafetySettings)
+
+    output: OutputSettings = pydantic.Field(default_factory=OutputSettings)
+
+    @classmethod
+    def from_config(cls, pipeline_config: dict) -> PipelineSettings:
+        """从流水线原始配置解析
+
+        Raises:
+            pydantic.ValidationError: 配置不合法
+        """
+        return cls.parse_obj(pipeline_config)
@@ -4,7 +4,7 @@ import abc
 import typing
 
 from ..core import app, entities as core_entities
-from . import entities
+from . import entities, settings as pipeline_settings
 
 
 preregistered_stages: dict[str, PipelineStage] = {}
@@ -30,6 +30,19 @@ class PipelineStage(metaclass=abc.ABCMeta):
         """初始化"""
         pass
 
+    def is_inert(
+        self,
+        stage_inst_name: str,
+        launcher_type: core_entities.LauncherTypes,
+        settings: pipeline_settings.PipelineSettings,
+    ) -> bool:
+        """此阶段在给定请求者类型和流水线配置下是否无任何作用
+
+        返回 True 的阶段不会被编入该请求者类型的执行计划。仅当 process 必定直接返回 CONTINUE
+        且不产生任何副作用时才可返回 True。
+        """
+        return False
+
     @abc.abstractmethod
     async def process(
         self,
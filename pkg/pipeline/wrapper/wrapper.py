@@ -99,7 +99,7 @@ class ResponseWrapper(stage.PipelineStage):
                             platform_message.MessageChain([platform_message.Plain(reply_text)])
                         )
 
-                        if query.pipeline_config['output']['misc']['track-function-calls']:
+                        if query.pipeline_settings.output.misc.track_function_calls:
                             event_ctx = await self.ap.plugin_mgr.emit_event(
                                 event=events.NormalMessageResponded(
                                     launcher_type=query.launcher_type.value,
@@ -22,6 +22,15 @@ class MessagePlatformAdapter(metaclass=abc.ABCMeta):
 
     ap: app.Application
 
+    message_editable: bool = False
+    """是否支持编辑已发送的消息，支持则流式回复时在同一条消息上更新内容
+
+    可编辑消息只显示消息链中的文字，图片等其他组件由流式回复收尾时另行发送。
+    """
+
+    editable_message_max_length: int = 0
+    """可编辑消息的最大字符数，0 表示不限制；流式回复超出后不再编辑，其余文字另行发送"""
+
     def __init__(self, config: dict, ap: app.Application):
         """初始化适配器
 
@@ -57,6 +66,39 @@ class MessagePlatformAdapter(metaclass=abc.ABCMeta):
         """
         raise NotImplementedError
 
+    async def reply_message_editable(
+        self,
+        message_source: platform_events.MessageEvent,
+        message: platform_message.MessageChain,
+        quote_origin: bool = False,
+    ) -> typing.Any:
+        """回复一条之后可编辑的消息，仅 message_editable 为 True 的适配器需要实现
+
+        Args:
+            message_source (platform.types.MessageEvent): 消息源事件
+            message (platform.types.MessageChain): 消息链
+            quote_origin (bool, optional): 是否引用原消息. Defaults to False.
+
+        Returns:
+            typing.Any: 已发送消息的句柄，传给 edit_message
+        """
+        raise NotImplementedError
+
+    async def edit_message(
+        self,
+        message_source: platform_events.MessageEvent,
+        message_handle: typing.Any,
+        message: platform_message.MessageChain,
+    ):
+        """将已发送的消息内容替换为新的消息链
+
+        Args:
+            message_source (platform.types.MessageEvent): 消息源事件
+            message_handle (typing.Any): reply_message_editable 返回的句柄
+            message (platform.types.MessageChain): 新的消息链
+        """
+        raise NotImplementedError
+
     async def is_muted(self, group_id: int) -> bool:
         """获取账号是否在指定群被禁言"""
         raise NotImplementedError
@@ -13,6 +13,7 @@ from ..core import app, entities as core_entities, taskmgr
 from .types import events as platform_events
 
 from ..discover import engine
+from ..utils import ttlcache
 
 from ..entity.persistence import bot as persistence_bot
 
@@ -49,11 +50,34 @@ class RuntimeBot:
         self.adapter = adapter
         self.task_context = taskmgr.TaskContext()
 
+    def is_duplicate_message(self, event: platform_events.MessageEvent) -> bool:
+        """检查消息是否为平台重复投递的消息，并记录此消息"""
+        message_dedup = self.ap.platform_mgr.message_dedup
+
+        if message_dedup is None:
+            return False
+
+        message_id = event.message_chain.message_id
+        if message_id == -1:  # 无法获取消息 ID
+            return False
+
+        key = (self.bot_entity.uuid, message_id)
+
+        if message_dedup.get(key) is not None:
+            self.ap.logger.debug(f'忽略重复投递的消息 bot={self.bot_entity.uuid} message_id={message_id}')
+            return True
+
+        message_dedup.set(key, True)
+        return False
+
     async def initialize(self):
         async def on_friend_message(
             event: platform_events.FriendMessage,
             adapter: msadapter.MessagePlatformAdapter,
         ):
+            if self.is_duplicate_message(event):
+                return
+
             await self.ap.query_pool.add_query(
                 bot_uuid=self.bot_entity.uuid,
                 launcher_type=core_entities.LauncherTypes.PERSON,
@@ -68,6 +92,9 @@ class RuntimeBot:
             event: platform_events.GroupMessage,
             adapter: msadapter.MessagePlatformAdapter,
         ):
+            if self.is_duplicate_message(event):
+                return
+
             await self.ap.query_pool.add_query(
                 bot_uuid=self.bot_entity.uuid,
                 launcher_type=core_entities.LauncherTypes.GROUP,
@@ -125,13 +152,24 @@ class PlatformManager:
 
     adapter_dict: dict[str, type[msadapter.MessagePlatformAdapter]]
 
+    message_dedup: ttlcache.TTLCache | None
+    """入站消息去重缓存，键为 (bot_uuid, message_id)，未启用时为 None"""
+
     def __init__(self, ap: app.Application = None):
         self.ap = ap
         self.bots = []
         self.adapter_components = []
         self.adapter_dict = {}
+        self.message_dedup = None
 
     async def initialize(self):
+        dedup_cfg = self.ap.instance_config.data.get('message-dedup', {})
+        if dedup_cfg.get('enable', True):
+            self.message_dedup = ttlcache.TTLCache(
+                ttl=dedup_cfg.get('ttl', 600),
+                max_size=dedup_cfg.get('max-size', 10000),
+            )
+
         self.adapter_components = self.ap.discover.get_components_by_kind('MessagePlatformAdapter')
         adapter_dict: dict[str, type[msadapter.MessagePlatformAdapter]] = {}
         for component in self.adapter_components:
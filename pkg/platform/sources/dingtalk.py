@@ -94,6 +94,8 @@ class DingTalkAdapter(adapter.MessagePlatformAdapter):
     event_converter: DingTalkEventConverter = DingTalkEventConverter()
     config: dict
 
+    message_editable = True
+
     def __init__(self, config: dict, ap: app.Application):
         self.config = config
         self.ap = ap
@@ -131,6 +133,28 @@ class DingTalkAdapter(adapter.MessagePlatformAdapter):
         content = await DingTalkMessageConverter.yiri2target(message)
         await self.bot.send_message(content, incoming_message)
 
+    async def reply_message_editable(
+        self,
+        message_source: platform_events.MessageEvent,
+        message: platform_message.MessageChain,
+        quote_origin: bool = False,
+    ) -> typing.Any:
+        event = await DingTalkEventConverter.yiri2target(
+            message_source,
+        )
+
+        content = await DingTalkMessageConverter.yiri2target(message)
+        return await self.bot.send_markdown_card(content, event.incoming_message)
+
+    async def edit_message(
+        self,
+        message_source: platform_events.MessageEvent,
+        message_handle: typing.Any,
+        message: platform_message.MessageChain,
+    ):
+        content = await DingTalkMessageConverter.yiri2target(message)
+        await self.bot.update_markdown_card(message_handle, content)
+
     async def send_message(self, target_type: str, target_id: str, message: platform_message.MessageChain):
         content = await DingTalkMessageConverter.yiri2target(message)
         if target_type == 'person':
@@ -170,6 +170,11 @@ class DiscordAdapter(adapter.MessagePlatformAdapter):
         typing.Callable[[platform_events.Event, adapter.MessagePlatformAdapter], None],
     ] = {}
 
+    message_editable = True
+
+    editable_message_max_length = 2000
+    """Discord 单条消息最多 2000 个字符"""
+
     def __init__(self, config: dict, ap: app.Application):
         self.config = config
         self.ap = ap
@@ -223,6 +228,37 @@ class DiscordAdapter(adapter.MessagePlatformAdapter):
 
         await message_source.source_platform_object.channel.send(**args)
 
+    async def reply_message_editable(
+        self,
+        message_source: platform_events.MessageEvent,
+        message: platform_message.MessageChain,
+        quote_origin: bool = False,
+    ) -> discord.Message:
+        msg_to_send, _ = await self.message_converter.yiri2target(message)
+        assert isinstance(message_source.source_platform_object, discord.Message)
+
+        args = {
+            'content': msg_to_send,
+        }
+
+        if quote_origin:
+            args['reference'] = message_source.source_platform_object
+
+        if message.has(platform_message.At):
+            args['mention_author'] = True
+
+        return await message_source.source_platform_object.channel.send(**args)
+
+    async def edit_message(
+        self,
+        message_source: platform_events.MessageEvent,
+        message_handle: discord.Message,
+        message: platform_message.MessageChain,
+    ):
+        msg_to_send, _ = await self.message_converter.yiri2target(message)
+
+        await message_handle.edit(content=msg_to_send)
+
     async def is_muted(self, group_id: int) -> bool:
         return False
 
@@ -338,6 +338,8 @@ class LarkAdapter(adapter.MessagePlatformAdapter):
     quart_app: quart.Quart
     ap: app.Application
 
+    message_editable = True
+
     def __init__(self, config: dict, ap: app.Application):
         self.config = config
         self.ap = ap
@@ -412,6 +414,14 @@ class LarkAdapter(adapter.MessagePlatformAdapter):
         message: platform_message.MessageChain,
         quote_origin: bool = False,
     ):
+        await self.reply_message_editable(message_source, message, quote_origin)
+
+    async def reply_message_editable(
+        self,
+        message_source: platform_events.MessageEvent,
+        message: platform_message.MessageChain,
+        quote_origin: bool = False,
+    ) -> str:
         # 不再需要了，因为message_id已经被包含到message_chain中
         # lark_event = await self.event_converter.yiri2target(message_source)
         lark_message = await self.message_converter.yiri2target(message, self.api_client)
@@ -444,6 +454,39 @@ class LarkAdapter(adapter.MessagePlatformAdapter):
                 f'client.im.v1.message.reply failed, code: {response.code}, msg: {response.msg}, log_id: {response.get_log_id()}, resp: \n{json.dumps(json.loads(response.raw.content), indent=4, ensure_ascii=False)}'
             )
 
+        return response.data.message_id
+
+    async def edit_message(
+        self,
+        message_source: platform_events.MessageEvent,
+        message_handle: str,
+        message: platform_message.MessageChain,
+    ):
+        lark_message = await self.message_converter.yiri2target(message, self.api_client)
+
+        final_content = {
+            'zh_Hans': {
+                'title': '',
+                'content': lark_message,
+            },
+        }
+
+        request: UpdateMessageRequest = (
+            UpdateMessageRequest.builder()
+            .message_id(message_handle)
+            .request_body(
+                UpdateMessageRequestBody.builder().content(json.dumps(final_content)).msg_type('post').build()
+            )
+            .build()
+        )
+
+        response: UpdateMessageResponse = await self.api_client.im.v1.message.aupdate(request)
+
+        if not response.success():
+            raise Exception(
+                f'client.im.v1.message.update failed, code: {response.code}, msg: {response.msg}, log_id: {response.get_log_id()}'
+            )
+
     async def is_muted(self, group_id: int) -> bool:
         return False
 
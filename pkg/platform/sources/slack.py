@@ -91,6 +91,11 @@ class SlackAdapter(adapter.MessagePlatformAdapter):
     event_converter: SlackEventConverter = SlackEventConverter()
     config: dict
 
+    message_editable = True
+
+    editable_message_max_length = 40000
+    """Slack 会截断超过 40000 个字符的消息文本"""
+
     def __init__(self, config: dict, ap: app.Application):
         self.config = config
         self.ap = ap
@@ -120,6 +125,36 @@ class SlackAdapter(adapter.MessagePlatformAdapter):
             if slack_event.type == 'im':
                 await self.bot.send_message_to_one(content['content'], slack_event.user_id)
 
+    async def reply_message_editable(
+        self,
+        message_source: platform_events.MessageEvent,
+        message: platform_message.MessageChain,
+        quote_origin: bool = False,
+    ) -> tuple[str, str]:
+        slack_event = await SlackEventConverter.yiri2target(message_source)
+
+        content_list = await SlackMessageConverter.yiri2target(message)
+        text = ''.join(content['content'] for content in content_list)
+
+        if slack_event.type == 'channel':
+            response = await self.bot.send_message_to_channel(text, slack_event.channel_id)
+        else:
+            response = await self.bot.send_message_to_one(text, slack_event.user_id)
+
+        return response['channel'], response['ts']
+
+    async def edit_message(
+        self,
+        message_source: platform_events.MessageEvent,
+        message_handle: tuple[str, str],
+        message: platform_message.MessageChain,
+    ):
+        content_list = await SlackMessageConverter.yiri2target(message)
+        text = ''.join(content['content'] for content in content_list)
+
+        channel_id, ts = message_handle
+        await self.bot.update_message(text, channel_id, ts)
+
     async def send_message(self, target_type: str, target_id: str, message: platform_message.MessageChain):
         content_list = await SlackMessageConverter.yiri2target(message)
         for content in content_list:
@@ -147,6 +147,11 @@ class TelegramAdapter(adapter.MessagePlatformAdapter):
         typing.Callable[[platform_events.Event, adapter.MessagePlatformAdapter], None],
     ] = {}
 
+    message_editable = True
+
+    editable_message_max_length = 4096
+    """Telegram 单条文字消息最多 4096 个字符"""
+
     def __init__(self, config: dict, ap: app.Application):
         self.config = config
         self.ap = ap
@@ -198,6 +203,44 @@ class TelegramAdapter(adapter.MessagePlatformAdapter):
 
         await self.bot.send_message(**args)
 
+    def _make_text_args(self, message: platform_message.MessageChain) -> dict:
+        """将消息链中的文字转换为可编辑消息的参数"""
+        text = ''.join(component.text for component in message if isinstance(component, platform_message.Plain))
+
+        if self.config['markdown_card'] is True:
+            return {'text': telegramify_markdown.markdownify(content=text), 'parse_mode': 'MarkdownV2'}
+
+        return {'text': text}
+
+    async def reply_message_editable(
+        self,
+        message_source: platform_events.MessageEvent,
+        message: platform_message.MessageChain,
+        quote_origin: bool = False,
+    ) -> telegram.Message:
+        assert isinstance(message_source.source_platform_object, Update)
+
+        args = {
+            'chat_id': message_source.source_platform_object.effective_chat.id,
+            **self._make_text_args(message),
+        }
+        if quote_origin:
+            args['reply_to_message_id'] = message_source.source_platform_object.message.id
+
+        return await self.bot.send_message(**args)
+
+    async def edit_message(
+        self,
+        message_source: platform_events.MessageEvent,
+        message_handle: telegram.Message,
+        message: platform_message.MessageChain,
+    ):
+        await self.bot.edit_message_text(
+            chat_id=message_handle.chat_id,
+            message_id=message_handle.message_id,
+            **self._make_text_args(message),
+        )
+
     async def is_muted(self, group_id: int) -> bool:
         return False
 
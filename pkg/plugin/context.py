@@ -50,9 +50,18 @@ def handler(
 
 def llm_func(
     name: str = None,
+    parallel: bool = True,
+    timeout: float = None,
+    cache_ttl: float = None,
 ) -> typing.Callable:
     """注册内容函数
 
+    Args:
+        name: 函数名，默认为方法名
+        parallel: 模型一次发起多个调用时，此函数是否可与其他调用并发执行
+        timeout: 执行超时秒数，默认使用配置文件中 tool-call 的设置，为 0 时不限制
+        cache_ttl: 结果缓存秒数，仅用于无副作用且结果只取决于参数的函数，默认不缓存
+
     使用示例：
 
     class MyPlugin(BasePlugin):
@@ -33,6 +33,9 @@ class PluginManifestLoader(loader.PluginLoader):
     def llm_func(
         self,
         name: str = None,
+        parallel: bool = True,
+        timeout: float = None,
+        cache_ttl: float = None,
     ) -> typing.Callable:
         """注册内容函数"""
         self.ap.logger.debug(f'注册内容函数 {name}')
@@ -47,6 +50,9 @@ class PluginManifestLoader(loader.PluginLoader):
                 description=function_schema['description'],
                 parameters=function_schema['parameters'],
                 func=func,
+                parallel=parallel,
+                timeout=timeout,
+                cache_ttl=cache_ttl,
             )
 
             self._current_container.tools.append(llm_function)
@@ -80,6 +80,7 @@ class PluginManager:
 
         # 按优先级倒序
         self.plugin_containers.sort(key=lambda x: x.priority, reverse=False)
+        self.invalidate_tools()
 
         self.ap.logger.debug(f'优先级排序后的插件列表 {self.plugin_containers}')
 
@@ -124,6 +125,11 @@ class PluginManager:
             )
         )
 
+    def invalidate_tools(self):
+        """插件提供的工具有变化，通知工具管理器"""
+        if self.ap.tool_mgr is not None:
+            self.ap.tool_mgr.invalidate()
+
     async def initialize_plugin(self, plugin: context.RuntimeContainer):
         self.ap.logger.debug(f'初始化插件 {plugin.plugin_name}')
         plugin.plugin_inst = plugin.plugin_class(self.api_host)
@@ -132,6 +138,7 @@ class PluginManager:
         plugin.plugin_inst.host = self.api_host
         await plugin.plugin_inst.initialize()
         plugin.status = context.RuntimeContainerStatus.INITIALIZED
+        self.invalidate_tools()
 
     async def initialize_plugins(self):
         for plugin in self.plugins():
@@ -154,6 +161,7 @@ class PluginManager:
         await plugin.plugin_inst.destroy()
         plugin.plugin_inst = None
         plugin.status = context.RuntimeContainerStatus.MOUNTED
+        self.invalidate_tools()
 
     async def destroy_plugins(self):
         for plugin in self.plugins():
@@ -276,6 +284,7 @@ class PluginManager:
                         await self.destroy_plugin(plugin)
 
                     plugin.enabled = new_status
+                    self.invalidate_tools()
 
                     await self.dump_plugin_container_setting(plugin)
 
@@ -61,6 +61,28 @@ class ContentElement(pydantic.BaseModel):
         return cls(type='image_base64', image_base64=image_base64)
 
 
+class Usage(pydantic.BaseModel):
+    """模型请求的 token 用量和耗时"""
+
+    prompt_tokens: int = 0
+    """输入 token 数，包含从缓存读取和写入缓存的部分"""
+
+    completion_tokens: int = 0
+    """输出 token 数"""
+
+    cached_tokens: int = 0
+    """从提供商的提示词缓存读取的输入 token 数"""
+
+    cache_creation_tokens: int = 0
+    """写入提示词缓存的输入 token 数"""
+
+    latency: float = 0.0
+    """请求耗时（秒）"""
+
+    first_token_latency: typing.Optional[float] = None
+    """首个增量片段的延迟（秒），仅流式请求设置"""
+
+
 class Message(pydantic.BaseModel):
     """消息"""
 
@@ -78,6 +100,37 @@ class Message(pydantic.BaseModel):
 
     tool_call_id: typing.Optional[str] = None
 
+    usage: typing.Optional[Usage] = None
+    """本次请求的用量，仅模型的回复设置，不随消息发送给模型"""
+
+    _wire_cache: dict[str, typing.Any] = pydantic.PrivateAttr(default_factory=dict)
+    """各请求格式的转换结果，键为格式名"""
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if name in self.__fields__:
+            self._wire_cache.clear()
+
+    def copy(self, **kwargs) -> Message:
+        message = super().copy(**kwargs)
+        # copy(update=...) 会带上原消息的缓存，此处丢弃
+        message._wire_cache = {}
+        return message
+
+    def get_wire_format(self, key: str, convert: typing.Callable[[Message], typing.Any]) -> typing.Any:
+        """获取消息转换为某种请求格式的结果
+
+        结果会缓存在消息上，工具调用循环中重复请求时只需转换新增的消息；重新赋值消息的字段会使缓存失效。
+        返回值在多次请求间共用，调用方不可修改，需要修改时应先复制。
+
+        Args:
+            key: 请求格式名，转换方式相同的请求器应使用相同的名称
+            convert: 转换函数
+        """
+        if key not in self._wire_cache:
+            self._wire_cache[key] = convert(self)
+        return self._wire_cache[key]
+
     def readable_str(self) -> str:
         if self.content is not None:
             return str(self.role) + ': ' + str(self.get_content_platform_message_chain())
@@ -125,6 +178,19 @@ class Message(pydantic.BaseModel):
             return platform_message.MessageChain(mc)
 
 
+class MessageChunk(pydantic.BaseModel):
+    """流式响应中的消息片段"""
+
+    content: str = ''
+    """此片段新增的文本"""
+
+    is_final: bool = False
+    """是否为最后一个片段"""
+
+    message: typing.Optional[Message] = None
+    """完整的消息，仅最后一个片段设置"""
+
+
 class Prompt(pydantic.BaseModel):
     """供AI使用的Prompt"""
 
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import asyncio
+import datetime
+import traceback
+
+import sqlalchemy
+
+from ...core import app, entities as core_entities
+from .. import entities as llm_entities
+from ...entity.persistence import usage as persistence_usage
+
+
+GROUP_BY_COLUMNS = {
+    'model': persistence_usage.LLMUsageStat.model_uuid,
+    'pipeline': persistence_usage.LLMUsageStat.pipeline_uuid,
+    'bot': persistence_usage.LLMUsageStat.bot_uuid,
+    'session': persistence_usage.LLMUsageStat.session_id,
+    'period': persistence_usage.LLMUsageStat.period_start,
+}
+"""查询时可用的汇总维度"""
+
+SUM_FIELDS = [
+    'request_count',
+    'error_count',
+    'prompt_tokens',
+    'completion_tokens',
+    'cached_tokens',
+    'cache_creation_tokens',
+    'total_latency',
+    'first_token_count',
+    'total_first_token_latency',
+]
+
+
+class UsageRecorder:
+    """模型请求用量的汇总记录器
+
+    每次模型请求在内存中按（小时、模型、流水线、机器人、会话）累加，
+    后台任务定期把累加值批量写入数据库，请求路径上不访问数据库。
+    """
+
+    ap: app.Application
+
+    enabled: bool
+
+    flush_interval: float
+    """写入数据库的间隔秒数"""
+
+    pending: dict[tuple, dict[str, int | float]]
+    """尚未写入数据库的累加值"""
+
+    def __init__(self, ap: app.Application):
+        self.ap = ap
+        self.pending = {}
+
+        usage_cfg = ap.instance_config.data.get('llm-usage', {})
+        self.enabled = usage_cfg.get('enable', True)
+        self.flush_interval = usage_cfg.get('flush-interval', 30)
+
+    def record(
+        self,
+        query: core_entities.Query | None,
+        model_uuid: str,
+        usage: llm_entities.Usage | None = None,
+        error: bool = False,
+    ):
+        """记录一次模型请求，usage 为 None 时只计数"""
+        if not self.enabled:
+            return
+
+        period_start = datetime.datetime.now().replace(minute=0, second=0, microsecond=0)
+
+        session_id = ''
+        if query is not None and query.launcher_type is not None:
+            session_id = f'{query.launcher_type.value}_{query.launcher_id}'
+
+        key = (
+            period_start,
+            model_uuid,
+            getattr(query, 'pipeline_uuid', None) or '',
+            getattr(query, 'bot_uuid', None) or '',
+            session_id,
+        )
+
+        stat = self.pending.get(key)
+        if stat is None:
+            stat = self.pending[key] = dict.fromkeys(SUM_FIELDS, 0)
+
+        stat['request_count'] += 1
+
+        if error:
+            stat['error_count'] += 1
+
+        if usage is not None:
+            stat['prompt_tokens'] += usage.prompt_tokens
+            stat['completion_tokens'] += usage.completion_tokens
+            stat['cached_tokens'] += usage.cached_tokens
+            stat['cache_creation_tokens'] += usage.cache_creation_tokens
+            stat['total_latency'] += usage.latency
+
+            if usage.first_token_latency is not None:
+                stat['first_token_count'] += 1
+                stat['total_first_token_latency'] += usage.first_token_latency
+
+    async def flush(self):
+        """把内存中的累加值写入数据库"""
+        if not self.pending:
+            return
+
+        pending, self.pending = self.pending, {}
+
+        rows = [
+            {
+                'period_start': period_start,
+                'model_uuid': model_uuid,
+                'pipeline_uuid': pipeline_uuid,
+                'bot_uuid': bot_uuid,
+                'session_id': session_id,
+                **stat,
+            }
+            for (period_start, model_uuid, pipeline_uuid, bot_uuid, session_id), stat in pending.items()
+        ]
+
+        try:
+            await self.ap.persistence_mgr.execute_async(sqlalchemy.insert(persistence_usage.LLMUsageStat), rows)
+        except Exception:
+            # 写入失败时放回，下次一起写入
+            for key, stat in pending.items():
+                merged = self.pending.setdefault(key, dict.fromkeys(SUM_FIELDS, 0))
+                for field in SUM_FIELDS:
+                    merged[field] += stat[field]
+            raise
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+
+            try:
+                await self.flush()
+            except Exception as e:
+                self.ap.logger.warning(f'写入模型用量统计失败: {e}')
+                self.ap.logger.debug(traceback.format_exc())
+
+    async def query(
+        self,
+        group_by: str,
+        since: datetime.datetime,
+        limit: int = 100,
+    ) -> list[dict]:
+        """查询 since 之后的用量，按 group_by 汇总，按总 token 数降序排列"""
+        await self.flush()
+
+        group_column = GROUP_BY_COLUMNS[group_by]
+        table = persistence_usage.LLMUsageStat
+
+        sums = [sqlalchemy.func.sum(getattr(table, field)).label(field) for field in SUM_FIELDS]
+        total_tokens = sqlalchemy.func.sum(table.prompt_tokens + table.completion_tokens)
+
+        stmt = (
+            sqlalchemy.select(group_column.label('key'), *sums)
+            .where(table.period_start >= since)
+            .group_by(group_column)
+            .order_by(group_column if group_by == 'period' else total_tokens.desc())
+            .limit(limit)
+        )
+
+        result = await self.ap.persistence_mgr.execute_async(stmt)
+
+        items = []
+        for row in result.all():
+            stat = {field: getattr(row, field) or 0 for field in SUM_FIELDS}
+            key = row.key.isoformat() if isinstance(row.key, datetime.datetime) else row.key
+
+            items.append(
+                {
+                    group_by: key,
+                    'request_count': stat['request_count'],
+                    'error_count': stat['error_count'],
+                    'prompt_tokens': stat['prompt_tokens'],
+                    'completion_tokens': stat['completion_tokens'],
+                    'cached_tokens': stat['cached_tokens'],
+                    'cache_creation_tokens': stat['cache_creation_tokens'],
+                    'avg_latency_seconds': (
+                        stat['total_latency'] / (stat['request_count'] - stat['error_count'])
+                        if stat['request_count'] > stat['error_count']
+                        else None
+                    ),
+                    'avg_first_token_seconds': (
+                        stat['total_first_token_latency'] / stat['first_token_count']
+                        if stat['first_token_count']
+                        else None
+                    ),
+                }
+            )
+
+        return items
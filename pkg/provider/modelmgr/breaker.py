@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+import asyncio
+import collections
+import enum
+import time
+
+
+class CircuitState(enum.Enum):
+    CLOSED = 'closed'
+    """正常放行"""
+
+    OPEN = 'open'
+    """熔断中，直接拒绝请求"""
+
+    HALF_OPEN = 'half_open'
+    """熔断时间已过，放行一个探测请求"""
+
+
+class CircuitBreaker:
+    """模型熔断器
+
+    连续失败达到阈值后熔断，熔断期间请求直接失败（或换用备用模型），不再等待上游超时；
+    熔断时间过后放行一个探测请求，成功则恢复，失败则再次熔断。
+    """
+
+    enabled: bool
+
+    failure_threshold: int
+
+    recovery_time: float
+    """熔断持续秒数"""
+
+    state: CircuitState
+
+    consecutive_failures: int
+
+    opened_at: float
+
+    probing: bool
+    """半开状态下是否已有探测请求在进行"""
+
+    def __init__(self, enabled: bool = True, failure_threshold: int = 5, recovery_time: float = 30):
+        self.enabled = enabled
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.state = CircuitState.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+
+    def allow_request(self) -> bool:
+        if not self.enabled or self.state == CircuitState.CLOSED:
+            return True
+
+        if self.state == CircuitState.OPEN:
+            if time.monotonic() - self.opened_at < self.recovery_time:
+                return False
+            self.state = CircuitState.HALF_OPEN
+            self.probing = False
+
+        if self.probing:
+            return False
+
+        self.probing = True
+        return True
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self.state = CircuitState.CLOSED
+        self.probing = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+
+        if self.state == CircuitState.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            self.state = CircuitState.OPEN
+            self.opened_at = time.monotonic()
+            self.probing = False
+
+    def record_ignored(self):
+        """请求结束但结果不说明上游健康与否（如参数错误），只释放探测名额"""
+        self.probing = False
+
+    def get_stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'state': self.state.value,
+            'consecutive_failures': self.consecutive_failures,
+            'retry_in_seconds': (
+                max(0.0, self.recovery_time - (time.monotonic() - self.opened_at))
+                if self.state == CircuitState.OPEN
+                else 0.0
+            ),
+        }
+
+
+class AdaptiveLimiter:
+    """AIMD 自适应并发限制
+
+    请求成功且耗时正常时缓慢提高上限（每轮约 +1），上游故障时按比例降低上限；
+    耗时变慢只在并发接近上限时才降低上限，低并发下正常的耗时波动不会使上限萎缩。
+    并发已达上限时新请求排队等待空位，等待超时则失败（调用方可换用备用模型）。
+    """
+
+    enabled: bool
+
+    limit: float
+
+    min_limit: int
+
+    max_limit: int
+
+    in_flight: int
+
+    rejected_count: int
+
+    _waiters: collections.deque[asyncio.Future]
+    """排队等待空位的请求，空位按先来后到交给队首"""
+
+    def __init__(self, enabled: bool = True, initial_limit: int = 20, min_limit: int = 1, max_limit: int = 200):
+        self.enabled = enabled
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.in_flight = 0
+        self.rejected_count = 0
+        self._waiters = collections.deque()
+
+    def _has_room(self) -> bool:
+        return not self.enabled or self.in_flight < int(self.limit)
+
+    async def acquire(self, timeout: float = 0) -> bool:
+        """占用一个并发名额，已达上限时最多等待 timeout 秒，等不到返回 False"""
+        if self._has_room() and not self._waiters:
+            self.in_flight += 1
+            return True
+
+        if timeout <= 0:
+            self.rejected_count += 1
+            return False
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+
+        try:
+            await asyncio.wait({waiter}, timeout=timeout)
+        except BaseException:
+            if waiter.done() and not waiter.cancelled():
+                # 名额已交给此请求，调用方却被取消了
+                self.release()
+            raise
+        finally:
+            if not waiter.done():
+                waiter.cancel()
+                self._waiters.remove(waiter)
+
+        if waiter.cancelled():
+            self.rejected_count += 1
+            return False
+
+        return True
+
+    def _wake_waiters(self):
+        while self._waiters and self._has_room():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    def release(self):
+        self.in_flight -= 1
+        self._wake_waiters()
+
+    def _is_busy(self) -> bool:
+        """并发是否已接近上限，release 之后调用，故加上刚结束的这个请求"""
+        return self.in_flight + 1 >= self.limit / 2
+
+    def on_success(self, slow: bool):
+        """请求成功，slow 表示耗时明显高于平常"""
+        if not self._is_busy():
+            # 上限未被用到时，变慢说明不了上游过载，也不必提高上限以免空闲时无限增长
+            return
+
+        if slow:
+            self.limit = max(self.min_limit, self.limit * 0.9)
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            self._wake_waiters()
+
+    def on_failure(self):
+        self.limit = max(self.min_limit, self.limit * 0.5)
+
+    def get_stats(self) -> dict:
+        return {
+            'enabled': self.enabled,
+            'limit': int(self.limit),
+            'in_flight': self.in_flight,
+            'queued': len(self._waiters),
+            'rejected': self.rejected_count,
+        }
+
+
+def is_upstream_failure(error: BaseException) -> bool:
+    """判断错误是否说明上游不可用（超时、连接失败、429 或 5xx）
+
+    请求器通常把 SDK 异常包装为 RequesterError，此处沿异常链查找原始异常。
+    """
+    seen = set()
+    current: BaseException | None = error
+
+    while current is not None and id(current) not in seen:
+        seen.add(id(current))
+
+        if isinstance(current, (asyncio.TimeoutError, TimeoutError, ConnectionError)):
+            return True
+
+        name = type(current).__name__
+        if 'Timeout' in name or 'Connection' in name:
+            return True
+
+        status = getattr(current, 'status_code', None)
+        if not isinstance(status, int):
+            status = getattr(current, 'code', None)
+        if isinstance(status, int) and 400 <= status < 600:
+            return status in (408, 429) or status >= 500
+
+        current = current.__cause__ or current.__context__
+
+    # 无法判断时按上游故障处理，宁可多熔断一次也不让请求持续超时
+    return True
@@ -0,0 +1,218 @@
+from __future__ import annotations
+
+import collections
+import datetime
+import hashlib
+import json
+import time
+import typing
+
+import sqlalchemy
+
+from ...core import app
+from .. import entities as llm_entities
+from ..tools import entities as tools_entities
+from ...entity.persistence import cache as persistence_cache
+
+
+def _message_digest(message: llm_entities.Message) -> str:
+    raw = json.dumps(
+        message.dict(exclude_none=True, exclude={'usage'}), sort_keys=True, ensure_ascii=False, default=str
+    )
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def make_fingerprint(
+    model_uuid: str,
+    messages: list[llm_entities.Message],
+    funcs: list[tools_entities.LLMFunction] | None,
+    extra_args: dict[str, typing.Any],
+) -> str:
+    """计算模型请求的指纹，用作回复缓存的键和合并相同请求的依据"""
+    payload = {
+        'model': model_uuid,
+        # 各消息的摘要缓存在消息上，工具调用循环中只需计算新增消息的摘要
+        'messages': [m.get_wire_format('digest', _message_digest) for m in messages],
+        'funcs': [{'name': f.name, 'description': f.description, 'parameters': f.parameters} for f in funcs or []],
+        'extra_args': extra_args,
+    }
+
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+class CacheEntry:
+    content: str
+    """序列化后的回复消息"""
+
+    latency: float
+    """原请求耗时（秒），命中时计入节省的时间"""
+
+    expire_at: float
+    """过期时间（monotonic）"""
+
+    size: int
+    """content 的字节数"""
+
+    def __init__(self, content: str, latency: float, expire_at: float):
+        self.content = content
+        self.size = len(content.encode('utf-8'))
+        self.latency = latency
+        self.expire_at = expire_at
+
+
+class ResponseCache:
+    """模型回复的精确匹配缓存
+
+    以模型、请求消息、工具和额外参数的哈希为键缓存模型的回复，在流水线中开启后，
+    完全相同的请求直接返回缓存的回复而不再请求模型。
+    内存中按最近使用淘汰，同时受条目数和字节数限制；可选持久化到数据库，重启后仍可命中。
+    """
+
+    ap: app.Application
+
+    entries: collections.OrderedDict[str, CacheEntry]
+
+    max_entries: int
+
+    max_bytes: int
+
+    total_bytes: int
+
+    persist: bool
+    """是否同时保存到数据库"""
+
+    hits: int
+
+    misses: int
+
+    saved_seconds: float
+    """命中缓存节省的模型请求耗时"""
+
+    def __init__(self, ap: app.Application):
+        self.ap = ap
+        self.entries = collections.OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+        cache_cfg = ap.instance_config.data.get('llm-cache', {})
+        self.max_entries = cache_cfg.get('max-entries', 1000)
+        self.max_bytes = cache_cfg.get('max-bytes', 16 * 1024 * 1024)
+        self.persist = cache_cfg.get('persist', False)
+
+    def _remove(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+
+    def _put(self, key: str, entry: CacheEntry):
+        self._remove(key)
+
+        if entry.size > self.max_bytes:
+            return
+
+        self.entries[key] = entry
+        self.total_bytes += entry.size
+
+        while len(self.entries) > self.max_entries or self.total_bytes > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+    async def get(self, key: str) -> llm_entities.Message | None:
+        """查找缓存的回复，未命中返回 None"""
+        now = time.monotonic()
+
+        entry = self.entries.get(key)
+        if entry is not None and entry.expire_at <= now:
+            self._remove(key)
+            entry = None
+
+        if entry is None and self.persist:
+            try:
+                entry = await self._load(key)
+            except Exception as e:
+                # 数据库不可用时按未命中处理，不影响请求模型
+                self.ap.logger.warning(f'从数据库读取模型回复缓存失败: {type(e).__name__} {e}')
+                entry = None
+
+            if entry is not None:
+                self._put(key, entry)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.entries.move_to_end(key)
+        self.hits += 1
+        self.saved_seconds += entry.latency
+
+        return llm_entities.Message.parse_raw(entry.content)
+
+    async def set(self, key: str, model_uuid: str, message: llm_entities.Message, latency: float, ttl: float):
+        """缓存回复"""
+        entry = CacheEntry(
+            content=message.json(exclude_none=True, exclude={'usage'}, ensure_ascii=False),
+            latency=latency,
+            expire_at=time.monotonic() + ttl,
+        )
+
+        self._put(key, entry)
+
+        if self.persist:
+            try:
+                await self._save(key, model_uuid, entry, ttl)
+            except Exception as e:
+                # 已取得模型回复，保存失败时只保留内存中的缓存
+                self.ap.logger.warning(f'保存模型回复缓存到数据库失败: {type(e).__name__} {e}')
+
+    async def _load(self, key: str) -> CacheEntry | None:
+        result = await self.ap.persistence_mgr.execute_async(
+            sqlalchemy.select(persistence_cache.LLMResponseCache).where(persistence_cache.LLMResponseCache.key == key)
+        )
+        row = result.first()
+
+        if row is None:
+            return None
+
+        remaining = (row.expire_at - datetime.datetime.now()).total_seconds()
+        if remaining <= 0:
+            await self.ap.persistence_mgr.execute_async(
+                sqlalchemy.delete(persistence_cache.LLMResponseCache).where(
+                    persistence_cache.LLMResponseCache.key == key
+                )
+            )
+            return None
+
+        return CacheEntry(content=row.content, latency=row.latency, expire_at=time.monotonic() + remaining)
+
+    async def _save(self, key: str, model_uuid: str, entry: CacheEntry, ttl: float):
+        now = datetime.datetime.now()
+
+        await self.ap.persistence_mgr.execute_async(
+            sqlalchemy.delete(persistence_cache.LLMResponseCache).where(
+                sqlalchemy.or_(
+                    persistence_cache.LLMResponseCache.key == key,
+                    persistence_cache.LLMResponseCache.expire_at <= now,
+                )
+            )
+        )
+        await self.ap.persistence_mgr.execute_async(
+            sqlalchemy.insert(persistence_cache.LLMResponseCache).values(
+                key=key,
+                model_uuid=model_uuid,
+                content=entry.content,
+                latency=entry.latency,
+                expire_at=now + datetime.timedelta(seconds=ttl),
+            )
+        )
+
+    def get_stats(self) -> dict:
+        return {
+            'size': len(self.entries),
+            'bytes': self.total_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0,
+            'saved_seconds': self.saved_seconds,
+        }
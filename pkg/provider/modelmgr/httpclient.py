@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import urllib.parse
+
+import httpx
+
+from ...core import app
+
+
+ClientKey = tuple[str, float, type]
+"""(源站, 超时秒数, 客户端类)"""
+
+
+class HTTPClientPool:
+    """LLM 请求器共用的 HTTP 客户端池
+
+    同一源站（scheme://host:port）和超时的模型共用一个 httpx.AsyncClient 及其连接池，
+    减少重复的 TCP/TLS 握手。客户端按引用计数管理，最后一个使用者释放后延迟关闭，
+    以便修改模型或重载 provider 时新的请求器可以接着使用已建立的连接。
+
+    代理不显式传给客户端，而是由 trust_env 从环境变量读取（ProxyManager 会把配置的代理写入环境变量），
+    显式指定的代理会作用于所有地址，使 NO_PROXY 失效，本地或内网的模型接口也会被转发到代理。
+    """
+
+    ap: app.Application
+
+    clients: dict[ClientKey, httpx.AsyncClient]
+
+    ref_counts: dict[ClientKey, int]
+
+    close_handles: dict[ClientKey, asyncio.TimerHandle]
+    """引用计数归零、等待关闭的客户端"""
+
+    close_tasks: set[asyncio.Task]
+    """正在关闭客户端的任务，持有引用以免任务在完成前被回收"""
+
+    def __init__(self, ap: app.Application):
+        self.ap = ap
+        self.clients = {}
+        self.ref_counts = {}
+        self.close_handles = {}
+        self.close_tasks = set()
+
+    @property
+    def config(self) -> dict:
+        return self.ap.instance_config.data.get('http-client', {})
+
+    def _make_key(self, base_url: str, timeout: float, client_class: type) -> ClientKey:
+        parsed = urllib.parse.urlsplit(base_url.replace(' ', ''))
+        origin = f'{parsed.scheme}://{parsed.netloc}'.lower()
+
+        return (origin, float(timeout), client_class)
+
+    def _create_client(self, key: ClientKey, limits_class: type) -> httpx.AsyncClient:
+        _, timeout, client_class = key
+
+        limits = limits_class(
+            max_connections=self.config.get('max-connections', 100),
+            max_keepalive_connections=self.config.get('max-keepalive-connections', 20),
+            keepalive_expiry=self.config.get('keepalive-expiry', 30),
+        )
+
+        kwargs = dict(
+            timeout=timeout,
+            limits=limits,
+            follow_redirects=True,
+            trust_env=True,
+        )
+
+        if self.config.get('http2', False):
+            try:
+                return client_class(http2=True, **kwargs)
+            except ImportError:
+                self.ap.logger.warning('启用 HTTP/2 需要安装 h2 (pip install httpx[http2])，将使用 HTTP/1.1')
+
+        return client_class(**kwargs)
+
+    def acquire(
+        self,
+        base_url: str,
+        timeout: float,
+        client_class: type = httpx.AsyncClient,
+        limits_class: type = httpx.Limits,
+    ) -> httpx.AsyncClient:
+        """获取一个客户端，用完后需调用 release
+
+        Args:
+            base_url: 请求的基础 URL，仅其源站部分参与共用判断
+            timeout: 超时秒数
+            client_class: 客户端类，SDK 要求使用其自带的 httpx 客户端类时传入
+            limits_class: 与 client_class 配套的连接数限制类
+        """
+        key = self._make_key(base_url, timeout, client_class)
+
+        handle = self.close_handles.pop(key, None)
+        if handle is not None:
+            handle.cancel()
+
+        if key not in self.clients:
+            self.clients[key] = self._create_client(key, limits_class)
+            self.ref_counts[key] = 0
+
+        self.ref_counts[key] += 1
+        return self.clients[key]
+
+    def release(self, client: httpx.AsyncClient):
+        """释放 acquire 获取的客户端"""
+        for key, c in self.clients.items():
+            if c is client:
+                break
+        else:
+            return
+
+        self.ref_counts[key] -= 1
+
+        if self.ref_counts[key] <= 0:
+            # 等待进行中的请求完成后再关闭
+            grace = self.config.get('keepalive-expiry', 30)
+            self.close_handles[key] = asyncio.get_running_loop().call_later(grace, self._schedule_close, key)
+
+    def _schedule_close(self, key: ClientKey):
+        task = asyncio.create_task(self._close(key))
+        self.close_tasks.add(task)
+        task.add_done_callback(self._on_close_done)
+
+    def _on_close_done(self, task: asyncio.Task):
+        self.close_tasks.discard(task)
+
+        if not task.cancelled() and task.exception() is not None:
+            self.ap.logger.warning(f'关闭 HTTP 客户端失败: {task.exception()!r}')
+
+    async def _close(self, key: ClientKey):
+        self.close_handles.pop(key, None)
+
+        if self.ref_counts.get(key, 0) > 0:
+            return
+
+        client = self.clients.pop(key, None)
+        self.ref_counts.pop(key, None)
+
+        if client is not None:
+            await client.aclose()
@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import collections
+
+
+class LatencyTracker:
+    """记录模型最近若干次成功请求的耗时，用于估算分位数"""
+
+    samples: collections.deque[float]
+
+    count: int
+    """累计记录次数"""
+
+    def __init__(self, window: int = 200):
+        self.samples = collections.deque(maxlen=window)
+        self.count = 0
+
+    def observe(self, seconds: float):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q: float) -> float | None:
+        """最近耗时的 q 分位数，没有记录时返回 None"""
+        if not self.samples:
+            return None
+
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def get_stats(self) -> dict:
+        return {
+            'count': self.count,
+            'p50_seconds': self.percentile(0.5),
+            'p95_seconds': self.percentile(0.95),
+            'p99_seconds': self.percentile(0.99),
+        }
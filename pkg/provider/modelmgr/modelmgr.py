@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import time
+import typing
+
 import sqlalchemy
 
-from . import entities, requester
+from . import entities, requester, cache, singleflight, breaker, errors
 from ...core import app
 from ...core import entities as core_entities
 from .. import entities as llm_entities
@@ -13,6 +17,14 @@ from ...entity.persistence import model as persistence_model
 
 FETCH_MODEL_LIST_URL = 'https://api.qchatgpt.rockchin.top/api/v2/fetch/model_list'
 
+HEDGE_MIN_SAMPLES = 20
+"""主模型的耗时记录少于此数时，对冲等待时间使用 DEFAULT_HEDGE_DELAY"""
+
+DEFAULT_HEDGE_DELAY = 10.0
+
+SLOW_REQUEST_FACTOR = 2.0
+"""请求耗时超过模型近期 p50 的此倍数时，视为上游变慢，降低其并发上限"""
+
 
 class ModelManager:
     """模型管理器"""
@@ -33,6 +45,10 @@ class ModelManager:
 
     requester_dict: dict[str, type[requester.LLMAPIRequester]]  # cache
 
+    response_cache: cache.ResponseCache
+
+    single_flight: singleflight.SingleFlight
+
     def __init__(self, ap: app.Application):
         self.ap = ap
         self.model_list = []
@@ -41,6 +57,8 @@ class ModelManager:
         self.llm_models = []
         self.requester_components = []
         self.requester_dict = {}
+        self.response_cache = cache.ResponseCache(ap)
+        self.single_flight = singleflight.SingleFlight()
 
     async def initialize(self):
         self.requester_components = self.ap.discover.get_components_by_kind('LLMAPIRequester')
@@ -84,6 +102,9 @@ class ModelManager:
 
         await requester_inst.initialize()
 
+        breaker_cfg = self.ap.instance_config.data.get('circuit-breaker', {})
+        limiter_cfg = self.ap.instance_config.data.get('adaptive-concurrency', {})
+
         runtime_llm_model = requester.RuntimeLLMModel(
             model_entity=model_info,
             token_mgr=token.TokenManager(
@@ -91,6 +112,17 @@ class ModelManager:
                 tokens=model_info.api_keys,
             ),
             requester=requester_inst,
+            breaker=breaker.CircuitBreaker(
+                enabled=breaker_cfg.get('enable', True),
+                failure_threshold=breaker_cfg.get('failure-threshold', 5),
+                recovery_time=breaker_cfg.get('recovery-time', 30),
+            ),
+            limiter=breaker.AdaptiveLimiter(
+                enabled=limiter_cfg.get('enable', False),
+                initial_limit=limiter_cfg.get('initial-limit', 20),
+                min_limit=limiter_cfg.get('min-limit', 1),
+                max_limit=limiter_cfg.get('max-limit', 200),
+            ),
         )
         self.llm_models.append(runtime_llm_model)
 
@@ -113,8 +145,251 @@ class ModelManager:
         for model in self.llm_models:
             if model.model_entity.uuid == model_uuid:
                 self.llm_models.remove(model)
+                await model.requester.dispose()
                 return
 
+    async def shutdown(self):
+        """释放所有模型的请求器"""
+        for model in self.llm_models:
+            await model.requester.dispose()
+
+    async def get_models_by_uuids(self, uuids: list[str]) -> list[requester.RuntimeLLMModel]:
+        """按顺序获取多个模型，跳过不存在的模型"""
+        models = []
+        for model_uuid in uuids:
+            try:
+                models.append(await self.get_model_by_uuid(model_uuid))
+            except ValueError:
+                self.ap.logger.warning(f'备用模型 {model_uuid} 不存在，已跳过')
+        return models
+
+    def get_hedge_delay(self, model: requester.RuntimeLLMModel) -> float:
+        """对冲请求前等待主模型的时间，取其最近耗时的 p95"""
+        if len(model.latency.samples) < HEDGE_MIN_SAMPLES:
+            return DEFAULT_HEDGE_DELAY
+        return model.latency.percentile(0.95)
+
+    async def _admit(self, model: requester.RuntimeLLMModel, wait: bool = True):
+        """检查熔断器和并发限制，不放行时抛出 RequesterError，请求结束后须调用 _settle
+
+        Args:
+            wait: 并发已满时是否排队等待；还有备用模型可换时不等待，直接换用备用模型
+        """
+        if not model.breaker.allow_request():
+            raise errors.RequesterError(f'模型 {model.model_entity.name} 近期连续请求失败，已暂停使用')
+
+        queue_timeout = self.ap.instance_config.data.get('adaptive-concurrency', {}).get('queue-timeout', 30)
+
+        try:
+            acquired = await model.limiter.acquire(queue_timeout if wait else 0)
+        except BaseException:
+            model.breaker.record_ignored()
+            raise
+
+        if not acquired:
+            model.breaker.record_ignored()
+            raise errors.RequesterError(f'模型 {model.model_entity.name} 并发请求过多')
+
+    def _settle(
+        self,
+        query: core_entities.Query,
+        model: requester.RuntimeLLMModel,
+        elapsed: float,
+        error: BaseException | None = None,
+        message: llm_entities.Message | None = None,
+        first_token_latency: float | None = None,
+    ):
+        """记录请求结果，更新熔断器、并发限制、耗时和用量统计
+
+        请求成功时把耗时记入回复消息的 usage。
+        """
+        model.limiter.release()
+
+        if error is None:
+            slow = (
+                len(model.latency.samples) >= HEDGE_MIN_SAMPLES
+                and elapsed > model.latency.percentile(0.5) * SLOW_REQUEST_FACTOR
+            )
+            model.limiter.on_success(slow)
+            model.breaker.record_success()
+            model.latency.observe(elapsed)
+
+            if message is not None:
+                if message.usage is None:
+                    message.usage = llm_entities.Usage()
+                message.usage.latency = elapsed
+                message.usage.first_token_latency = first_token_latency
+
+                model.usage.add(message.usage)
+                self.ap.usage_recorder.record(query, model.model_entity.uuid, message.usage)
+            return
+
+        if isinstance(error, Exception):
+            self.ap.usage_recorder.record(query, model.model_entity.uuid, error=True)
+
+        if isinstance(error, Exception) and breaker.is_upstream_failure(error):
+            model.limiter.on_failure()
+            model.breaker.record_failure()
+        else:
+            # 被取消（如对冲中落败）或请求本身有误，不说明上游状况
+            model.breaker.record_ignored()
+
+    async def _invoke_model(
+        self,
+        query: core_entities.Query,
+        model: requester.RuntimeLLMModel,
+        messages: list[llm_entities.Message],
+        funcs: list[tools_entities.LLMFunction] | None,
+        wait: bool = True,
+    ) -> llm_entities.Message:
+        await self._admit(model, wait)
+
+        start_time = time.perf_counter()
+
+        try:
+            # 部分请求器会修改传入的消息列表，对冲时各请求需使用各自的副本
+            msg = await model.requester.invoke_llm(
+                query,
+                model,
+                messages.copy(),
+                funcs if 'tool_call' in model.model_entity.abilities else None,
+                extra_args=model.model_entity.extra_args,
+            )
+        except BaseException as e:
+            self._settle(query, model, time.perf_counter() - start_time, e)
+            raise
+
+        self._settle(query, model, time.perf_counter() - start_time, message=msg)
+        return msg
+
+    async def invoke_llm_with_fallback(
+        self,
+        query: core_entities.Query,
+        models: list[requester.RuntimeLLMModel],
+        messages: list[llm_entities.Message],
+        funcs: list[tools_entities.LLMFunction] | None = None,
+        hedge: bool = False,
+    ) -> llm_entities.Message:
+        """依次尝试 models 中的模型，返回第一个成功的回复
+
+        Args:
+            models: 主模型在前，其后为按顺序尝试的备用模型
+            hedge: 主模型超过其 p95 耗时仍未返回时，同时请求下一个模型，取先成功的结果并取消另一个
+        """
+        remaining = list(models)
+        pending: dict[asyncio.Task, requester.RuntimeLLMModel] = {}
+        hedged = not hedge
+        last_error: Exception | None = None
+
+        def launch():
+            model = remaining.pop(0)
+            task = asyncio.create_task(self._invoke_model(query, model, messages, funcs, wait=not remaining))
+            pending[task] = model
+
+        launch()
+
+        try:
+            while pending:
+                timeout = None
+                if not hedged and remaining:
+                    timeout = self.get_hedge_delay(next(iter(pending.values())))
+
+                done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    self.ap.logger.info(
+                        f'对话({query.query_id})模型 {next(iter(pending.values())).model_entity.name} '
+                        f'超过 {timeout:.1f}s 未响应，同时请求 {remaining[0].model_entity.name}'
+                    )
+                    launch()
+                    continue
+
+                for task in done:
+                    model = pending.pop(task)
+
+                    if task.exception() is None:
+                        return task.result()
+
+                    last_error = task.exception()
+                    self.ap.logger.warning(
+                        f'对话({query.query_id})模型 {model.model_entity.name} 请求失败: {type(last_error).__name__} {last_error}'
+                    )
+
+                if not pending and remaining:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise last_error
+
+    async def invoke_llm_stream_with_fallback(
+        self,
+        query: core_entities.Query,
+        models: list[requester.RuntimeLLMModel],
+        messages: list[llm_entities.Message],
+        funcs: list[tools_entities.LLMFunction] | None = None,
+    ) -> typing.AsyncGenerator[llm_entities.MessageChunk, None]:
+        """invoke_llm_with_fallback 的流式版本
+
+        已产出增量片段的模型请求失败时无法再换用其他模型，直接抛出异常。
+        """
+        last_error: Exception | None = None
+
+        for index, model in enumerate(models):
+            streamed = False
+
+            try:
+                await self._admit(model, wait=index == len(models) - 1)
+
+                start_time = time.perf_counter()
+                first_token_latency = None
+                settled = False
+
+                try:
+                    async for chunk in model.requester.invoke_llm_stream(
+                        query,
+                        model,
+                        messages.copy(),
+                        funcs if 'tool_call' in model.model_entity.abilities else None,
+                        extra_args=model.model_entity.extra_args,
+                    ):
+                        if chunk.is_final and not settled:
+                            settled = True
+                            self._settle(
+                                query,
+                                model,
+                                time.perf_counter() - start_time,
+                                message=chunk.message,
+                                first_token_latency=first_token_latency,
+                            )
+                        elif not chunk.is_final:
+                            if not streamed:
+                                first_token_latency = time.perf_counter() - start_time
+                            streamed = True
+                        yield chunk
+                except BaseException as e:
+                    if not settled:
+                        settled = True
+                        self._settle(query, model, time.perf_counter() - start_time, e)
+                    raise
+                finally:
+                    if not settled:
+                        self._settle(query, model, time.perf_counter() - start_time)
+
+                return
+            except Exception as e:
+                if streamed:
+                    raise
+
+                last_error = e
+                self.ap.logger.warning(
+                    f'对话({query.query_id})模型 {model.model_entity.name} 请求失败: {type(e).__name__} {e}'
+                )
+
+        raise last_error
+
     def get_available_requesters_info(self) -> list[dict]:
         """获取所有可用的请求器"""
         return [component.to_plain_dict() for component in self.requester_components]
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
 import abc
+import asyncio
+import contextvars
+import time
 import typing
 
 from ...core import app
@@ -8,7 +11,16 @@ from ...core import entities as core_entities
 from .. import entities as llm_entities
 from ..tools import entities as tools_entities
 from ...entity.persistence import model as persistence_model
-from . import token
+from . import token, breaker as model_breaker, latency as latency_tracker, usage as usage_counter
+
+
+_delta_queue: contextvars.ContextVar[asyncio.Queue | None] = contextvars.ContextVar('llm_delta_queue', default=None)
+"""当前流式请求的增量文本队列，仅在 invoke_llm_stream 发起的调用中设置"""
+
+_api_key: contextvars.ContextVar[str | None] = contextvars.ContextVar('llm_api_key', default=None)
+"""当前调用使用的 api key，由 invoke_with_key_rotation 设置"""
+
+T = typing.TypeVar('T')
 
 
 class RuntimeLLMModel:
@@ -23,15 +35,33 @@ class RuntimeLLMModel:
     requester: LLMAPIRequester
     """请求器实例"""
 
+    latency: latency_tracker.LatencyTracker
+    """最近请求的耗时"""
+
+    breaker: model_breaker.CircuitBreaker
+    """熔断器"""
+
+    limiter: model_breaker.AdaptiveLimiter
+    """自适应并发限制"""
+
+    usage: usage_counter.UsageCounter
+    """累计的 token 用量"""
+
     def __init__(
         self,
         model_entity: persistence_model.LLMModel,
         token_mgr: token.TokenManager,
         requester: LLMAPIRequester,
+        breaker: model_breaker.CircuitBreaker | None = None,
+        limiter: model_breaker.AdaptiveLimiter | None = None,
     ):
         self.model_entity = model_entity
         self.token_mgr = token_mgr
         self.requester = requester
+        self.latency = latency_tracker.LatencyTracker()
+        self.breaker = breaker or model_breaker.CircuitBreaker()
+        self.limiter = limiter or model_breaker.AdaptiveLimiter()
+        self.usage = usage_counter.UsageCounter()
 
 
 class LLMAPIRequester(metaclass=abc.ABCMeta):
@@ -53,6 +83,10 @@ class LLMAPIRequester(metaclass=abc.ABCMeta):
     async def initialize(self):
         pass
 
+    async def dispose(self):
+        """释放请求器持有的资源，模型被移除或重载时调用"""
+        pass
+
     @abc.abstractmethod
     async def invoke_llm(
         self,
@@ -74,3 +108,129 @@ class LLMAPIRequester(metaclass=abc.ABCMeta):
             llm_entities.Message: 返回消息对象
         """
         pass
+
+    def current_api_key(self) -> str:
+        """当前调用使用的 api key，请求器应在每次请求时通过此方法取得 key，而不是修改共用的客户端"""
+        return _api_key.get() or ''
+
+    def get_key_cooldown(self, error: Exception) -> float | None:
+        """判断错误是否由 api key 导致，是则返回该 key 的冷却秒数，否则返回 None
+
+        默认按 SDK 异常上的 HTTP 状态码判断：429 按 Retry-After 冷却，401/402/403 长时间冷却。
+        """
+        status = getattr(error, 'status_code', None)
+        if not isinstance(status, int):
+            status = getattr(error, 'code', None)
+
+        if status == 429:
+            headers = getattr(getattr(error, 'response', None), 'headers', None)
+            retry_after = headers.get('retry-after') if headers is not None else None
+            try:
+                return float(retry_after)
+            except (TypeError, ValueError):
+                return token.DEFAULT_RATE_LIMIT_COOLDOWN
+        elif status in (401, 402, 403):
+            return token.DEFAULT_AUTH_FAILURE_COOLDOWN
+
+        return None
+
+    async def invoke_with_key_rotation(
+        self,
+        model: RuntimeLLMModel,
+        invoke: typing.Callable[[], typing.Awaitable[T]],
+    ) -> T:
+        """轮换 api key 调用 invoke
+
+        invoke 内通过 current_api_key 取得本次使用的 key。key 被限流或鉴权失败时使其冷却，
+        并换用其他健康的 key 重试，直到没有可换的 key 为止。
+        """
+        token_mgr = model.token_mgr
+        attempts = max(1, token_mgr.healthy_count())
+
+        for attempt in range(attempts):
+            key = token_mgr.get_token()
+            reset_token = _api_key.set(key)
+            start_time = time.perf_counter()
+
+            try:
+                result = await invoke()
+            except Exception as e:
+                cooldown = self.get_key_cooldown(e)
+                if cooldown is None:
+                    raise
+
+                token_mgr.report_failure(key, cooldown)
+
+                if attempt + 1 >= attempts:
+                    raise
+
+                self.ap.logger.warning(
+                    f'模型 {model.model_entity.name} 的 api key 不可用（冷却 {cooldown:.0f}s），换用其他 key 重试: {e}'
+                )
+                continue
+            finally:
+                _api_key.reset(reset_token)
+
+            token_mgr.report_success(key, time.perf_counter() - start_time)
+            return result
+
+    def is_streaming(self) -> bool:
+        """当前调用是否由 invoke_llm_stream 发起，是则请求器应以流式方式请求并调用 emit_delta 上报增量"""
+        return _delta_queue.get() is not None
+
+    def emit_delta(self, text: str):
+        """上报流式响应的增量文本"""
+        queue = _delta_queue.get()
+        if queue is not None and text:
+            queue.put_nowait(text)
+
+    async def invoke_llm_stream(
+        self,
+        query: core_entities.Query,
+        model: RuntimeLLMModel,
+        messages: typing.List[llm_entities.Message],
+        funcs: typing.List[tools_entities.LLMFunction] = None,
+        extra_args: dict[str, typing.Any] = {},
+    ) -> typing.AsyncGenerator[llm_entities.MessageChunk, None]:
+        """流式调用API
+
+        在独立任务中调用 invoke_llm，并逐个产出请求器通过 emit_delta 上报的增量文本。
+        不支持流式的请求器在完成后一次性产出全部文本。最后一个片段的 is_final 为 True，并携带完整消息。
+
+        Args:
+            model (RuntimeLLMModel): 使用的模型信息
+            messages (typing.List[llm_entities.Message]): 消息对象列表
+            funcs (typing.List[tools_entities.LLMFunction], optional): 使用的工具函数列表. Defaults to None.
+            extra_args (dict[str, typing.Any], optional): 额外的参数. Defaults to {}.
+        """
+        queue: asyncio.Queue[str | None] = asyncio.Queue()
+
+        async def _invoke() -> llm_entities.Message:
+            _delta_queue.set(queue)
+            try:
+                return await self.invoke_llm(query, model, messages, funcs, extra_args=extra_args)
+            finally:
+                queue.put_nowait(None)
+
+        task = asyncio.create_task(_invoke())
+
+        streamed = False
+
+        try:
+            while True:
+                delta = await queue.get()
+                if delta is None:
+                    break
+
+                streamed = True
+                yield llm_entities.MessageChunk(content=delta)
+
+            msg = await task
+        finally:
+            if not task.done():
+                task.cancel()
+
+        if not streamed and isinstance(msg.content, str) and msg.content:
+            yield llm_entities.MessageChunk(content=msg.content)
+
+        yield llm_entities.MessageChunk(is_final=True, message=msg)
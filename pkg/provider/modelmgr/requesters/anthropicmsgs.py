@@ -15,11 +15,103 @@ from ...tools import entities as tools_entities
 from ....utils import image
 
 
+WIRE_FORMAT = 'anthropic-messages'
+"""Message 上缓存的转换结果所用的格式名"""
+
+
+def convert_message(m: llm_entities.Message) -> dict:
+    """将消息转换为 Messages 接口的格式"""
+    if m.role == 'tool':
+        return {
+            'role': 'user',
+            'content': [
+                {
+                    'type': 'tool_result',
+                    'tool_use_id': m.tool_call_id,
+                    'content': m.content,
+                }
+            ],
+        }
+
+    msg_dict = m.dict(exclude_none=True, exclude={'usage'})
+
+    if isinstance(m.content, str) and m.content.strip() != '':
+        msg_dict['content'] = [{'type': 'text', 'text': m.content}]
+    elif isinstance(m.content, list):
+        for i, ce in enumerate(m.content):
+            if ce.type == 'image_base64':
+                image_b64, image_format = image.split_b64_and_format(ce.image_base64)
+
+                alter_image_ele = {
+                    'type': 'image',
+                    'source': {
+                        'type': 'base64',
+                        'media_type': f'image/{image_format}',
+                        'data': image_b64,
+                    },
+                }
+                msg_dict['content'][i] = alter_image_ele
+
+    if m.tool_calls:
+        for tool_call in m.tool_calls:
+            msg_dict['content'].append(
+                {
+                    'type': 'tool_use',
+                    'id': tool_call.id,
+                    'name': tool_call.function.name,
+                    'input': json.loads(tool_call.function.arguments),
+                }
+            )
+
+        del msg_dict['tool_calls']
+
+    return msg_dict
+
+
+CACHE_CONTROL = {'type': 'ephemeral'}
+
+
+def mark_cache_breakpoints(args: dict):
+    """在系统提示词、工具列表和最后一条消息末尾设置提示词缓存断点
+
+    同一流水线的系统提示词和工具每次请求都相同，历史消息也只会在末尾追加，
+    设置断点后提供商可复用上次请求已处理的前缀。
+    args 中的消息和工具可能是缓存的共用对象，此处只替换，不修改。
+    """
+    if isinstance(args.get('system'), str) and args['system']:
+        args['system'] = [{'type': 'text', 'text': args['system'], 'cache_control': CACHE_CONTROL}]
+
+    if args.get('tools'):
+        args['tools'] = args['tools'][:-1] + [{**args['tools'][-1], 'cache_control': CACHE_CONTROL}]
+
+    if args.get('messages') and isinstance(args['messages'][-1].get('content'), list):
+        last = args['messages'][-1]
+        if last['content']:
+            content = last['content'][:-1] + [{**last['content'][-1], 'cache_control': CACHE_CONTROL}]
+            args['messages'] = args['messages'][:-1] + [{**last, 'content': content}]
+
+
+def make_usage(usage: anthropic.types.Usage) -> llm_entities.Usage:
+    """Messages 接口的 input_tokens 不含读取和写入缓存的部分，此处合计为 prompt_tokens"""
+    cached_tokens = usage.cache_read_input_tokens or 0
+    cache_creation_tokens = usage.cache_creation_input_tokens or 0
+
+    return llm_entities.Usage(
+        prompt_tokens=usage.input_tokens + cached_tokens + cache_creation_tokens,
+        completion_tokens=usage.output_tokens,
+        cached_tokens=cached_tokens,
+        cache_creation_tokens=cache_creation_tokens,
+    )
+
+
 class AnthropicMessages(requester.LLMAPIRequester):
     """Anthropic Messages API 请求器"""
 
     client: anthropic.AsyncAnthropic
 
+    http_client: httpx.AsyncClient
+    """从客户端池获取的共用 HTTP 客户端"""
+
     default_config: dict[str, typing.Any] = {
         'base_url': 'https://api.anthropic.com/v1',
         'timeout': 120,
@@ -32,20 +124,52 @@ class AnthropicMessages(requester.LLMAPIRequester):
                 socket.TCP_KEEPINTVL = 0
             if not hasattr(socket, 'TCP_KEEPCNT'):
                 socket.TCP_KEEPCNT = 0
-        httpx_client = anthropic._base_client.AsyncHttpxClientWrapper(
-            base_url=self.requester_cfg['base_url'],
-            # cast to a valid type because mypy doesn't understand our type narrowing
-            timeout=typing.cast(httpx.Timeout, self.requester_cfg['timeout']),
-            limits=anthropic._constants.DEFAULT_CONNECTION_LIMITS,
-            follow_redirects=True,
-            trust_env=True,
+
+        self.http_client = self.ap.http_client_pool.acquire(
+            self.requester_cfg['base_url'],
+            timeout=self.requester_cfg['timeout'],
+            client_class=anthropic._base_client.AsyncHttpxClientWrapper,
+            limits_class=type(anthropic._constants.DEFAULT_CONNECTION_LIMITS),
         )
 
         self.client = anthropic.AsyncAnthropic(
             api_key='',
-            http_client=httpx_client,
+            timeout=self.requester_cfg['timeout'],
+            http_client=self.http_client,
         )
 
+    async def dispose(self):
+        self.ap.http_client_pool.release(self.http_client)
+
+    async def _create(self, args: dict) -> anthropic.types.message.Message:
+        client = self.client.with_options(api_key=self.current_api_key())
+
+        if self.is_streaming():
+            return await self._create_stream(client, args)
+
+        return await client.messages.create(**args)
+
+    async def _create_stream(self, client: anthropic.AsyncAnthropic, args: dict) -> anthropic.types.message.Message:
+        """以流式方式请求并上报增量文本，返回完整的消息"""
+        block_types: dict[int, str] = {}
+
+        async with client.messages.stream(**args) as stream:
+            async for event in stream:
+                if event.type == 'content_block_start':
+                    block_types[event.index] = event.content_block.type
+                    if event.content_block.type == 'thinking':
+                        self.emit_delta('<think>')
+                elif event.type == 'content_block_delta':
+                    if event.delta.type == 'text_delta':
+                        self.emit_delta(event.delta.text)
+                    elif event.delta.type == 'thinking_delta':
+                        self.emit_delta(event.delta.thinking)
+                elif event.type == 'content_block_stop':
+                    if block_types.get(event.index) == 'thinking':
+                        self.emit_delta('</think>\n')
+
+            return await stream.get_final_message()
+
     async def invoke_llm(
         self,
         query: core_entities.Query,
@@ -54,8 +178,6 @@ class AnthropicMessages(requester.LLMAPIRequester):
         funcs: typing.List[tools_entities.LLMFunction] = None,
         extra_args: dict[str, typing.Any] = {},
     ) -> llm_entities.Message:
-        self.client.api_key = model.token_mgr.get_token()
-
         args = extra_args.copy()
         args['model'] = model.model_entity.name
 
@@ -76,60 +198,7 @@ class AnthropicMessages(requester.LLMAPIRequester):
         if isinstance(system_role_message, llm_entities.Message) and isinstance(system_role_message.content, str):
             args['system'] = system_role_message.content
 
-        req_messages = []
-
-        for m in messages:
-            if m.role == 'tool':
-                tool_call_id = m.tool_call_id
-
-                req_messages.append(
-                    {
-                        'role': 'user',
-                        'content': [
-                            {
-                                'type': 'tool_result',
-                                'tool_use_id': tool_call_id,
-                                'content': m.content,
-                            }
-                        ],
-                    }
-                )
-
-                continue
-
-            msg_dict = m.dict(exclude_none=True)
-
-            if isinstance(m.content, str) and m.content.strip() != '':
-                msg_dict['content'] = [{'type': 'text', 'text': m.content}]
-            elif isinstance(m.content, list):
-                for i, ce in enumerate(m.content):
-                    if ce.type == 'image_base64':
-                        image_b64, image_format = await image.extract_b64_and_format(ce.image_base64)
-
-                        alter_image_ele = {
-                            'type': 'image',
-                            'source': {
-                                'type': 'base64',
-                                'media_type': f'image/{image_format}',
-                                'data': image_b64,
-                            },
-                        }
-                        msg_dict['content'][i] = alter_image_ele
-
-            if m.tool_calls:
-                for tool_call in m.tool_calls:
-                    msg_dict['content'].append(
-                        {
-                            'type': 'tool_use',
-                            'id': tool_call.id,
-                            'name': tool_call.function.name,
-                            'input': json.loads(tool_call.function.arguments),
-                        }
-                    )
-
-                del msg_dict['tool_calls']
-
-            req_messages.append(msg_dict)
+        req_messages = [m.get_wire_format(WIRE_FORMAT, convert_message) for m in messages]
 
         args['messages'] = req_messages
 
@@ -139,13 +208,17 @@ class AnthropicMessages(requester.LLMAPIRequester):
             if tools:
                 args['tools'] = tools
 
+        if self.requester_cfg.get('prompt_cache', True):
+            mark_cache_breakpoints(args)
+
         try:
             # print(json.dumps(args, indent=4, ensure_ascii=False))
-            resp = await self.client.messages.create(**args)
+            resp = await self.invoke_with_key_rotation(model, lambda: self._create(args))
 
             args = {
                 'content': '',
                 'role': resp.role,
+                'usage': make_usage(resp.usage),
             }
 
             assert type(resp) is anthropic.types.message.Message
@@ -13,30 +13,202 @@ from ... import entities as llm_entities
 from ...tools import entities as tools_entities
 
 
+WIRE_FORMAT = 'openai-chat'
+"""Message 上缓存的转换结果所用的格式名"""
+
+_stream_usage_rejected: set[str] = set()
+"""拒绝了 stream_options 参数的接口地址"""
+
+
+def convert_message(m: llm_entities.Message) -> dict:
+    """将消息转换为 ChatCompletion 接口的格式"""
+    msg_dict = m.dict(exclude_none=True, exclude={'usage'})
+    content = msg_dict.get('content')
+    if isinstance(content, list):
+        # 检查 content 列表中是否每个部分都是文本
+        if all(isinstance(part, dict) and part.get('type') == 'text' for part in content):
+            # 将所有文本部分合并为一个字符串
+            msg_dict['content'] = '\n'.join(part['text'] for part in content)
+        else:
+            # 检查vision
+            for me in content:
+                if me['type'] == 'image_base64':
+                    me['image_url'] = {'url': me['image_base64']}
+                    me['type'] = 'image_url'
+                    del me['image_base64']
+    return msg_dict
+
+
+async def create_stream(
+    requester_inst: requester.LLMAPIRequester,
+    client: openai.AsyncClient,
+    args: dict,
+    extra_body: dict,
+) -> openai.AsyncStream:
+    """发起流式请求
+
+    OpenAI 及多数兼容接口只在带上 stream_options.include_usage 时才在最后一个片段中返回用量，故默认带上；
+    不支持此参数的提供商可在请求器配置中关闭 stream_usage，未关闭时在首次被拒绝后自动去掉此参数重试。
+    """
+    base_url = requester_inst.requester_cfg.get('base_url', '')
+    include_usage = requester_inst.requester_cfg.get('stream_usage', True) and base_url not in _stream_usage_rejected
+
+    if include_usage:
+        try:
+            return await client.chat.completions.create(
+                **args, stream=True, stream_options={'include_usage': True}, extra_body=extra_body
+            )
+        except openai.BadRequestError as e:
+            if 'stream_options' not in str(e) and 'include_usage' not in str(e):
+                raise
+
+            _stream_usage_rejected.add(base_url)
+            requester_inst.ap.logger.info(f'{base_url} 不支持 stream_options 参数，流式请求将不再携带，无法统计用量')
+
+    return await client.chat.completions.create(**args, stream=True, extra_body=extra_body)
+
+
+def make_usage(usage: typing.Any) -> llm_entities.Usage | None:
+    """将 ChatCompletion 接口返回的 usage 转换为 Usage
+
+    OpenAI 在 prompt_tokens_details.cached_tokens 中返回命中提示词缓存的 token 数，DeepSeek 则使用 prompt_cache_hit_tokens。
+    """
+    if usage is None:
+        return None
+
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached_tokens = getattr(details, 'cached_tokens', None) or getattr(usage, 'prompt_cache_hit_tokens', None) or 0
+
+    return llm_entities.Usage(
+        prompt_tokens=usage.prompt_tokens or 0,
+        completion_tokens=usage.completion_tokens or 0,
+        cached_tokens=cached_tokens,
+    )
+
+
 class OpenAIChatCompletions(requester.LLMAPIRequester):
     """OpenAI ChatCompletion API 请求器"""
 
     client: openai.AsyncClient
 
+    http_client: httpx.AsyncClient
+    """从客户端池获取的共用 HTTP 客户端"""
+
     default_config: dict[str, typing.Any] = {
         'base_url': 'https://api.openai.com/v1',
         'timeout': 120,
     }
 
     async def initialize(self):
+        self.http_client = self.ap.http_client_pool.acquire(
+            self.requester_cfg['base_url'], timeout=self.requester_cfg['timeout']
+        )
+
         self.client = openai.AsyncClient(
             api_key='',
             base_url=self.requester_cfg['base_url'].replace(' ', ''),
             timeout=self.requester_cfg['timeout'],
-            http_client=httpx.AsyncClient(trust_env=True, timeout=self.requester_cfg['timeout']),
+            http_client=self.http_client,
         )
 
+    async def dispose(self):
+        self.ap.http_client_pool.release(self.http_client)
+
     async def _req(
         self,
         args: dict,
         extra_body: dict = {},
     ) -> chat_completion.ChatCompletion:
-        return await self.client.chat.completions.create(**args, extra_body=extra_body)
+        if self.is_streaming():
+            return await self._req_stream(args, extra_body=extra_body)
+
+        client = self.client.with_options(api_key=self.current_api_key())
+
+        return await client.chat.completions.create(**args, extra_body=extra_body)
+
+    async def _req_stream(
+        self,
+        args: dict,
+        extra_body: dict = {},
+    ) -> chat_completion.ChatCompletion:
+        """以流式方式请求，上报增量文本，并将各片段拼装为完整的 ChatCompletion"""
+        client = self.client.with_options(api_key=self.current_api_key())
+
+        resp_gen = await create_stream(self, client, args, extra_body)
+
+        chunk = None
+        usage = None
+        content = ''
+        reasoning_content = ''
+        tool_calls: dict[int, dict] = {}
+        finish_reason = None
+
+        async for chunk in resp_gen:
+            # 部分提供商在最后一个（choices 为空的）片段中返回用量
+            if getattr(chunk, 'usage', None) is not None:
+                usage = chunk.usage
+
+            if not chunk.choices:
+                continue
+
+            delta = chunk.choices[0].delta
+
+            # deepseek 等推理模型的思维链，与 _make_msg 中的格式保持一致
+            reasoning_delta = getattr(delta, 'reasoning_content', None)
+            if reasoning_delta:
+                if not reasoning_content:
+                    self.emit_delta('<think>\n')
+                reasoning_content += reasoning_delta
+                self.emit_delta(reasoning_delta)
+
+            if delta.content:
+                if reasoning_content and not content:
+                    self.emit_delta('\n</think>\n')
+                content += delta.content
+                self.emit_delta(delta.content)
+
+            for tool_call in delta.tool_calls or []:
+                tc = tool_calls.setdefault(
+                    tool_call.index, {'id': None, 'type': 'function', 'function': {'name': '', 'arguments': ''}}
+                )
+                if tool_call.id:
+                    tc['id'] = tool_call.id
+                if tool_call.function is not None:
+                    if tool_call.function.name:
+                        tc['function']['name'] += tool_call.function.name
+                    if tool_call.function.arguments:
+                        tc['function']['arguments'] += tool_call.function.arguments
+
+            if chunk.choices[0].finish_reason is not None:
+                finish_reason = chunk.choices[0].finish_reason
+
+        if chunk is None:
+            raise errors.RequesterError('接口返回为空，请确定模型提供商服务是否正常')
+
+        message = {
+            'role': 'assistant',
+            'content': content if content or not tool_calls else None,
+            'tool_calls': [tool_calls[index] for index in sorted(tool_calls)] or None,
+        }
+        if reasoning_content:
+            message['reasoning_content'] = reasoning_content
+
+        return chat_completion.ChatCompletion(
+            id=chunk.id,
+            object='chat.completion',
+            created=chunk.created,
+            model=chunk.model,
+            choices=[
+                chat_completion.Choice(
+                    index=0,
+                    message=message,
+                    finish_reason=finish_reason
+                    if finish_reason in ('length', 'tool_calls', 'content_filter', 'function_call')
+                    else 'stop',
+                )
+            ],
+            usage=usage,
+        )
 
     async def _make_msg(
         self,
@@ -55,6 +227,7 @@ class OpenAIChatCompletions(requester.LLMAPIRequester):
             chatcmpl_message['content'] = '<think>\n' + reasoning_content + '\n</think>\n' + chatcmpl_message['content']
 
         message = llm_entities.Message(**chatcmpl_message)
+        message.usage = make_usage(chat_completion.usage)
 
         return message
 
@@ -66,8 +239,6 @@ class OpenAIChatCompletions(requester.LLMAPIRequester):
         use_funcs: list[tools_entities.LLMFunction] = None,
         extra_args: dict[str, typing.Any] = {},
     ) -> llm_entities.Message:
-        self.client.api_key = use_model.token_mgr.get_token()
-
         args = {}
         args['model'] = use_model.model_entity.name
 
@@ -78,18 +249,7 @@ class OpenAIChatCompletions(requester.LLMAPIRequester):
                 args['tools'] = tools
 
         # 设置此次请求中的messages
-        messages = req_messages.copy()
-
-        # 检查vision
-        for msg in messages:
-            if 'content' in msg and isinstance(msg['content'], list):
-                for me in msg['content']:
-                    if me['type'] == 'image_base64':
-                        me['image_url'] = {'url': me['image_base64']}
-                        me['type'] = 'image_url'
-                        del me['image_base64']
-
-        args['messages'] = messages
+        args['messages'] = req_messages.copy()
 
         # 发送请求
         resp = await self._req(args, extra_body=extra_args)
@@ -107,24 +267,20 @@ class OpenAIChatCompletions(requester.LLMAPIRequester):
         funcs: typing.List[tools_entities.LLMFunction] = None,
         extra_args: dict[str, typing.Any] = {},
     ) -> llm_entities.Message:
-        req_messages = []  # req_messages 仅用于类内，外部同步由 query.messages 进行
-        for m in messages:
-            msg_dict = m.dict(exclude_none=True)
-            content = msg_dict.get('content')
-            if isinstance(content, list):
-                # 检查 content 列表中是否每个部分都是文本
-                if all(isinstance(part, dict) and part.get('type') == 'text' for part in content):
-                    # 将所有文本部分合并为一个字符串
-                    msg_dict['content'] = '\n'.join(part['text'] for part in content)
-            req_messages.append(msg_dict)
+        # req_messages 仅用于类内，外部同步由 query.messages 进行
+        # 转换结果缓存在消息上，此处浅复制，子类可替换其中的字段
+        req_messages = [dict(m.get_wire_format(WIRE_FORMAT, convert_message)) for m in messages]
 
         try:
-            return await self._closure(
-                query=query,
-                req_messages=req_messages,
-                use_model=model,
-                use_funcs=funcs,
-                extra_args=extra_args,
+            return await self.invoke_with_key_rotation(
+                model,
+                lambda: self._closure(
+                    query=query,
+                    req_messages=req_messages,
+                    use_model=model,
+                    use_funcs=funcs,
+                    extra_args=extra_args,
+                ),
             )
         except asyncio.TimeoutError:
             raise errors.RequesterError('请求超时')
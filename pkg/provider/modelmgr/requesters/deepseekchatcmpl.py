@@ -25,8 +25,6 @@ class DeepseekChatCompletions(chatcmpl.OpenAIChatCompletions):
         use_funcs: list[tools_entities.LLMFunction] = None,
         extra_args: dict[str, typing.Any] = {},
     ) -> llm_entities.Message:
-        self.client.api_key = use_model.token_mgr.get_token()
-
         args = {}
         args['model'] = use_model.model_entity.name
 
@@ -10,6 +10,18 @@ from ... import entities as llm_entities
 from ...tools import entities as tools_entities
 
 
+def make_usage(usage_metadata: types.GenerateContentResponseUsageMetadata | None) -> llm_entities.Usage | None:
+    """将 Gemini 返回的 usage_metadata 转换为 Usage"""
+    if usage_metadata is None:
+        return None
+
+    return llm_entities.Usage(
+        prompt_tokens=usage_metadata.prompt_token_count or 0,
+        completion_tokens=usage_metadata.candidates_token_count or 0,
+        cached_tokens=usage_metadata.cached_content_token_count or 0,
+    )
+
+
 class GeminiChatCompletions(requester.LLMAPIRequester):
     """Google Gemini API 请求器"""
 
@@ -32,10 +44,6 @@ class GeminiChatCompletions(requester.LLMAPIRequester):
     ) -> llm_entities.Message:
         """调用 Gemini API 生成回复"""
         try:
-            self.client = google.genai.Client(
-                api_key=model.token_mgr.get_token(),
-                http_options=types.HttpOptions(api_version='v1alpha'),
-            )
             contents = []
 
             system_content = None
@@ -59,19 +67,46 @@ class GeminiChatCompletions(requester.LLMAPIRequester):
                     content = types.Content(role=role, parts=parts)
                     contents.append(content)
 
-            response = self.client.models.generate_content(
-                model=model.model_entity.name,
-                contents=contents,
-                config=types.GenerateContentConfig(
-                    system_instruction=system_content,
-                    **extra_args,
-                ),
+            config = types.GenerateContentConfig(
+                system_instruction=system_content,
+                **extra_args,
             )
 
-            return llm_entities.Message(
-                role='assistant',
-                content=response.candidates[0].content.parts[0].text,
-            )
+            async def _request() -> llm_entities.Message:
+                client = google.genai.Client(
+                    api_key=self.current_api_key(),
+                    http_options=types.HttpOptions(api_version='v1alpha'),
+                )
+
+                if self.is_streaming():
+                    text = ''
+                    usage_metadata = None
+                    async for chunk in await client.aio.models.generate_content_stream(
+                        model=model.model_entity.name,
+                        contents=contents,
+                        config=config,
+                    ):
+                        if chunk.text:
+                            text += chunk.text
+                            self.emit_delta(chunk.text)
+                        if chunk.usage_metadata is not None:
+                            usage_metadata = chunk.usage_metadata
+
+                    return llm_entities.Message(role='assistant', content=text, usage=make_usage(usage_metadata))
+
+                response = await client.aio.models.generate_content(
+                    model=model.model_entity.name,
+                    contents=contents,
+                    config=config,
+                )
+
+                return llm_entities.Message(
+                    role='assistant',
+                    content=response.candidates[0].content.parts[0].text,
+                    usage=make_usage(response.usage_metadata),
+                )
+
+            return await self.invoke_with_key_rotation(model, _request)
 
         except Exception as e:
             error_message = str(e).lower()
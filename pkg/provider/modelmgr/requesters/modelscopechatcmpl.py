@@ -9,6 +9,7 @@ import openai.types.chat.chat_completion_message_tool_call as chat_completion_me
 import httpx
 
 from .. import entities, errors, requester
+from . import chatcmpl
 from ....core import entities as core_entities
 from ... import entities as llm_entities
 from ...tools import entities as tools_entities
@@ -19,33 +20,43 @@ class ModelScopeChatCompletions(requester.LLMAPIRequester):
 
     client: openai.AsyncClient
 
+    http_client: httpx.AsyncClient
+    """从客户端池获取的共用 HTTP 客户端"""
+
     default_config: dict[str, typing.Any] = {
         'base_url': 'https://api-inference.modelscope.cn/v1',
         'timeout': 120,
     }
 
     async def initialize(self):
+        self.http_client = self.ap.http_client_pool.acquire(
+            self.requester_cfg['base_url'], timeout=self.requester_cfg['timeout']
+        )
+
         self.client = openai.AsyncClient(
             api_key='',
             base_url=self.requester_cfg['base_url'],
             timeout=self.requester_cfg['timeout'],
-            http_client=httpx.AsyncClient(trust_env=True, timeout=self.requester_cfg['timeout']),
+            http_client=self.http_client,
         )
 
+    async def dispose(self):
+        self.ap.http_client_pool.release(self.http_client)
+
     async def _req(
         self,
         args: dict,
         extra_body: dict = {},
     ) -> chat_completion.ChatCompletion:
-        args['stream'] = True
-
         chunk = None
 
         pending_content = ''
 
         tool_calls = []
 
-        resp_gen: openai.AsyncStream = await self.client.chat.completions.create(**args, extra_body=extra_body)
+        client = self.client.with_options(api_key=self.current_api_key())
+
+        resp_gen = await chatcmpl.create_stream(self, client, args, extra_body)
 
         async for chunk in resp_gen:
             # print(chunk)
@@ -54,6 +65,7 @@ class ModelScopeChatCompletions(requester.LLMAPIRequester):
 
             if chunk.choices[0].delta.content is not None:
                 pending_content += chunk.choices[0].delta.content
+                self.emit_delta(chunk.choices[0].delta.content)
 
             if chunk.choices[0].delta.tool_calls is not None:
                 for tool_call in chunk.choices[0].delta.tool_calls:
@@ -118,6 +130,7 @@ class ModelScopeChatCompletions(requester.LLMAPIRequester):
             chatcmpl_message['role'] = 'assistant'
 
         message = llm_entities.Message(**chatcmpl_message)
+        message.usage = chatcmpl.make_usage(chat_completion.usage)
 
         return message
 
@@ -129,8 +142,6 @@ class ModelScopeChatCompletions(requester.LLMAPIRequester):
         use_funcs: list[tools_entities.LLMFunction] = None,
         extra_args: dict[str, typing.Any] = {},
     ) -> llm_entities.Message:
-        self.client.api_key = use_model.token_mgr.get_token()
-
         args = {}
         args['model'] = use_model.model_entity.name
 
@@ -141,18 +152,7 @@ class ModelScopeChatCompletions(requester.LLMAPIRequester):
                 args['tools'] = tools
 
         # 设置此次请求中的messages
-        messages = req_messages.copy()
-
-        # 检查vision
-        for msg in messages:
-            if 'content' in msg and isinstance(msg['content'], list):
-                for me in msg['content']:
-                    if me['type'] == 'image_base64':
-                        me['image_url'] = {'url': me['image_base64']}
-                        me['type'] = 'image_url'
-                        del me['image_base64']
-
-        args['messages'] = messages
+        args['messages'] = req_messages.copy()
 
         # 发送请求
         resp = await self._req(args, extra_body=extra_args)
@@ -170,20 +170,15 @@ class ModelScopeChatCompletions(requester.LLMAPIRequester):
         funcs: typing.List[tools_entities.LLMFunction] = None,
         extra_args: dict[str, typing.Any] = {},
     ) -> llm_entities.Message:
-        req_messages = []  # req_messages 仅用于类内，外部同步由 query.messages 进行
-        for m in messages:
-            msg_dict = m.dict(exclude_none=True)
-            content = msg_dict.get('content')
-            if isinstance(content, list):
-                # 检查 content 列表中是否每个部分都是文本
-                if all(isinstance(part, dict) and part.get('type') == 'text' for part in content):
-                    # 将所有文本部分合并为一个字符串
-                    msg_dict['content'] = '\n'.join(part['text'] for part in content)
-            req_messages.append(msg_dict)
+        # req_messages 仅用于类内，外部同步由 query.messages 进行
+        req_messages = [m.get_wire_format(chatcmpl.WIRE_FORMAT, chatcmpl.convert_message) for m in messages]
 
         try:
-            return await self._closure(
-                query=query, req_messages=req_messages, use_model=model, use_funcs=funcs, extra_args=extra_args
+            return await self.invoke_with_key_rotation(
+                model,
+                lambda: self._closure(
+                    query=query, req_messages=req_messages, use_model=model, use_funcs=funcs, extra_args=extra_args
+                ),
             )
         except asyncio.TimeoutError:
             raise errors.RequesterError('请求超时')
@@ -17,6 +17,32 @@ from ....core import entities as core_entities
 REQUESTER_NAME: str = 'ollama-chat'
 
 
+WIRE_FORMAT = 'ollama-chat'
+"""Message 上缓存的转换结果所用的格式名"""
+
+
+def convert_message(m: llm_entities.Message) -> dict:
+    """将消息转换为 Ollama chat 接口的格式"""
+    msg_dict: dict = m.dict(exclude_none=True, exclude={'usage'})
+    content: Any = msg_dict.get('content')
+    if isinstance(content, list):
+        text_content: list = []
+        image_urls: list = []
+        for me in content:
+            if me['type'] == 'text':
+                text_content.append(me['text'])
+            elif me['type'] == 'image_base64':
+                image_urls.append(me['image_base64'])
+
+        msg_dict['content'] = '\n'.join(text_content)
+        if image_urls:
+            msg_dict['images'] = [url.split(',')[1] for url in image_urls]
+    if 'tool_calls' in msg_dict:  # LangBot 内部以 str 存储 tool_calls 的参数，这里需要转换为 dict
+        for tool_call in msg_dict['tool_calls']:
+            tool_call['function']['arguments'] = json.loads(tool_call['function']['arguments'])
+    return msg_dict
+
+
 class OllamaChatCompletions(requester.LLMAPIRequester):
     """Ollama平台 ChatCompletion API请求器"""
 
@@ -35,40 +61,50 @@ class OllamaChatCompletions(requester.LLMAPIRequester):
         self,
         args: dict,
     ) -> Union[Mapping[str, Any], AsyncIterator[Mapping[str, Any]]]:
+        if self.is_streaming():
+            return await self._req_stream(args)
+
         return await self.client.chat(**args)
 
+    async def _req_stream(self, args: dict) -> ollama.ChatResponse:
+        """以流式方式请求并上报增量文本，将各片段拼装为完整的响应"""
+        last_part: ollama.ChatResponse = None
+        content = ''
+        tool_calls: list[ollama.Message.ToolCall] = []
+
+        async for part in await self.client.chat(**args, stream=True):
+            last_part = part
+            if part.message.content:
+                content += part.message.content
+                self.emit_delta(part.message.content)
+            if part.message.tool_calls:
+                tool_calls.extend(part.message.tool_calls)
+
+        if last_part is None:
+            raise errors.RequesterError('接口返回为空，请确定模型提供商服务是否正常')
+
+        return last_part.model_copy(
+            update={
+                'message': ollama.Message(role='assistant', content=content, tool_calls=tool_calls or None),
+            }
+        )
+
     async def _closure(
         self,
         query: core_entities.Query,
         req_messages: list[dict],
         use_model: requester.RuntimeLLMModel,
-        user_funcs: list[tools_entities.LLMFunction] = None,
+        use_funcs: list[tools_entities.LLMFunction] = None,
         extra_args: dict[str, typing.Any] = {},
     ) -> llm_entities.Message:
         args = extra_args.copy()
         args['model'] = use_model.model_entity.name
 
-        messages: list[dict] = req_messages.copy()
-        for msg in messages:
-            if 'content' in msg and isinstance(msg['content'], list):
-                text_content: list = []
-                image_urls: list = []
-                for me in msg['content']:
-                    if me['type'] == 'text':
-                        text_content.append(me['text'])
-                    elif me['type'] == 'image_base64':
-                        image_urls.append(me['image_base64'])
-
-                msg['content'] = '\n'.join(text_content)
-                msg['images'] = [url.split(',')[1] for url in image_urls]
-            if 'tool_calls' in msg:  # LangBot 内部以 str 存储 tool_calls 的参数，这里需要转换为 dict
-                for tool_call in msg['tool_calls']:
-                    tool_call['function']['arguments'] = json.loads(tool_call['function']['arguments'])
-        args['messages'] = messages
+        args['messages'] = req_messages.copy()
 
         args['tools'] = []
-        if user_funcs:
-            tools = await self.ap.tool_mgr.generate_tools_for_openai(user_funcs)
+        if use_funcs:
+            tools = await self.ap.tool_mgr.generate_tools_for_openai(use_funcs)
             if tools:
                 args['tools'] = tools
 
@@ -101,6 +137,12 @@ class OllamaChatCompletions(requester.LLMAPIRequester):
                 )
             ret_msg.tool_calls = tool_calls
 
+        if ret_msg is not None:
+            ret_msg.usage = llm_entities.Usage(
+                prompt_tokens=chat_completions.prompt_eval_count or 0,
+                completion_tokens=chat_completions.eval_count or 0,
+            )
+
         return ret_msg
 
     async def invoke_llm(
@@ -111,14 +153,7 @@ class OllamaChatCompletions(requester.LLMAPIRequester):
         funcs: typing.List[tools_entities.LLMFunction] = None,
         extra_args: dict[str, typing.Any] = {},
     ) -> llm_entities.Message:
-        req_messages: list = []
-        for m in messages:
-            msg_dict: dict = m.dict(exclude_none=True)
-            content: Any = msg_dict.get('content')
-            if isinstance(content, list):
-                if all(isinstance(part, dict) and part.get('type') == 'text' for part in content):
-                    msg_dict['content'] = '\n'.join(part['text'] for part in content)
-            req_messages.append(msg_dict)
+        req_messages: list = [m.get_wire_format(WIRE_FORMAT, convert_message) for m in messages]
         try:
             return await self._closure(
                 query=query,
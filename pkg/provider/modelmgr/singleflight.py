@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+import asyncio
+
+from .. import entities as llm_entities
+
+
+class SingleFlight:
+    """合并并发的相同模型请求
+
+    同一指纹的请求在进行中时，后到的请求不再请求模型，而是等待首个请求的结果。
+    """
+
+    inflight: dict[str, asyncio.Future[llm_entities.Message]]
+    """进行中的请求，键为请求指纹"""
+
+    leader_count: int
+    """实际发出的请求数"""
+
+    coalesced_count: int
+    """被合并、等待其他请求结果的请求数"""
+
+    def __init__(self):
+        self.inflight = {}
+        self.leader_count = 0
+        self.coalesced_count = 0
+
+    def join(self, key: str) -> asyncio.Future[llm_entities.Message] | None:
+        """若有相同指纹的请求在进行中，返回其结果的 Future"""
+        future = self.inflight.get(key)
+        if future is not None:
+            self.coalesced_count += 1
+        return future
+
+    def begin(self, key: str):
+        """登记一个即将发出的请求，请求结束后必须调用 finish"""
+        self.inflight[key] = asyncio.get_running_loop().create_future()
+        self.leader_count += 1
+
+    def finish(self, key: str, result: llm_entities.Message | None = None, error: BaseException | None = None):
+        """结束请求，把结果或异常交给等待中的请求"""
+        future = self.inflight.pop(key, None)
+        if future is None or future.done():
+            return
+
+        if error is not None:
+            future.set_exception(error)
+            # 没有等待者时避免 "exception was never retrieved" 警告
+            future.exception()
+        else:
+            future.set_result(result)
+
+    def get_stats(self) -> dict:
+        return {
+            'inflight': len(self.inflight),
+            'leader_count': self.leader_count,
+            'coalesced_count': self.coalesced_count,
+        }
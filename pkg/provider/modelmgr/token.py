@@ -1,24 +1,112 @@
 from __future__ import annotations
 
-import typing
+import time
+
+
+DEFAULT_RATE_LIMIT_COOLDOWN = 60
+"""被限流（429）且未给出 Retry-After 时的冷却秒数"""
+
+DEFAULT_AUTH_FAILURE_COOLDOWN = 600
+"""鉴权失败、余额不足（401/402/403）时的冷却秒数"""
+
+
+class TokenState:
+    """单个 api key 的健康状态与统计"""
+
+    cooldown_until: float
+    """冷却结束时间（monotonic），在此之前不主动选用"""
+
+    last_used: float
+    """最近一次选用的时间（monotonic）"""
+
+    success_count: int
+
+    failure_count: int
+
+    total_latency: float
+    """成功请求的总耗时（秒）"""
+
+    def __init__(self):
+        self.cooldown_until = 0.0
+        self.last_used = 0.0
+        self.success_count = 0
+        self.failure_count = 0
+        self.total_latency = 0.0
+
+    def is_healthy(self, now: float) -> bool:
+        return self.cooldown_until <= now
 
 
 class TokenManager:
-    """鉴权 Token 管理器"""
+    """鉴权 Token 管理器
+
+    每次选用健康（未在冷却中）的 key 里最久未被使用的一个，使请求均匀分布在各个 key 上；
+    key 被限流或鉴权失败时进入冷却，冷却期间只有所有 key 都不可用时才会被选用。
+    """
 
     name: str
 
     tokens: list[str]
 
-    using_token_index: typing.Optional[int] = 0
+    states: dict[str, TokenState]
 
     def __init__(self, name: str, tokens: list[str]):
         self.name = name
         self.tokens = tokens
-        self.using_token_index = 0
+        self.states = {token: TokenState() for token in tokens}
 
     def get_token(self) -> str:
-        return self.tokens[self.using_token_index]
+        """选用一个 key"""
+        if not self.tokens:
+            return ''
+
+        now = time.monotonic()
+
+        healthy = [token for token in self.tokens if self.states[token].is_healthy(now)]
+
+        if healthy:
+            token = min(healthy, key=lambda t: self.states[t].last_used)
+        else:
+            # 全部在冷却中，选最早恢复的
+            token = min(self.tokens, key=lambda t: self.states[t].cooldown_until)
+
+        self.states[token].last_used = now
+        return token
+
+    def healthy_count(self) -> int:
+        now = time.monotonic()
+        return sum(1 for state in self.states.values() if state.is_healthy(now))
+
+    def report_success(self, token: str, latency: float):
+        state = self.states.get(token)
+        if state is None:
+            return
+
+        state.success_count += 1
+        state.total_latency += latency
+        state.cooldown_until = 0.0
+
+    def report_failure(self, token: str, cooldown: float):
+        """报告 key 不可用，冷却 cooldown 秒"""
+        state = self.states.get(token)
+        if state is None:
+            return
+
+        state.failure_count += 1
+        state.cooldown_until = max(state.cooldown_until, time.monotonic() + cooldown)
+
+    def get_stats(self) -> list[dict]:
+        """各 key 的统计，key 本身只保留首尾几位"""
+        now = time.monotonic()
 
-    def next_token(self):
-        self.using_token_index = (self.using_token_index + 1) % len(self.tokens)
+        return [
+            {
+                'key': f'{token[:4]}...{token[-4:]}' if len(token) > 12 else '***',
+                'healthy': state.is_healthy(now),
+                'cooldown_remaining': max(0.0, state.cooldown_until - now),
+                'success': state.success_count,
+                'failure': state.failure_count,
+                'avg_latency': state.total_latency / state.success_count if state.success_count else 0.0,
+            }
+            for token, state in self.states.items()
+        ]
@@ -0,0 +1,45 @@
+from __future__ import annotations
+
+from .. import entities as llm_entities
+
+
+class UsageCounter:
+    """累计模型请求的 token 用量"""
+
+    request_count: int
+    """成功的请求数"""
+
+    prompt_tokens: int
+
+    completion_tokens: int
+
+    cached_tokens: int
+
+    cache_creation_tokens: int
+
+    def __init__(self):
+        self.request_count = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_tokens = 0
+        self.cache_creation_tokens = 0
+
+    def add(self, usage: llm_entities.Usage | None):
+        if usage is None:
+            return
+
+        self.request_count += 1
+        self.prompt_tokens += usage.prompt_tokens
+        self.completion_tokens += usage.completion_tokens
+        self.cached_tokens += usage.cached_tokens
+        self.cache_creation_tokens += usage.cache_creation_tokens
+
+    def get_stats(self) -> dict:
+        return {
+            'request_count': self.request_count,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cached_tokens': self.cached_tokens,
+            'cache_creation_tokens': self.cache_creation_tokens,
+            'cache_hit_rate': self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+        }
@@ -26,6 +26,9 @@ class RequestRunner(abc.ABC):
 
     name: str = None
 
+    supports_streaming: bool = False
+    """是否支持流式运行，支持则 run 接受 stream 参数"""
+
     ap: app.Application
 
     pipeline_config: dict
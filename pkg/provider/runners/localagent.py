@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import asyncio
 import json
+import time
 import typing
 
 from .. import runner
+from ..modelmgr import cache, errors
 from ...core import entities as core_entities
 from .. import entities as llm_entities
 
@@ -12,65 +15,201 @@ from .. import entities as llm_entities
 class LocalAgentRunner(runner.RequestRunner):
     """本地Agent请求运行器"""
 
-    async def run(self, query: core_entities.Query) -> typing.AsyncGenerator[llm_entities.Message, None]:
-        """运行请求"""
-        pending_tool_calls = []
-
-        req_messages = query.prompt.messages.copy() + query.messages.copy() + [query.user_message]
+    supports_streaming = True
 
-        # 首次请求
-        msg = await query.use_llm_model.requester.invoke_llm(
-            query,
-            query.use_llm_model,
+    def _make_fingerprint(self, query: core_entities.Query, req_messages: list[llm_entities.Message]) -> str:
+        return cache.make_fingerprint(
+            query.use_llm_model.model_entity.uuid,
             req_messages,
             query.use_funcs,
-            extra_args=query.use_llm_model.model_entity.extra_args,
+            query.use_llm_model.model_entity.extra_args,
         )
 
-        yield msg
+    async def _invoke(
+        self, query: core_entities.Query, req_messages: list[llm_entities.Message], stream: bool
+    ) -> typing.AsyncGenerator[llm_entities.Message | llm_entities.MessageChunk, None]:
+        """请求模型，流式模式下先逐个产出增量片段，最后产出完整消息"""
+        config = self.pipeline_config['ai']['local-agent']
 
-        pending_tool_calls = msg.tool_calls
+        use_cache = config.get('response-cache', False) and not (
+            config.get('response-cache-bypass-history', True) and query.messages
+        )
+        use_single_flight = config.get('single-flight', False)
+
+        fingerprint = self._make_fingerprint(query, req_messages) if use_cache or use_single_flight else None
+
+        response_cache = self.ap.model_mgr.response_cache
+        single_flight = self.ap.model_mgr.single_flight
+
+        if use_cache:
+            msg = await response_cache.get(fingerprint)
+
+            if msg is not None:
+                self.ap.logger.debug(f'对话({query.query_id})命中回复缓存')
+
+                if stream and isinstance(msg.content, str) and msg.content:
+                    yield llm_entities.MessageChunk(content=msg.content)
+                yield msg
+                return
+
+        if use_single_flight:
+            future = single_flight.join(fingerprint)
+
+            if future is not None:
+                self.ap.logger.debug(f'对话({query.query_id})与进行中的相同请求合并')
+
+                # shield 使本请求被取消时不影响其他等待者
+                msg = (await asyncio.shield(future)).copy(deep=True)
+
+                if stream and isinstance(msg.content, str) and msg.content:
+                    yield llm_entities.MessageChunk(content=msg.content)
+                yield msg
+                return
+
+            single_flight.begin(fingerprint)
+
+        start_time = time.perf_counter()
+
+        models = [query.use_llm_model] + (query.fallback_llm_models or [])
+
+        try:
+            if not stream:
+                msg = await self.ap.model_mgr.invoke_llm_with_fallback(
+                    query,
+                    models,
+                    req_messages,
+                    query.use_funcs,
+                    hedge=config.get('hedge', False),
+                )
+            else:
+                async for chunk in self.ap.model_mgr.invoke_llm_stream_with_fallback(
+                    query,
+                    models,
+                    req_messages,
+                    query.use_funcs,
+                ):
+                    if chunk.is_final:
+                        msg = chunk.message
+                    else:
+                        yield chunk
+        except BaseException as e:
+            if use_single_flight:
+                single_flight.finish(
+                    fingerprint,
+                    error=e if isinstance(e, Exception) else errors.RequesterError('合并的请求已被取消'),
+                )
+            raise
+
+        if use_single_flight:
+            single_flight.finish(fingerprint, result=msg)
+
+        # 工具调用的结果随时可能变化，只缓存最终回复
+        if use_cache and not msg.tool_calls:
+            await response_cache.set(
+                fingerprint,
+                query.use_llm_model.model_entity.uuid,
+                msg,
+                latency=time.perf_counter() - start_time,
+                ttl=config.get('response-cache-ttl', 3600),
+            )
 
-        req_messages.append(msg)
+        yield msg
 
-        # 持续请求，只要还有待处理的工具调用就继续处理调用
-        while pending_tool_calls:
-            for tool_call in pending_tool_calls:
-                try:
-                    func = tool_call.function
+    async def _execute_tool_call(
+        self, query: core_entities.Query, tool_call: llm_entities.ToolCall
+    ) -> llm_entities.Message:
+        try:
+            func = tool_call.function
 
-                    parameters = json.loads(func.arguments)
+            parameters = json.loads(func.arguments)
 
-                    func_ret = await self.ap.tool_mgr.execute_func_call(query, func.name, parameters)
+            func_ret = await self.ap.tool_mgr.execute_func_call(query, func.name, parameters)
 
-                    msg = llm_entities.Message(
-                        role='tool',
-                        content=json.dumps(func_ret, ensure_ascii=False),
-                        tool_call_id=tool_call.id,
-                    )
+            content = json.dumps(func_ret, ensure_ascii=False)
 
+            # 过长的结果会留在之后每次请求的上文中，截断后再交给模型
+            max_length = self.pipeline_config['ai']['local-agent'].get('tool-result-max-length', 20000)
+            if max_length and len(content) > max_length:
+                self.ap.logger.debug(
+                    f'对话({query.query_id})工具 {func.name} 的结果过长（{len(content)} 字符），已截断'
+                )
+                content = content[:max_length] + f'\n...(结果过长，已截断，共 {len(content)} 字符)'
+
+            return llm_entities.Message(
+                role='tool',
+                content=content,
+                tool_call_id=tool_call.id,
+            )
+        except Exception as e:
+            # 工具调用出错，添加一个报错信息到 req_messages
+            return llm_entities.Message(role='tool', content=f'err: {e}', tool_call_id=tool_call.id)
+
+    async def _execute_tool_calls(
+        self, query: core_entities.Query, tool_calls: list[llm_entities.ToolCall]
+    ) -> typing.AsyncGenerator[llm_entities.Message, None]:
+        """执行一条模型消息中的工具调用，按调用的顺序产出结果
+
+        连续的可并发调用分为一批并发执行，并发数受 tool-call-concurrency 限制；
+        不可并发的工具（LLMFunction.parallel 为 False）单独执行，且在其前后的调用完成之前不会开始。
+        """
+        concurrency = self.pipeline_config['ai']['local-agent'].get('tool-call-concurrency', 4)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        parallel_funcs = {f.name: f.parallel for f in query.use_funcs or []}
+
+        async def _execute(tool_call: llm_entities.ToolCall) -> llm_entities.Message:
+            async with semaphore:
+                return await self._execute_tool_call(query, tool_call)
+
+        batch: list[llm_entities.ToolCall] = []
+
+        for tool_call in tool_calls + [None]:
+            if tool_call is not None and parallel_funcs.get(tool_call.function.name, True):
+                batch.append(tool_call)
+                continue
+
+            if len(batch) == 1:
+                yield await self._execute_tool_call(query, batch[0])
+            elif batch:
+                for msg in await asyncio.gather(*[_execute(tc) for tc in batch]):
                     yield msg
 
-                    req_messages.append(msg)
-                except Exception as e:
-                    # 工具调用出错，添加一个报错信息到 req_messages
-                    err_msg = llm_entities.Message(role='tool', content=f'err: {e}', tool_call_id=tool_call.id)
+            batch = []
 
-                    yield err_msg
+            if tool_call is not None:
+                yield await self._execute_tool_call(query, tool_call)
 
-                    req_messages.append(err_msg)
+    async def run(
+        self, query: core_entities.Query, stream: bool = False
+    ) -> typing.AsyncGenerator[llm_entities.Message | llm_entities.MessageChunk, None]:
+        """运行请求
 
-            # 处理完所有调用，再次请求
-            msg = await query.use_llm_model.requester.invoke_llm(
-                query,
-                query.use_llm_model,
-                req_messages,
-                query.use_funcs,
-                extra_args=query.use_llm_model.model_entity.extra_args,
-            )
+        Args:
+            stream: 是否流式运行，是则在每条完整的模型消息之前产出其增量片段（MessageChunk）
+        """
+        pending_tool_calls = []
+
+        req_messages = query.prompt.messages.copy() + query.messages.copy() + [query.user_message]
 
+        # 首次请求
+        async for msg in self._invoke(query, req_messages, stream):
             yield msg
 
+        pending_tool_calls = msg.tool_calls
+
+        req_messages.append(msg)
+
+        # 持续请求，只要还有待处理的工具调用就继续处理调用
+        while pending_tool_calls:
+            async for msg in self._execute_tool_calls(query, pending_tool_calls):
+                yield msg
+
+                req_messages.append(msg)
+
+            # 处理完所有调用，再次请求
+            async for msg in self._invoke(query, req_messages, stream):
+                yield msg
+
             pending_tool_calls = msg.tool_calls
 
             req_messages.append(msg)
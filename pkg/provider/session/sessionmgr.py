@@ -1,9 +1,15 @@
 from __future__ import annotations
 
 import asyncio
+import collections
+import datetime
+import json
+
+import sqlalchemy
 
 from ...core import app, entities as core_entities
 from ...provider import entities as provider_entities
+from ...entity.persistence import session as persistence_session
 
 
 class SessionManager:
@@ -11,20 +17,63 @@ class SessionManager:
 
     ap: app.Application
 
-    session_list: list[core_entities.Session]
+    sessions: collections.OrderedDict[tuple[core_entities.LauncherTypes, int | str], core_entities.Session]
+    """会话表，以 (launcher_type, launcher_id) 为键，按最近活跃时间从旧到新排列"""
+
+    idle_ttl: int
+    """会话闲置超过此秒数后被淘汰，0 为不限制"""
+
+    max_sessions: int
+    """内存中最多保留的会话数，超出时淘汰最久未活跃的会话，0 为不限制"""
+
+    spill_to_database: bool
+    """淘汰会话前是否将其对话保存到数据库，会话再次活跃时恢复"""
+
+    eviction_candidates: collections.OrderedDict[tuple[core_entities.LauncherTypes, int | str], None]
+    """可能被淘汰的会话，按最近活跃时间从旧到新排列
+
+    淘汰时发现忙碌的会话被移出此表，待请求池通知其空闲或再次被访问时放回，
+    使超出上限而会话都在忙时，每次淘汰不必重新检查所有会话。
+    """
+
+    evicted_session_count: int
+    """已淘汰的会话数"""
+
+    _pending_archives: dict[tuple[core_entities.LauncherTypes, int | str], asyncio.Task]
+    """正在保存到数据库的会话，同一会话的恢复须等待保存完成"""
 
     def __init__(self, ap: app.Application):
         self.ap = ap
-        self.session_list = []
+        self.sessions = collections.OrderedDict()
+        self.eviction_candidates = collections.OrderedDict()
+        self.evicted_session_count = 0
+        self._pending_archives = {}
+
+    @property
+    def session_list(self) -> list[core_entities.Session]:
+        return list(self.sessions.values())
 
     async def initialize(self):
-        pass
+        session_cfg = self.ap.instance_config.data.get('session', {})
+
+        self.idle_ttl = session_cfg.get('idle-ttl', 0)
+        self.max_sessions = session_cfg.get('max-sessions', 0)
+        self.spill_to_database = session_cfg.get('spill-to-database', False)
 
     async def get_session(self, query: core_entities.Query) -> core_entities.Session:
         """获取会话"""
-        for session in self.session_list:
-            if query.launcher_type == session.launcher_type and query.launcher_id == session.launcher_id:
-                return session
+        key = (query.launcher_type, query.launcher_id)
+
+        session = self.sessions.get(key)
+
+        if session is not None:
+            session.update_time = datetime.datetime.now()
+            self.sessions.move_to_end(key)
+            self.eviction_candidates[key] = None
+            self.eviction_candidates.move_to_end(key)
+            return session
+
+        self.evict_sessions(reserve=1)
 
         session_concurrency = self.ap.instance_config.data['concurrency']['session']
 
@@ -33,9 +82,151 @@ class SessionManager:
             launcher_id=query.launcher_id,
             semaphore=asyncio.Semaphore(session_concurrency),
         )
-        self.session_list.append(session)
+
+        if self.spill_to_database:
+            pending_archive = self._pending_archives.get(key)
+            if pending_archive is not None:
+                await asyncio.wait({pending_archive})
+
+            await self._restore_session(session)
+
+            # 恢复期间可能已有其他协程创建了此会话
+            if key in self.sessions:
+                return await self.get_session(query)
+
+        self.sessions[key] = session
+        self.eviction_candidates[key] = None
         return session
 
+    def on_session_idle(self, key: tuple[core_entities.LauncherTypes, int | str]):
+        """请求池通知会话已没有正在处理或待处理的请求"""
+        if key in self.sessions and key not in self.eviction_candidates:
+            self.eviction_candidates[key] = None
+
+    def evict_sessions(self, reserve: int = 0):
+        """淘汰闲置超时的会话，以及超出数量上限的最久未活跃会话
+
+        正在处理或仍有待处理请求的会话不会被淘汰。开启 spill-to-database 时，
+        被淘汰会话的对话在后台保存到数据库。
+
+        Args:
+            reserve (int): 为即将创建的会话预留的名额
+        """
+        if not self.idle_ttl and not self.max_sessions:
+            return
+
+        expire_before = datetime.datetime.now() - datetime.timedelta(seconds=self.idle_ttl) if self.idle_ttl else None
+
+        while self.eviction_candidates:
+            key = next(iter(self.eviction_candidates))
+            session = self.sessions[key]
+
+            over_capacity = self.max_sessions and len(self.sessions) + reserve > self.max_sessions
+            expired = expire_before is not None and session.update_time < expire_before
+
+            if not over_capacity and not expired:
+                break
+
+            del self.eviction_candidates[key]
+
+            if self.ap.query_pool.is_session_active(key):
+                # 忙碌的会话移出候选，空闲后由 on_session_idle 放回
+                continue
+
+            del self.sessions[key]
+            self.evicted_session_count += 1
+
+            if self.spill_to_database:
+                self._pending_archives[key] = asyncio.create_task(self._archive_session(session))
+
+    async def shutdown(self):
+        """等待正在进行的会话保存完成"""
+        if self._pending_archives:
+            await asyncio.wait(list(self._pending_archives.values()))
+
+    async def _archive_session(self, session: core_entities.Session):
+        key = (session.launcher_type, session.launcher_id)
+        try:
+            await self._save_session(session)
+        finally:
+            if self._pending_archives.get(key) is asyncio.current_task():
+                del self._pending_archives[key]
+
+    async def _save_session(self, session: core_entities.Session):
+        """将会话的对话保存到数据库"""
+        if not session.conversations:
+            return
+
+        conversations = [
+            json.loads(conv.json(exclude={'use_llm_model', 'use_funcs', 'funcs_version'}))
+            for conv in session.conversations
+        ]
+
+        using_conversation_index = None
+        for i, conv in enumerate(session.conversations):
+            if conv is session.using_conversation:
+                using_conversation_index = i
+                break
+
+        condition = sqlalchemy.and_(
+            persistence_session.ArchivedSession.launcher_type == session.launcher_type.value,
+            persistence_session.ArchivedSession.launcher_id == str(session.launcher_id),
+        )
+
+        try:
+            await self.ap.persistence_mgr.execute_async(
+                sqlalchemy.delete(persistence_session.ArchivedSession).where(condition)
+            )
+            await self.ap.persistence_mgr.execute_async(
+                sqlalchemy.insert(persistence_session.ArchivedSession).values(
+                    launcher_type=session.launcher_type.value,
+                    launcher_id=str(session.launcher_id),
+                    conversations=conversations,
+                    using_conversation_index=using_conversation_index,
+                )
+            )
+        except Exception as e:
+            self.ap.logger.error(f'保存会话 {session.launcher_type.value}_{session.launcher_id} 到数据库失败: {e}')
+
+    async def _restore_session(self, session: core_entities.Session):
+        """从数据库恢复会话的对话，恢复后删除数据库中的记录"""
+        condition = sqlalchemy.and_(
+            persistence_session.ArchivedSession.launcher_type == session.launcher_type.value,
+            persistence_session.ArchivedSession.launcher_id == str(session.launcher_id),
+        )
+
+        try:
+            result = await self.ap.persistence_mgr.execute_async(
+                sqlalchemy.select(persistence_session.ArchivedSession).where(condition)
+            )
+            archived = result.first()
+
+            if archived is None:
+                return
+
+            archived = persistence_session.ArchivedSession(**archived._mapping)
+
+            funcs_version = self.ap.tool_mgr.version
+            use_funcs = await self.ap.tool_mgr.get_all_functions(
+                plugin_enabled=True,
+            )
+
+            session.conversations = [
+                core_entities.Conversation.parse_obj({**conv, 'use_funcs': use_funcs, 'funcs_version': funcs_version})
+                for conv in archived.conversations
+            ]
+
+            if archived.using_conversation_index is not None and archived.using_conversation_index < len(
+                session.conversations
+            ):
+                session.using_conversation = session.conversations[archived.using_conversation_index]
+
+            await self.ap.persistence_mgr.execute_async(
+                sqlalchemy.delete(persistence_session.ArchivedSession).where(condition)
+            )
+        except Exception as e:
+            self.ap.logger.error(f'从数据库恢复会话 {session.launcher_type.value}_{session.launcher_id} 失败: {e}')
+
     async def get_conversation(
         self,
         query: core_entities.Query,
@@ -59,14 +250,23 @@ class SessionManager:
         )
 
         if session.using_conversation is None:
+            funcs_version = self.ap.tool_mgr.version
             conversation = core_entities.Conversation(
                 prompt=prompt,
                 messages=[],
                 use_funcs=await self.ap.tool_mgr.get_all_functions(
                     plugin_enabled=True,
                 ),
+                funcs_version=funcs_version,
             )
             session.conversations.append(conversation)
             session.using_conversation = conversation
+        elif session.using_conversation.funcs_version != self.ap.tool_mgr.version:
+            # 插件或 MCP 服务器变化后，已有对话也使用新的工具列表
+            funcs_version = self.ap.tool_mgr.version
+            session.using_conversation.use_funcs = await self.ap.tool_mgr.get_all_functions(
+                plugin_enabled=True,
+            )
+            session.using_conversation.funcs_version = funcs_version
 
         return session.using_conversation
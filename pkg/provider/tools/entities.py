@@ -27,5 +27,15 @@ class LLMFunction(pydantic.BaseModel):
     对插件的内容函数进行封装并存到这里来。
     """
 
+    parallel: bool = True
+    """同一条模型消息中的多个工具调用是否可与其他调用并发执行，有副作用或依赖执行顺序的工具应设为 False"""
+
+    timeout: typing.Optional[float] = None
+    """执行超时秒数，为 None 时使用加载器或全局的设置，为 0 时不限制"""
+
+    cache_ttl: typing.Optional[float] = None
+    """结果缓存秒数，有效期内参数相同的调用直接返回缓存的结果，跨会话共用；
+    仅适用于无副作用且结果只取决于参数的工具，为 None 或 0 时不缓存"""
+
     class Config:
         arbitrary_types_allowed = True
@@ -39,6 +39,10 @@ class ToolLoader(abc.ABC):
         """获取所有工具"""
         pass
 
+    def needs_refresh(self) -> bool:
+        """工具管理器缓存的工具列表是否需要重新通过 get_tools 获取，默认不需要"""
+        return False
+
     @abc.abstractmethod
     async def has_tool(self, name: str) -> bool:
         """检查工具是否存在"""
@@ -49,6 +53,12 @@ class ToolLoader(abc.ABC):
         """执行工具调用"""
         pass
 
+    async def invoke_function(
+        self, query: core_entities.Query, function: tools_entities.LLMFunction, parameters: dict
+    ) -> typing.Any:
+        """执行已在索引中找到的工具，加载器可覆盖此方法以省去按名称查找"""
+        return await self.invoke_tool(query, function.name, parameters)
+
     @abc.abstractmethod
     async def shutdown(self):
         """关闭工具"""
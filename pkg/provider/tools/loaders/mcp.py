@@ -1,9 +1,12 @@
 from __future__ import annotations
 
+import asyncio
+import time
 import typing
 from contextlib import AsyncExitStack
 
-from mcp import ClientSession, StdioServerParameters
+import anyio
+from mcp import ClientSession, StdioServerParameters, types as mcp_types
 from mcp.client.stdio import stdio_client
 from mcp.client.sse import sse_client
 
@@ -12,7 +15,11 @@ from ....core import app, entities as core_entities
 
 
 class RuntimeMCPSession:
-    """运行时 MCP 会话"""
+    """运行时 MCP 会话
+
+    连接的建立与关闭都在同一个生命周期任务中完成（MCP SDK 的传输层要求在同一任务中进出上下文），
+    断开后可再次 start 重连。工具列表在连接时获取并缓存，仅在服务器通知工具列表变化后重新获取。
+    """
 
     ap: app.Application
 
@@ -20,89 +27,265 @@ class RuntimeMCPSession:
 
     server_config: dict
 
-    session: ClientSession
-
-    exit_stack: AsyncExitStack
+    session: ClientSession | None
+    """当前连接的会话，未连接时为 None"""
 
     functions: list[tools_entities.LLMFunction] = []
+    """最近一次获取到的工具，断开期间保留，以免工具定义随连接状态变化"""
 
-    def __init__(self, server_name: str, server_config: dict, ap: app.Application):
-        self.server_name = server_name
-        self.server_config = server_config
-        self.ap = ap
-
-        self.session = None
-
-        self.exit_stack = AsyncExitStack()
-        self.functions = []
+    lazy: bool
+    """是否在首次需要工具时才启动"""
 
-    async def _init_stdio_python_server(self):
-        server_params = StdioServerParameters(
-            command=self.server_config['command'],
-            args=self.server_config['args'],
-            env=self.server_config['env'],
-        )
+    started: bool
+    """是否尝试启动过，懒启动的会话在此之前不参与健康检查"""
 
-        stdio_transport = await self.exit_stack.enter_async_context(stdio_client(server_params))
+    tools_stale: bool
+    """服务器通知工具列表已变化，尚未重新获取"""
 
-        stdio, write = stdio_transport
+    failures: int
+    """连续连接失败次数"""
 
-        self.session = await self.exit_stack.enter_async_context(ClientSession(stdio, write))
+    next_retry_at: float
+    """失败后下一次允许重连的时间（time.monotonic）"""
 
-        await self.session.initialize()
+    last_error: Exception | None
 
-    async def _init_sse_server(self):
-        sse_transport = await self.exit_stack.enter_async_context(
-            sse_client(
-                self.server_config['url'],
-                headers=self.server_config.get('headers', {}),
-                timeout=self.server_config.get('timeout', 10),
-            )
-        )
+    _lifecycle_task: asyncio.Task | None
 
-        sseio, write = sse_transport
+    _ready_event: asyncio.Event
 
-        self.session = await self.exit_stack.enter_async_context(ClientSession(sseio, write))
+    _shutdown_event: asyncio.Event
 
-        await self.session.initialize()
+    _start_lock: asyncio.Lock
 
-    async def initialize(self):
-        self.ap.logger.debug(f'初始化 MCP 会话: {self.server_name} {self.server_config}')
+    def __init__(self, server_name: str, server_config: dict, ap: app.Application):
+        self.server_name = server_name
+        self.server_config = server_config
+        self.ap = ap
 
+        self.session = None
+        self.functions = []
+        self.lazy = server_config.get('lazy', False)
+        self.started = False
+        self.tools_stale = False
+        self.failures = 0
+        self.next_retry_at = 0
+        self.last_error = None
+
+        self._lifecycle_task = None
+        self._ready_event = asyncio.Event()
+        self._shutdown_event = asyncio.Event()
+        self._start_lock = asyncio.Lock()
+
+    async def _open_transport(self, exit_stack: AsyncExitStack):
         if self.server_config['mode'] == 'stdio':
-            await self._init_stdio_python_server()
+            server_params = StdioServerParameters(
+                command=self.server_config['command'],
+                args=self.server_config['args'],
+                env=self.server_config['env'],
+            )
+
+            return await exit_stack.enter_async_context(stdio_client(server_params))
         elif self.server_config['mode'] == 'sse':
-            await self._init_sse_server()
+            return await exit_stack.enter_async_context(
+                sse_client(
+                    self.server_config['url'],
+                    headers=self.server_config.get('headers', {}),
+                    timeout=self.server_config.get('timeout', 10),
+                )
+            )
         else:
             raise ValueError(f'无法识别 MCP 服务器类型: {self.server_name}: {self.server_config}')
 
+    async def _handle_message(self, message: typing.Any):
+        # 旧版 SDK 传入的通知外面还包了一层 RootModel
+        notification = getattr(message, 'root', message)
+
+        if isinstance(notification, mcp_types.ToolListChangedNotification):
+            # 此回调运行在会话的接收循环中，不能在这里发请求，留到下次获取工具时刷新
+            self.ap.logger.debug(f'MCP 服务器 {self.server_name} 的工具列表已变化')
+            self.tools_stale = True
+            self._invalidate_tools()
+
+    async def _lifecycle(self):
+        try:
+            async with AsyncExitStack() as exit_stack:
+                read, write = (await self._open_transport(exit_stack))[:2]
+
+                session = await exit_stack.enter_async_context(
+                    ClientSession(read, write, message_handler=self._handle_message)
+                )
+                await session.initialize()
+
+                self.session = session
+                await self.refresh_tools()
+
+                self._ready_event.set()
+                await self._shutdown_event.wait()
+        except Exception as e:
+            self.last_error = e
+        finally:
+            self.session = None
+            self._ready_event.set()
+
+    async def start(self, timeout: float | None = None):
+        """连接服务器并获取工具列表，已连接时直接返回，失败或超时时抛出异常"""
+        async with self._start_lock:
+            if self.session is not None:
+                return
+
+            await self._stop()
+
+            self.started = True
+            self.ap.logger.debug(f'初始化 MCP 会话: {self.server_name} {self.server_config}')
+
+            self.last_error = None
+            self._ready_event = asyncio.Event()
+            self._shutdown_event = asyncio.Event()
+            self._lifecycle_task = asyncio.create_task(self._lifecycle())
+
+            try:
+                await asyncio.wait_for(self._ready_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                self.last_error = TimeoutError(f'连接 MCP 服务器 {self.server_name} 超时（{timeout}s）')
+            except asyncio.CancelledError:
+                await self._stop()
+                raise
+
+            if self.session is None:
+                await self._stop()
+                self.failures += 1
+                self.next_retry_at = time.monotonic() + self._get_retry_delay()
+                raise self.last_error or Exception(f'无法连接 MCP 服务器 {self.server_name}')
+
+            self.failures = 0
+
+    def _get_retry_delay(self) -> float:
+        mcp_cfg = self.ap.instance_config.data.get('mcp', {})
+        interval = mcp_cfg.get('health-check-interval', 30) or 30
+        return min(interval * 2 ** (self.failures - 1), mcp_cfg.get('max-retry-interval', 600))
+
+    async def _stop(self):
+        task, self._lifecycle_task = self._lifecycle_task, None
+        if task is None or task.done():
+            return
+
+        self._shutdown_event.set()
+        if self.session is not None:
+            await asyncio.wait({task}, timeout=5)
+
+        # 仍在连接中（不会等待关闭事件）或关闭超时的直接取消
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+
+    async def ensure_started(self):
+        """调用工具前确保已连接，处于重连退避期内时直接报错"""
+        if self.session is not None:
+            return
+
+        if self.failures and time.monotonic() < self.next_retry_at:
+            raise Exception(f'MCP 服务器 {self.server_name} 暂不可用: {self.last_error}')
+
+        await self.start(self.ap.instance_config.data.get('mcp', {}).get('boot-timeout', 30))
+
+    async def check_health(self, timeout: float):
+        """检查连接是否可用，不可用时按退避间隔重连，timeout 同时用于 ping 和重连"""
+        if self.session is not None:
+            try:
+                await asyncio.wait_for(self.session.send_ping(), timeout)
+                return
+            except Exception as e:
+                self.ap.logger.warning(f'MCP 服务器 {self.server_name} 健康检查失败，将重新连接: {e!r}')
+                await self._stop()
+
+        if time.monotonic() < self.next_retry_at:
+            return
+
+        try:
+            await self.start(timeout)
+            self.ap.logger.info(f'MCP 服务器 {self.server_name} 已重新连接')
+        except Exception as e:
+            self.ap.logger.warning(
+                f'重新连接 MCP 服务器 {self.server_name} 失败（第 {self.failures} 次），'
+                f'{self._get_retry_delay():.0f}s 后重试: {e!r}'
+            )
+
+    def _make_func(self, tool_name: str):
+        async def func(query: core_entities.Query, **kwargs):
+            await self.ensure_started()
+
+            # 健康检查可能恰在此时关闭了会话
+            session = self.session
+            if session is None:
+                raise Exception(f'MCP 服务器 {self.server_name} 暂不可用: {self.last_error}')
+
+            try:
+                result = await session.call_tool(tool_name, kwargs)
+            except Exception as e:
+                if self._is_connection_error(e):
+                    # 传输层已断开（如服务器进程退出），丢弃会话，下次调用时重新连接
+                    self.ap.logger.warning(f'MCP 服务器 {self.server_name} 连接已断开，将在下次调用时重新连接: {e!r}')
+                    await self._drop_session(session)
+                raise
+
+            if result.isError:
+                raise Exception(result.content[0].text)
+            return result.content[0].text
+
+        func.__name__ = tool_name
+        return func
+
+    @staticmethod
+    def _is_connection_error(e: Exception) -> bool:
+        """调用失败是否由连接断开引起，服务器返回的其他错误响应不算"""
+        if isinstance(e, (anyio.ClosedResourceError, anyio.BrokenResourceError, anyio.EndOfStream, OSError)):
+            return True
+
+        # 接收循环结束时，SDK 以 CONNECTION_CLOSED 错误结束所有未完成的请求
+        return getattr(getattr(e, 'error', None), 'code', None) == mcp_types.CONNECTION_CLOSED
+
+    async def _drop_session(self, session: ClientSession):
+        """关闭已断开的会话，会话已被重连替换时不做处理"""
+        async with self._start_lock:
+            if self.session is session:
+                await self._stop()
+
+    async def refresh_tools(self):
+        """重新获取工具列表，有变化时通知工具管理器"""
+        self.tools_stale = False
+
         tools = await self.session.list_tools()
 
         self.ap.logger.debug(f'获取 MCP 工具: {tools}')
 
-        for tool in tools.tools:
+        functions = [
+            tools_entities.LLMFunction(
+                name=tool.name,
+                human_desc=tool.description,
+                description=tool.description,
+                parameters=tool.inputSchema,
+                func=self._make_func(tool.name),
+                parallel=self.server_config.get('parallel-tools', True),
+                timeout=self.server_config.get('tool-timeout'),
+                cache_ttl=self.server_config.get('tool-cache-ttl', {}).get(tool.name),
+            )
+            for tool in tools.tools
+        ]
 
-            async def func(query: core_entities.Query, **kwargs):
-                result = await self.session.call_tool(tool.name, kwargs)
-                if result.isError:
-                    raise Exception(result.content[0].text)
-                return result.content[0].text
+        def signature(funcs: list[tools_entities.LLMFunction]) -> list:
+            return [(f.name, f.description, f.parameters) for f in funcs]
 
-            func.__name__ = tool.name
+        if signature(functions) != signature(self.functions):
+            self.functions = functions
+            self._invalidate_tools()
 
-            self.functions.append(
-                tools_entities.LLMFunction(
-                    name=tool.name,
-                    human_desc=tool.description,
-                    description=tool.description,
-                    parameters=tool.inputSchema,
-                    func=func,
-                )
-            )
+    def _invalidate_tools(self):
+        if self.ap.tool_mgr is not None:
+            self.ap.tool_mgr.invalidate()
 
     async def shutdown(self):
         """关闭工具"""
-        await self.session._exit_stack.aclose()
+        await self._stop()
 
 
 @loader.loader_class('mcp')
@@ -116,21 +299,79 @@ class MCPLoader(loader.ToolLoader):
 
     _last_listed_functions: list[tools_entities.LLMFunction] = []
 
+    _health_check_tasks: list[asyncio.Task] = []
+    """每个服务器一个健康检查任务，避免一个服务器重连缓慢拖慢其他服务器的检查"""
+
     def __init__(self, ap: app.Application):
         super().__init__(ap)
         self.sessions = {}
         self._last_listed_functions = []
+        self._health_check_tasks = []
 
     async def initialize(self):
-        for server_config in self.ap.instance_config.data.get('mcp', {}).get('servers', []):
+        mcp_cfg = self.ap.instance_config.data.get('mcp', {})
+
+        for server_config in mcp_cfg.get('servers', []):
             if not server_config['enable']:
                 continue
-            session = RuntimeMCPSession(server_config['name'], server_config, self.ap)
-            await session.initialize()
-            # self.ap.event_loop.create_task(session.initialize())
-            self.sessions[server_config['name']] = session
+            self.sessions[server_config['name']] = RuntimeMCPSession(server_config['name'], server_config, self.ap)
+
+        # 并发连接，单个服务器启动缓慢或失败不阻塞其他服务器和启动流程，失败的由健康检查重连
+        await asyncio.gather(*[self._start_session(session) for session in self.sessions.values() if not session.lazy])
+
+        if mcp_cfg.get('health-check-interval', 30) > 0:
+            self._health_check_tasks = [
+                asyncio.create_task(self._health_check_loop(session)) for session in self.sessions.values()
+            ]
+
+    async def _start_session(self, session: RuntimeMCPSession):
+        try:
+            await session.start(self.ap.instance_config.data.get('mcp', {}).get('boot-timeout', 30))
+        except Exception as e:
+            self.ap.logger.error(f'连接 MCP 服务器 {session.server_name} 失败: {e!r}')
+
+    async def _prepare_session(self, session: RuntimeMCPSession):
+        if session.lazy and not session.started:
+            await self._start_session(session)
+        elif self._should_retry(session):
+            # 未开启健康检查时没有后台重连，在获取工具时按退避间隔重试连接失败的服务器
+            await self._start_session(session)
+        elif session.tools_stale and session.session is not None:
+            try:
+                await session.refresh_tools()
+            except Exception as e:
+                self.ap.logger.warning(f'刷新 MCP 服务器 {session.server_name} 的工具列表失败: {e!r}')
+
+    def _should_retry(self, session: RuntimeMCPSession) -> bool:
+        return (
+            not self._health_check_tasks
+            and session.started
+            and session.session is None
+            and time.monotonic() >= session.next_retry_at
+        )
+
+    def needs_refresh(self) -> bool:
+        return any(self._should_retry(session) for session in self.sessions.values())
+
+    async def _health_check_loop(self, session: RuntimeMCPSession):
+        mcp_cfg = self.ap.instance_config.data.get('mcp', {})
+        interval = mcp_cfg.get('health-check-interval', 30)
+        timeout = mcp_cfg.get('boot-timeout', 30)
+
+        while True:
+            await asyncio.sleep(interval)
+
+            if not session.started:
+                continue
+
+            try:
+                await session.check_health(timeout)
+            except Exception as e:
+                self.ap.logger.error(f'MCP 服务器 {session.server_name} 健康检查出错: {e!r}')
 
     async def get_tools(self, enabled: bool = True) -> list[tools_entities.LLMFunction]:
+        await asyncio.gather(*[self._prepare_session(session) for session in self.sessions.values()])
+
         all_functions = []
 
         for session in self.sessions.values():
@@ -141,7 +382,7 @@ class MCPLoader(loader.ToolLoader):
         return all_functions
 
     async def has_tool(self, name: str) -> bool:
-        return name in [f.name for f in self._last_listed_functions]
+        return any(f.name == name for f in self._last_listed_functions)
 
     async def invoke_tool(self, query: core_entities.Query, name: str, parameters: dict) -> typing.Any:
         for server_name, session in self.sessions.items():
@@ -151,7 +392,14 @@ class MCPLoader(loader.ToolLoader):
 
         raise ValueError(f'未找到工具: {name}')
 
+    async def invoke_function(
+        self, query: core_entities.Query, function: tools_entities.LLMFunction, parameters: dict
+    ) -> typing.Any:
+        return await function.func(query, **parameters)
+
     async def shutdown(self):
         """关闭工具"""
-        for session in self.sessions.values():
-            await session.shutdown()
+        for task in self._health_check_tasks:
+            task.cancel()
+
+        await asyncio.gather(*[session.shutdown() for session in self.sessions.values()])
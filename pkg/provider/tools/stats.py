@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from ..modelmgr import latency as latency_tracker
+
+
+class ToolStats:
+    """单个工具的调用统计"""
+
+    call_count: int
+    """实际执行的次数，不含命中缓存的调用"""
+
+    error_count: int
+    """抛出异常的调用数，含超时"""
+
+    timeout_count: int
+
+    latency: latency_tracker.LatencyTracker
+    """最近调用的耗时，含失败的调用"""
+
+    cache_hits: int
+
+    cache_misses: int
+    """启用了结果缓存的工具未命中缓存的次数"""
+
+    def __init__(self):
+        self.call_count = 0
+        self.error_count = 0
+        self.timeout_count = 0
+        self.latency = latency_tracker.LatencyTracker()
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def observe(self, seconds: float, error: bool = False, timeout: bool = False):
+        self.call_count += 1
+        self.latency.observe(seconds)
+
+        if error or timeout:
+            self.error_count += 1
+        if timeout:
+            self.timeout_count += 1
+
+    def get_stats(self) -> dict:
+        return {
+            'call_count': self.call_count,
+            'error_count': self.error_count,
+            'timeout_count': self.timeout_count,
+            'latency': self.latency.get_stats(),
+            'cache_hits': self.cache_hits,
+            'cache_misses': self.cache_misses,
+        }
@@ -1,15 +1,25 @@
 from __future__ import annotations
 
+import asyncio
+import itertools
+import json
+import time
 import typing
 
 from ...core import app, entities as core_entities
-from . import entities, loader as tools_loader
-from ...utils import importutil
+from . import entities, loader as tools_loader, stats as tools_stats
+from ...utils import importutil, ttlcache
 from . import loaders
 
 importutil.import_modules_in_pkg(loaders)
 
 
+_versions = itertools.count(1)
+"""工具列表版本号，跨 ToolManager 实例递增，重载后新实例的版本号也不会与旧实例相同"""
+
+_MISSING = object()
+
+
 class ToolManager:
     """LLM工具管理器"""
 
@@ -17,10 +27,52 @@ class ToolManager:
 
     loaders: list[tools_loader.ToolLoader]
 
+    version: int
+    """工具列表的版本号，插件或 MCP 服务器变化时递增，对话据此判断其工具列表是否过期"""
+
+    _index: dict[str, tuple[tools_loader.ToolLoader, entities.LLMFunction]] | None
+    """已启用工具的名称索引，为 None 时在下次使用前重建"""
+
+    _schema_cache: dict[tuple[str, tuple[str, ...]], list]
+    """按（格式, 工具名列表）缓存的工具定义"""
+
+    stats: dict[str, tools_stats.ToolStats]
+    """各工具的调用统计，键为工具名"""
+
+    result_cache: ttlcache.TTLCache
+    """声明了 cache_ttl 的工具的调用结果，键为（工具名, 规范化的参数）"""
+
     def __init__(self, ap: app.Application):
         self.ap = ap
         self.all_functions = []
         self.loaders = []
+        self.version = next(_versions)
+        self._index = None
+        self._schema_cache = {}
+        self.stats = {}
+        self.result_cache = ttlcache.TTLCache(
+            ttl=0,
+            max_size=ap.instance_config.data.get('tool-call', {}).get('result-cache-size', 1000),
+        )
+
+    def invalidate(self):
+        """工具列表发生变化（插件启停、MCP 服务器连接变化等）时调用"""
+        self.version = next(_versions)
+        self._index = None
+        self._schema_cache = {}
+        # 工具的实现可能已随之变化
+        self.result_cache.clear()
+
+    async def _get_index(self) -> dict[str, tuple[tools_loader.ToolLoader, entities.LLMFunction]]:
+        if self._index is None or any(loader.needs_refresh() for loader in self.loaders):
+            index = {}
+            for loader in self.loaders:
+                for function in await loader.get_tools(True):
+                    # 同名工具以先加载的为准，与逐个询问加载器时的行为一致
+                    index.setdefault(function.name, (loader, function))
+            self._index = index
+
+        return self._index
 
     async def initialize(self):
         for loader_cls in tools_loader.preregistered_loaders:
@@ -30,6 +82,9 @@ class ToolManager:
 
     async def get_all_functions(self, plugin_enabled: bool = None) -> list[entities.LLMFunction]:
         """获取所有函数"""
+        if plugin_enabled:
+            return [function for _, function in (await self._get_index()).values()]
+
         all_functions: list[entities.LLMFunction] = []
 
         for loader in self.loaders:
@@ -37,8 +92,26 @@ class ToolManager:
 
         return all_functions
 
+    def _get_cached_schema(
+        self,
+        schema_format: str,
+        use_funcs: list[entities.LLMFunction],
+        generate: typing.Callable[[list[entities.LLMFunction]], list],
+    ) -> list:
+        """获取缓存的工具定义，返回值在多次请求间共用，调用方不可修改"""
+        key = (schema_format, tuple(function.name for function in use_funcs))
+
+        tools = self._schema_cache.get(key)
+        if tools is None:
+            tools = self._schema_cache[key] = generate(use_funcs)
+
+        return tools
+
     async def generate_tools_for_openai(self, use_funcs: list[entities.LLMFunction]) -> list:
         """生成函数列表"""
+        return self._get_cached_schema('openai', use_funcs, self._generate_tools_for_openai)
+
+    def _generate_tools_for_openai(self, use_funcs: list[entities.LLMFunction]) -> list:
         tools = []
 
         for function in use_funcs:
@@ -55,9 +128,11 @@ class ToolManager:
         return tools
 
     async def generate_tools_for_anthropic(self, use_funcs: list[entities.LLMFunction]) -> list:
-        """为anthropic生成函数列表
+        """为anthropic生成函数列表"""
+        return self._get_cached_schema('anthropic', use_funcs, self._generate_tools_for_anthropic)
 
-        e.g.
+    def _generate_tools_for_anthropic(self, use_funcs: list[entities.LLMFunction]) -> list:
+        """e.g.
 
         [
           {
@@ -92,12 +167,76 @@ class ToolManager:
     async def execute_func_call(self, query: core_entities.Query, name: str, parameters: dict) -> typing.Any:
         """执行函数调用"""
 
-        for loader in self.loaders:
-            if await loader.has_tool(name):
-                return await loader.invoke_tool(query, name, parameters)
-        else:
+        entry = (await self._get_index()).get(name)
+
+        if entry is None:
+            # 工具列表可能已变化而未通知，重建索引后再查找一次
+            self._index = None
+            entry = (await self._get_index()).get(name)
+
+        if entry is None:
             raise ValueError(f'未找到工具: {name}')
 
+        loader, function = entry
+        timeout = self.get_timeout(loader, function)
+
+        stats = self.stats.get(name)
+        if stats is None:
+            stats = self.stats[name] = tools_stats.ToolStats()
+
+        cache_key = None
+        if function.cache_ttl:
+            cache_key = (name, json.dumps(parameters, sort_keys=True, ensure_ascii=False, default=str))
+
+            result = self.result_cache.get(cache_key, _MISSING)
+            if result is not _MISSING:
+                stats.cache_hits += 1
+                return result
+
+            stats.cache_misses += 1
+
+        start_time = time.perf_counter()
+
+        try:
+            # 超时后 wait_for 会取消工具的执行
+            result = await asyncio.wait_for(loader.invoke_function(query, function, parameters), timeout)
+        except asyncio.TimeoutError:
+            elapsed = time.perf_counter() - start_time
+
+            if timeout is None or elapsed < timeout:
+                # 工具自身抛出的超时，按普通错误计
+                stats.observe(elapsed, error=True)
+                raise
+
+            stats.observe(elapsed, timeout=True)
+            raise TimeoutError(f'工具 {name} 执行超时（{timeout}s）')
+        except Exception:
+            stats.observe(time.perf_counter() - start_time, error=True)
+            raise
+
+        stats.observe(time.perf_counter() - start_time)
+
+        if cache_key is not None:
+            # 只缓存成功的结果
+            self.result_cache.set(cache_key, result, function.cache_ttl)
+
+        return result
+
+    def get_timeout(self, loader: tools_loader.ToolLoader, function: entities.LLMFunction) -> float | None:
+        """工具的执行超时秒数，依次取工具自身、其加载器和全局的设置，为 0 时不限制"""
+        tool_call_cfg = self.ap.instance_config.data.get('tool-call', {})
+
+        timeout = function.timeout
+        if timeout is None:
+            timeout = tool_call_cfg.get('loader-timeouts', {}).get(loader.name)
+        if timeout is None:
+            timeout = tool_call_cfg.get('timeout', 120)
+
+        return timeout or None
+
+    def get_stats(self) -> dict:
+        return {name: stats.get_stats() for name, stats in self.stats.items()}
+
     async def shutdown(self):
         """关闭所有工具"""
         for loader in self.loaders:
@@ -194,6 +194,11 @@ async def extract_b64_and_format(image_base64_data: str) -> typing.Tuple[str, st
     data:image/jpeg;base64,xxx
     提取出base64编码和图片格式
     """
+    return split_b64_and_format(image_base64_data)
+
+
+def split_b64_and_format(image_base64_data: str) -> typing.Tuple[str, str]:
+    """extract_b64_and_format 的同步版本"""
     base64_str = image_base64_data.split(',')[-1]
     image_format = image_base64_data.split(':')[-1].split(';')[0].split('/')[-1]
     return base64_str, image_format
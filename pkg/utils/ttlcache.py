@@ -0,0 +1,109 @@
+from __future__ import annotations
+
+import collections
+import heapq
+import itertools
+import time
+import typing
+
+
+class TTLCache:
+    """带过期时间和容量上限的缓存
+
+    条目按写入先后排列，超出容量时淘汰最早写入的条目；过期条目在访问或写入时清理。
+    各条目可有不同的过期时间，因此另用一个按过期时间排序的堆找出已过期的条目。
+    """
+
+    ttl: float
+    """默认过期秒数"""
+
+    max_size: int
+    """最多保存的条目数"""
+
+    entries: collections.OrderedDict[typing.Hashable, tuple[typing.Any, float]]
+    """缓存条目，值为 (数据, 过期时间)"""
+
+    expiry_heap: list[tuple[float, int, typing.Hashable]]
+    """(过期时间, 写入序号, 键) 的最小堆，条目被覆盖或删除后堆中的旧记录在弹出时跳过"""
+
+    hits: int
+    """命中次数"""
+
+    misses: int
+    """未命中次数"""
+
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.entries = collections.OrderedDict()
+        self.expiry_heap = []
+        self._seq = itertools.count()
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def _purge_expired(self, now: float):
+        """按过期时间从早到晚清理过期条目"""
+        while self.expiry_heap and self.expiry_heap[0][0] <= now:
+            expire_at, _, key = heapq.heappop(self.expiry_heap)
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == expire_at:
+                del self.entries[key]
+
+        # 被覆盖、删除或因容量淘汰的条目在堆中留有旧记录，过多时重建
+        if len(self.expiry_heap) > 2 * len(self.entries) + 64:
+            self.expiry_heap = [(expire_at, next(self._seq), key) for key, (_, expire_at) in self.entries.items()]
+            heapq.heapify(self.expiry_heap)
+
+    def get(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        """获取条目，不存在或已过期时返回 default"""
+        entry = self.entries.get(key)
+
+        if entry is not None:
+            value, expire_at = entry
+            if expire_at > time.monotonic():
+                self.hits += 1
+                return value
+            del self.entries[key]
+
+        self.misses += 1
+        return default
+
+    def set(self, key: typing.Hashable, value: typing.Any, ttl: float | None = None):
+        """写入条目
+
+        Args:
+            key: 键
+            value: 数据
+            ttl: 此条目的过期秒数，默认使用缓存的 ttl
+        """
+        now = time.monotonic()
+
+        self._purge_expired(now)
+
+        expire_at = now + (self.ttl if ttl is None else ttl)
+
+        self.entries.pop(key, None)
+        self.entries[key] = (value, expire_at)
+        heapq.heappush(self.expiry_heap, (expire_at, next(self._seq), key))
+
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def pop(self, key: typing.Hashable, default: typing.Any = None) -> typing.Any:
+        entry = self.entries.pop(key, None)
+        return default if entry is None else entry[0]
+
+    def clear(self):
+        self.entries.clear()
+        self.expiry_heap.clear()
+
+    def get_stats(self) -> dict[str, int]:
+        """获取缓存统计"""
+        return {
+            'size': len(self.entries),
+            'hits': self.hits,
+            'misses': self.misses,
+        }
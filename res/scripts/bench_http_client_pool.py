@@ -0,0 +1,151 @@
+# LLM 请求器 HTTP 客户端对比：每个模型各自创建客户端 vs 从 HTTPClientPool 共用
+# 在仓库根目录运行: python res/scripts/bench_http_client_pool.py（需要 openssl 命令生成自签名证书）
+#
+# 在本机启动一个 HTTPS 服务，模拟同一提供商下的多个模型轮流发起请求，并重载若干次 provider，
+# 统计服务端接受的 TCP/TLS 连接数和总耗时。
+import asyncio
+import logging
+import os
+import ssl
+import subprocess
+import sys
+import tempfile
+import time
+import types
+
+sys.path.insert(0, os.getcwd())
+
+import httpx  # noqa: E402
+
+import pkg.core.app  # noqa: F401, E402  先导入以避免循环导入
+from pkg.provider.modelmgr import httpclient  # noqa: E402
+
+
+MODELS = 8
+REQUESTS_PER_MODEL = 25
+RELOADS = 3
+
+RESPONSE = b'HTTP/1.1 200 OK\r\nContent-Type: application/json\r\nContent-Length: 2\r\n\r\n{}'
+
+
+class Server:
+    """只返回 {} 的最简 HTTP/1.1 keep-alive 服务"""
+
+    def __init__(self):
+        self.connections = 0
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.connections += 1
+        try:
+            while True:
+                headers = await reader.readuntil(b'\r\n\r\n')
+                for line in headers.split(b'\r\n'):
+                    if line.lower().startswith(b'content-length:'):
+                        await reader.readexactly(int(line.split(b':')[1]))
+                writer.write(RESPONSE)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+def make_cert(directory: str) -> tuple[str, str]:
+    cert = os.path.join(directory, 'cert.pem')
+    key = os.path.join(directory, 'key.pem')
+    subprocess.run(
+        [
+            'openssl',
+            'req',
+            '-x509',
+            '-newkey',
+            'rsa:2048',
+            '-nodes',
+            '-days',
+            '1',
+            '-subj',
+            '/CN=127.0.0.1',
+            '-addext',
+            'subjectAltName=IP:127.0.0.1',
+            '-keyout',
+            key,
+            '-out',
+            cert,
+        ],
+        check=True,
+        capture_output=True,
+    )
+    return cert, key
+
+
+async def run_requests(base_url: str, clients: list[httpx.AsyncClient]):
+    """各模型轮流发起请求"""
+    for _ in range(REQUESTS_PER_MODEL):
+        for client in clients:
+            resp = await client.post(f'{base_url}/chat/completions', json={'model': 'bench'})
+            resp.raise_for_status()
+
+
+async def bench_per_model(base_url: str) -> float:
+    """旧实现：每个模型创建自己的客户端，重载时不关闭旧客户端"""
+    start = time.perf_counter()
+    all_clients = []
+    for _ in range(RELOADS):
+        clients = [httpx.AsyncClient(trust_env=True, timeout=120) for _ in range(MODELS)]
+        all_clients.extend(clients)
+        await run_requests(base_url, clients)
+    elapsed = time.perf_counter() - start
+
+    for client in all_clients:
+        await client.aclose()
+    return elapsed
+
+
+async def bench_pool(base_url: str) -> float:
+    ap = types.SimpleNamespace(
+        instance_config=types.SimpleNamespace(data={'http-client': {}}),
+        logger=logging.getLogger('bench'),
+    )
+    pool = httpclient.HTTPClientPool(ap)
+
+    start = time.perf_counter()
+    clients = []
+    for _ in range(RELOADS):
+        # 与 ModelManager 重载时一样，先加载新模型再释放旧模型的客户端
+        new_clients = [pool.acquire(base_url, timeout=120) for _ in range(MODELS)]
+        for client in clients:
+            pool.release(client)
+        clients = new_clients
+        await run_requests(base_url, clients)
+    elapsed = time.perf_counter() - start
+
+    for client in clients:
+        await client.aclose()
+    return elapsed
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        cert, key = make_cert(directory)
+        # 客户端使用 trust_env=True，通过 SSL_CERT_FILE 信任自签名证书
+        os.environ['SSL_CERT_FILE'] = cert
+
+        ssl_context = ssl.create_default_context(ssl.Purpose.CLIENT_AUTH)
+        ssl_context.load_cert_chain(cert, key)
+
+        print(f'{MODELS} 个模型使用同一接口，每个模型 {REQUESTS_PER_MODEL} 次请求，共加载 {RELOADS} 次')
+
+        for name, bench in (('每个模型各自的客户端', bench_per_model), ('HTTPClientPool', bench_pool)):
+            server = Server()
+            tcp_server = await asyncio.start_server(server.handle, '127.0.0.1', 0, ssl=ssl_context)
+            port = tcp_server.sockets[0].getsockname()[1]
+
+            elapsed = await bench(f'https://127.0.0.1:{port}/v1')
+            print(f'{name}: {server.connections} 个连接, {elapsed * 1000:.0f} ms')
+
+            tcp_server.close()
+            await tcp_server.wait_closed()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+# 流水线阶段调度开销对比：逐个执行全部阶段 vs 按执行计划跳过无作用的阶段
+# 在仓库根目录运行: python res/scripts/bench_pipeline_plan.py
+#
+# 各阶段的 process 均替换为直接返回 CONTINUE，只统计流水线本身的调度开销；
+# 哪些阶段无作用仍由真实阶段类的 is_inert 根据默认流水线配置判断。
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+import types
+import typing
+
+sys.path.insert(0, os.getcwd())
+
+import pkg.core.app  # noqa: F401, E402  先导入以避免循环导入
+from pkg.api.http.service.pipeline import default_stage_order  # noqa: E402
+from pkg.core import entities  # noqa: E402
+from pkg.pipeline import entities as pipeline_entities, pipelinemgr, settings as pipeline_settings, stage  # noqa: E402
+from pkg.pipeline.ratelimit.algos import fixedwin  # noqa: E402
+from pkg.platform.types import message as platform_message  # noqa: E402
+from pkg.provider import entities as llm_entities  # noqa: E402
+
+
+ROUNDS = 2000
+
+
+class BenchStage(stage.PipelineStage):
+    """直接放行的阶段，是否无作用由对应的真实阶段判断"""
+
+    def __init__(self, ap, real: stage.PipelineStage):
+        super().__init__(ap)
+        self.real = real
+
+    def is_inert(self, stage_inst_name, launcher_type, settings) -> bool:
+        return self.real.is_inert(stage_inst_name, launcher_type, settings)
+
+    async def process(self, query: entities.Query, stage_inst_name: str) -> pipeline_entities.StageProcessResult:
+        return pipeline_entities.StageProcessResult(result_type=pipeline_entities.ResultType.CONTINUE, new_query=query)
+
+
+async def execute_all_stages(
+    ap, stage_containers: list[pipelinemgr.StageInstContainer], query: entities.Query, format_debug: bool = True
+):
+    """旧实现：执行全部阶段，每个阶段都格式化调试日志
+
+    format_debug 为 False 时不格式化日志，用于区分跳过阶段与省去日志格式化各自的收益。
+    """
+    for stage_container in stage_containers:
+        query.current_stage = stage_container
+
+        result = stage_container.inst.process(query, stage_container.inst_name)
+
+        if isinstance(result, typing.Coroutine):
+            result = await result
+
+        if format_debug:
+            ap.logger.debug(f'Stage {stage_container.inst_name} processed query {query} res {result}')
+
+        if result.result_type == pipeline_entities.ResultType.INTERRUPT:
+            break
+        query = result.new_query
+
+
+def make_query(config: dict, settings: pipeline_settings.PipelineSettings) -> entities.Query:
+    return entities.Query.construct(
+        query_id=0,
+        launcher_type=entities.LauncherTypes.PERSON,
+        launcher_id=10001,
+        sender_id=10001,
+        message_chain=platform_message.MessageChain([platform_message.Plain('你好')]),
+        pipeline_config=config,
+        pipeline_settings=settings,
+        messages=[llm_entities.Message(role='user', content='这是一条历史消息。' * 20) for _ in range(20)],
+        resp_messages=[],
+        current_stage=None,
+    )
+
+
+async def main():
+    ap = types.SimpleNamespace(logger=logging.getLogger('bench'))
+    ap.logger.setLevel(logging.INFO)
+
+    with open('templates/default-pipeline-config.json', 'r', encoding='utf-8') as f:
+        config = json.load(f)
+    settings = pipeline_settings.PipelineSettings.from_config(config)
+
+    stage_containers = []
+    for stage_name in default_stage_order:
+        real = stage.preregistered_stages[stage_name](ap)
+        # 限速阶段的 algo 在 initialize 中创建，此处直接使用默认的固定窗口算法
+        real.algo = fixedwin.FixedWindowAlgo
+        stage_containers.append(pipelinemgr.StageInstContainer(stage_name, BenchStage(ap, real)))
+
+    pipeline = pipelinemgr.RuntimePipeline(
+        ap, types.SimpleNamespace(uuid='bench', config=config), stage_containers, settings
+    )
+    plan = pipeline.execution_plans[entities.LauncherTypes.PERSON]
+
+    query = make_query(config, settings)
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await execute_all_stages(ap, stage_containers, query)
+    all_stages = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await execute_all_stages(ap, stage_containers, query, format_debug=False)
+    all_stages_no_debug = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        await pipeline._execute_from_stage(0, query)
+    planned = time.perf_counter() - start
+
+    print(f'私聊请求，默认流水线配置，执行 {ROUNDS} 次')
+    print(f'全部阶段 ({len(stage_containers)} 个): {all_stages / ROUNDS * 1e6:.1f} us/请求')
+    print(f'全部阶段，不格式化日志: {all_stages_no_debug / ROUNDS * 1e6:.1f} us/请求')
+    print(f'执行计划 ({len(plan)} 个): {planned / ROUNDS * 1e6:.1f} us/请求')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
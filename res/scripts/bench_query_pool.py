@@ -0,0 +1,99 @@
+# 请求调度耗时对比：旧的线性扫描 vs 按会话排队的 QueryPool
+# 在仓库根目录运行: python res/scripts/bench_query_pool.py
+#
+# 场景：若干热点会话各自积压了大量请求且均已占满并发，
+# 之后到达的其他会话的请求逐个被调度并处理完毕，统计调度这些请求的总耗时。
+import asyncio
+import logging
+import os
+import sys
+import time
+import types
+
+sys.path.insert(0, os.getcwd())
+
+import pkg.core.app  # noqa: F401, E402  先导入以避免循环导入
+from pkg.core import entities  # noqa: E402
+from pkg.pipeline import pool  # noqa: E402
+
+
+HOT_SESSIONS = 20
+COLD_QUERIES = 2000
+
+
+def make_ap() -> types.SimpleNamespace:
+    return types.SimpleNamespace(
+        instance_config=types.SimpleNamespace(data={'concurrency': {'session': 1}}),
+        logger=logging.getLogger('bench'),
+        sess_mgr=None,
+    )
+
+
+def make_keys(backlog: int) -> list[tuple[str, int]]:
+    """按到达顺序生成各请求的会话"""
+    keys = [(f'hot_{i}', n) for n in range(backlog) for i in range(HOT_SESSIONS)]
+    keys += [(f'cold_{i}', 0) for i in range(COLD_QUERIES)]
+    return keys
+
+
+def bench_linear_scan(keys: list[tuple[str, int]]) -> float:
+    """旧实现：在全部待处理请求中找第一个所属会话未满的请求，取出后从列表中删除"""
+    queries = list(keys)
+    running = {}
+
+    def dispatch():
+        for query in queries:
+            if running.get(query[0], 0) < 1:
+                running[query[0]] = running.get(query[0], 0) + 1
+                queries.remove(query)
+                return query
+
+    for _ in range(HOT_SESSIONS):
+        dispatch()
+
+    start = time.perf_counter()
+    for _ in range(COLD_QUERIES):
+        query = dispatch()
+        running[query[0]] -= 1
+    return time.perf_counter() - start
+
+
+async def bench_query_pool(keys: list[tuple[str, int]]) -> float:
+    query_pool = pool.QueryPool(make_ap())
+    await query_pool.initialize()
+
+    async with query_pool:
+        # 只比较调度部分，跳过 add_query 中的消息合并和溢出处理
+        for query_id, (launcher_id, _) in enumerate(keys):
+            query = entities.Query.construct(
+                bot_uuid='bench',
+                query_id=query_id,
+                launcher_type=entities.LauncherTypes.PERSON,
+                launcher_id=launcher_id,
+                sender_id=launcher_id,
+            )
+            query_pool._enqueue(query_pool.get_session_key(query), query)
+
+        for _ in range(HOT_SESSIONS):
+            query_pool.next_query()
+
+        start = time.perf_counter()
+        for _ in range(COLD_QUERIES):
+            query = query_pool.next_query()
+            query_pool.release_query(query)
+        return time.perf_counter() - start
+
+
+def main():
+    print(f'热点会话 {HOT_SESSIONS} 个，其后调度 {COLD_QUERIES} 个其他会话的请求')
+    print(f'{"积压请求数":>10} {"线性扫描(ms)":>14} {"QueryPool(ms)":>14}')
+
+    for backlog in (10, 100, 500):
+        keys = make_keys(backlog)
+        linear = bench_linear_scan(keys)
+        scheduled = asyncio.run(bench_query_pool(keys))
+        print(f'{backlog * HOT_SESSIONS:>14} {linear * 1000:>18.1f} {scheduled * 1000:>15.1f}')
+
+
+if __name__ == '__main__':
+    main()